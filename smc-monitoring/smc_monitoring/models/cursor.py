@@ -0,0 +1,105 @@
+"""
+Cursors are used by tailing queries to remember the position in the log
+stream that has already been delivered to the caller. A cursor stores a
+high-water mark made up of the record timestamp (in milliseconds) and a
+record key. When a live stream is interrupted, the cursor provides the
+starting point for backfilling the gap from stored logs.
+
+Records that are delivered twice (for example records at the boundary of
+the backfill and the new live stream) are suppressed by keeping a bounded
+set of recently seen record keys.
+
+A cursor can be saved and restored to resume a tail across processes::
+
+    cursor = TailCursor()
+    query = LogQuery()
+    for log in query.fetch_tail(cursor=cursor):
+        ...
+    saved = cursor.as_dict()
+    ...
+    cursor = TailCursor(**saved)
+"""
+from collections import OrderedDict
+
+
+class TailCursor(object):
+    """
+    High-water cursor for a tailed query. The cursor only moves forward
+    in time; records with an older timestamp do not change the position.
+
+    :param int timestamp: timestamp in milliseconds of the newest record
+        delivered. If None, the tail starts from the live stream without
+        a backfill.
+    :param key: record key of the newest record delivered
+    """
+    def __init__(self, timestamp=None, key=None):
+        self.timestamp = timestamp
+        self.key = key
+
+    def advance(self, timestamp, key):
+        """
+        Move the cursor to the given position if it is newer than the
+        current high-water mark.
+
+        :param int timestamp: record timestamp in milliseconds
+        :param key: record key
+        :return: True if the cursor moved
+        :rtype: bool
+        """
+        if timestamp is None:
+            return False
+        if self.timestamp is None or timestamp >= self.timestamp:
+            self.timestamp = timestamp
+            self.key = key
+            return True
+        return False
+
+    def as_dict(self):
+        """
+        Return the cursor position as a dict that can be stored and used
+        to recreate the cursor.
+
+        :rtype: dict
+        """
+        return {'timestamp': self.timestamp, 'key': self.key}
+
+    def __repr__(self):
+        return '%s(timestamp=%s,key=%r)' % (
+            self.__class__.__name__, self.timestamp, self.key)
+
+
+class RecentKeys(object):
+    """
+    Bounded LRU set of record keys. Once the maximum size is reached
+    the least recently seen key is evicted.
+
+    :param int maxlen: maximum number of keys to retain
+    """
+    def __init__(self, maxlen=10000):
+        self.maxlen = maxlen
+        self._keys = OrderedDict()
+
+    def seen(self, key):
+        """
+        Check whether the key was already seen and record it as the most
+        recent key.
+
+        :param key: hashable record key
+        :return: True if the key is a duplicate
+        :rtype: bool
+        """
+        if key in self._keys:
+            # Refresh position so it is evicted last
+            del self._keys[key]
+            self._keys[key] = None
+            return True
+        self._keys[key] = None
+        if len(self._keys) > self.maxlen:
+            self._keys.popitem(last=False)
+        return False
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
@@ -46,6 +46,14 @@ For example, calling add_XX_filter methods multiple times to refine filter resul
     query.add_and_filter([    # Change filter to AND filter for further granularity
         InFilter(FieldValue(LogField.ALERTSEVERITY), [ConstantValue(Alerts.HIGH, Alerts.CRITICAL)]),
         InFilter(FieldValue(LogField.SRC), [IPValue('192.168.4.84')])])
+
+Filters can also be compiled into a predicate to re-filter records that
+have already been fetched, without making another query::
+
+    match = InFilter(FieldValue(LogField.SRC), [IPValue('10.0.0.0/8')]).compile()
+    internal = [record for record in records if match(record)]
+
+.. seealso:: :py:mod:`smc_monitoring.models.predicates`
     
 """
 
@@ -56,6 +64,21 @@ class QueryFilter(object):
     
     def update_filter(self, value):
         self.filter.update(value=value)
+    
+    def compile(self, field_format='id', field_map=None):
+        """
+        Compile this filter into a predicate that evaluates already
+        fetched records locally.
+        
+        .. seealso:: :py:func:`smc_monitoring.models.predicates.compile_filter`
+        
+        :param str field_format: field format of the evaluated records
+        :param dict field_map: optional field ID or name to record key mapping
+        :raises UnsupportedFilter: filter cannot be evaluated locally
+        :return: callable taking a record dict and returning a bool
+        """
+        from smc_monitoring.models.predicates import compile_filter
+        return compile_filter(self, field_format, field_map)
         
 
 class InFilter(QueryFilter):
@@ -0,0 +1,457 @@
+"""
+Predicates evaluate query filters locally against records that have already
+been fetched. The same filter objects used to build a query in
+:py:mod:`smc_monitoring.models.filters` are compiled once into a callable
+that takes a record dict and returns True when the record matches. IP
+values are compiled into hashed address sets and sorted intervals, and
+constant, string and service values into hashed sets, so evaluation does
+not need to re-parse the filter for every record.
+
+Compile a filter and evaluate a record::
+
+    match = compile_filter(
+        InFilter(FieldValue(LogField.SRC), [IPValue('172.18.1.0/24')]),
+        field_format='name')
+    match({'Src': '172.18.1.20'})    # True
+
+Records are keyed according to the ``field_format`` of the query that
+fetched them. For 'id' and 'name' formats, field IDs and field names are
+mapped automatically. For the 'pretty' format, provide a ``field_map`` of
+field ID or name to the record key::
+
+    match = compile_filter(my_filter, field_format='pretty',
+        field_map={LogField.SRC: 'Src Addr'})
+
+A single stream can be split into many filtered consumers with a
+:class:`~RecordSplitter` without opening additional queries::
+
+    splitter = RecordSplitter(field_format='name')
+    splitter.add(InFilter(FieldValue(LogField.SERVICE), [ServiceValue('UDP/53')]), dns.extend)
+    splitter.add(InFilter(FieldValue(LogField.SRC), [IPValue('10.0.0.0/8')]), internal.extend)
+
+    query = LogQuery(fetch_type='current')
+    query.format.field_format('name')
+    for records in query.fetch_raw():
+        splitter.dispatch(records)
+
+.. note:: Element values and case sensitive/insensitive LIKE filters need
+    the SMC to evaluate and cannot be compiled locally. Constant values are
+    compared against the raw record value, which is only present when the
+    query does not resolve values to text.
+"""
+import re
+import socket
+import binascii
+from bisect import bisect_right
+from smc_monitoring.models.constants import LogField
+
+
+class UnsupportedFilter(Exception):
+    """
+    The filter contains an expression that cannot be evaluated locally.
+    """
+    pass
+
+
+#: Protocol names to IP protocol numbers used by service values
+PROTOCOLS = {'ICMP': 1, 'TCP': 6, 'UDP': 17, 'GRE': 47, 'ESP': 50,
+             'AH': 51, 'ICMPV6': 58, 'IPV6-ICMP': 58, 'SCTP': 132}
+
+_FIELD_NAMES = {value: name for name, value in vars(LogField).items()
+                if isinstance(value, int) and not name.startswith('_')}
+
+
+def ip_to_int(value):
+    """
+    Convert an IPv4 or IPv6 address to a (version, int) tuple.
+
+    :param str value: IP address
+    :return: tuple of version and integer value, or None if the value
+        is not a valid address
+    """
+    try:
+        value = value.strip()
+        if ':' in value:
+            packed = socket.inet_pton(socket.AF_INET6, value)
+            return 6, int(binascii.hexlify(packed), 16)
+        octets = value.split('.')
+        if len(octets) != 4:
+            return None
+        number = 0
+        for octet in octets:
+            octet = int(octet)
+            if not 0 <= octet <= 255:
+                return None
+            number = number << 8 | octet
+        return 4, number
+    except (AttributeError, TypeError, ValueError, socket.error):
+        return None
+
+
+class IPSet(object):
+    """
+    Compiled set of IP addresses, networks and ranges. Single addresses
+    are stored in a hashed set, networks and ranges as merged and sorted
+    intervals searched with a binary search.
+
+    :param list values: addresses in the form '1.1.1.1', '1.1.1.0/24' or
+        '1.1.1.1-1.1.1.254'
+    :raises UnsupportedFilter: invalid address
+    """
+    def __init__(self, values):
+        self.addresses = set()
+        intervals = {}
+        for value in values:
+            value = str(value)
+            if '/' in value:
+                address, prefix = value.split('/', 1)
+                start = self._parse(address)
+                bits = 32 if start[0] == 4 else 128
+                size = 1 << (bits - int(prefix))
+                first = start[1] & ~(size - 1)
+                intervals.setdefault(start[0], []).append(
+                    (first, first + size - 1))
+            elif '-' in value:
+                first, last = [self._parse(ip) for ip in value.split('-', 1)]
+                intervals.setdefault(first[0], []).append((first[1], last[1]))
+            else:
+                self.addresses.add(self._parse(value))
+
+        self._starts, self._ends = {}, {}
+        for version, ranges in intervals.items():
+            merged = []
+            for start, end in sorted(ranges):
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            self._starts[version] = [start for start, _ in merged]
+            self._ends[version] = [end for _, end in merged]
+
+    @staticmethod
+    def _parse(value):
+        address = ip_to_int(value)
+        if address is None:
+            raise UnsupportedFilter('Invalid IP address value: %r' % value)
+        return address
+
+    def __contains__(self, value):
+        address = ip_to_int(value) if not isinstance(value, tuple) else value
+        if address is None:
+            return False
+        if address in self.addresses:
+            return True
+        starts = self._starts.get(address[0])
+        if starts:
+            index = bisect_right(starts, address[1]) - 1
+            return index >= 0 and address[1] <= self._ends[address[0]][index]
+        return False
+
+
+def _protocol_number(value):
+    """
+    Protocol number from a record value such as 6, '6' or 'TCP'.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        if value is None:
+            return None
+        return PROTOCOLS.get(str(value).split()[0].upper())
+
+
+class _FieldResolver(object):
+    """
+    Creates getters for field references based on the record field format.
+    """
+    def __init__(self, field_format='id', field_map=None):
+        self.field_format = field_format
+        self.field_map = field_map or {}
+
+    def getter(self, field):
+        """
+        Return a callable returning the value of the field from a record.
+
+        :param dict field: field value, i.e. {'type': 'field', 'id': 7}
+        """
+        ref = field.get('id', field.get('name'))
+        if ref in self.field_map:
+            key = self.field_map[ref]
+            return lambda record: record.get(key)
+
+        if self.field_format == 'id':
+            if 'id' in field:
+                key = str(field['id'])
+            else:
+                field_id = getattr(LogField, field['name'].upper(), None)
+                if field_id is None:
+                    raise UnsupportedFilter(
+                        'Unknown field name: %s' % field['name'])
+                key = str(field_id)
+            return lambda record: record.get(key)
+
+        if self.field_format == 'name':
+            if 'name' in field:
+                key = field['name']
+                return lambda record: record.get(key)
+            name = _FIELD_NAMES.get(field['id'])
+            if name is None:
+                raise UnsupportedFilter('Unknown field id: %s' % field['id'])
+            return _CaseInsensitiveGetter(name)
+
+        raise UnsupportedFilter(
+            'Field %r cannot be mapped to %r field format records. Provide '
+            'a field_map.' % (ref, self.field_format))
+
+    def service_getters(self):
+        """
+        The service field is not present in records, services are matched
+        using the protocol and destination port fields.
+        """
+        return (self.getter({'type': 'field', 'id': LogField.PROTOCOL}),
+                self.getter({'type': 'field', 'id': LogField.DPORT}))
+
+    def icmp_getters(self):
+        """
+        ICMP services are matched using the ICMP type and code fields.
+        """
+        return (self.getter({'type': 'field', 'id': LogField.ICMPTYPE}),
+                self.getter({'type': 'field', 'id': LogField.ICMPCODE}))
+
+
+class _CaseInsensitiveGetter(object):
+    """
+    Field names returned by the SMC are camel case whereas LogField
+    constants are upper case. The matching record key is found on first
+    use and cached.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.key = None
+
+    def __call__(self, record):
+        if self.key is None:
+            for key in record:
+                if key.upper() == self.name:
+                    self.key = key
+                    break
+            else:
+                return None
+        return record.get(self.key)
+
+
+def _is_service_field(field):
+    return field.get('type') == 'field' and (
+        field.get('id') == LogField.SERVICE or
+        str(field.get('name', '')).upper() == 'SERVICE')
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _service_matcher(values, resolver):
+    """
+    Match services in the form 'TCP/80' using the protocol and destination
+    port fields of the record, and 'ICMP/8/0' or 'ICMP/8' using the
+    protocol and the ICMP type and code fields.
+    """
+    services = set()
+    protocols = set()
+    icmp = set()
+    for value in values:
+        parts = value.split('/')
+        proto = _protocol_number(parts[0])
+        if proto is None:
+            raise UnsupportedFilter('Unknown service protocol: %s' % value)
+        try:
+            numbers = [int(part) for part in parts[1:]]
+        except ValueError:
+            raise UnsupportedFilter('Invalid service: %s' % value)
+        if not numbers:
+            protocols.add(proto)
+        elif proto in (6, 17, 132) and len(numbers) == 1:
+            services.add((proto, numbers[0]))
+        elif proto in (1, 58) and len(numbers) <= 2:
+            icmp.add((proto, numbers[0],
+                      numbers[1] if len(numbers) > 1 else None))
+        else:
+            raise UnsupportedFilter('Unsupported service: %s' % value)
+
+    get_proto, get_port = resolver.service_getters()
+    get_type, get_code = resolver.icmp_getters()
+
+    def match(record):
+        proto = _protocol_number(get_proto(record))
+        if proto in protocols:
+            return True
+        if icmp and proto in (1, 58):
+            icmp_type = _int(get_type(record))
+            return (proto, icmp_type, _int(get_code(record))) in icmp or \
+                (proto, icmp_type, None) in icmp
+        return (proto, _int(get_port(record))) in services
+    return match
+
+
+def _value_matchers(values):
+    """
+    Group right side values by type into compiled membership tests.
+    """
+    by_type = {}
+    for value in values:
+        by_type.setdefault(value.get('type'), []).append(value)
+
+    matchers = []
+    for value_type, entries in by_type.items():
+        if value_type == 'ip':
+            ipset = IPSet([entry['value'] for entry in entries])
+            matchers.append(lambda value, s=ipset: value is not None and value in s)
+        elif value_type in ('constant', 'string'):
+            constants = frozenset(str(entry['value']) for entry in entries)
+            matchers.append(lambda value, s=constants: str(value) in s)
+        else:
+            raise UnsupportedFilter(
+                'Values of type %r cannot be evaluated locally.' % value_type)
+    return matchers
+
+
+def _compile_in(filt, resolver):
+    left, right = filt['left'], filt['right']
+    if left.get('type') != 'field':
+        # Value IN (fields), i.e. IPValue in [FieldValue(SRC, DST)]
+        getters = [resolver.getter(field) for field in right
+                   if field.get('type') == 'field']
+        matchers = _value_matchers([left])
+        return lambda record: any(
+            m(get(record)) for get in getters for m in matchers)
+
+    if _is_service_field(left):
+        services = [v['value'] for v in right if v.get('type') == 'service']
+        others = [v for v in right if v.get('type') != 'service']
+        if others:
+            raise UnsupportedFilter('Service field can only be matched '
+                'using service values.')
+        return _service_matcher(services, resolver)
+
+    get = resolver.getter(left)
+    matchers = _value_matchers(right)
+    if len(matchers) == 1:
+        matcher = matchers[0]
+        return lambda record: matcher(get(record))
+    return lambda record: any(m(get(record)) for m in matchers)
+
+
+_TRANSLATED = re.compile(
+    r'^\s*\$(?P<field>\w+)\s+(?P<op>IN|==)\s+(?P<expr>.+?)\s*$')
+_TRANSLATED_VALUE = re.compile(r'ipv4(?:_net)?\("([^"]+)"\)')
+
+
+def _compile_translated(filt, resolver):
+    """
+    Compile expressions created by
+    :class:`smc_monitoring.models.filters.TranslatedFilter`.
+    """
+    expression = filt.get('value', '')
+    match = _TRANSLATED.match(expression)
+    if not match:
+        raise UnsupportedFilter(
+            'Translated expression cannot be evaluated: %s' % expression)
+    values = _TRANSLATED_VALUE.findall(match.group('expr'))
+    if not values:
+        raise UnsupportedFilter(
+            'Translated expression cannot be evaluated: %s' % expression)
+    if match.group('expr').startswith('range('):
+        values = ['-'.join(values)]
+
+    get = resolver.getter({'type': 'field', 'name': match.group('field')})
+    ipset = IPSet(values)
+    return lambda record: get(record) in ipset
+
+
+def _compile(filt, resolver):
+    filter_type = filt.get('type')
+    if filter_type == 'in':
+        return _compile_in(filt, resolver)
+
+    elif filter_type == 'and':
+        predicates = [_compile(f, resolver) for f in filt.get('values', [])]
+        return lambda record: all(p(record) for p in predicates)
+
+    elif filter_type == 'or':
+        predicates = [_compile(f, resolver) for f in filt.get('values', [])]
+        return lambda record: any(p(record) for p in predicates)
+
+    elif filter_type == 'not':
+        predicate = _compile(filt['value'], resolver)
+        return lambda record: not predicate(record)
+
+    elif filter_type == 'defined':
+        get = resolver.getter(filt['value'])
+        return lambda record: get(record) not in (None, '')
+
+    elif filter_type == 'translated':
+        return _compile_translated(filt, resolver)
+
+    raise UnsupportedFilter(
+        'Filter type %r cannot be evaluated locally.' % filter_type)
+
+
+def compile_filter(filt, field_format='id', field_map=None):
+    """
+    Compile a query filter into a predicate that can be evaluated against
+    records locally.
+
+    :param filt: filter to compile
+    :type filt: QueryFilter or dict
+    :param str field_format: field format of the records that will be
+        evaluated, 'id', 'name' or 'pretty' (default: 'id')
+    :param dict field_map: optional mapping of field ID or name to the
+        record key. Required when records use the 'pretty' format.
+    :raises UnsupportedFilter: filter cannot be evaluated locally
+    :return: callable taking a record dict and returning a bool
+    """
+    filt = getattr(filt, 'filter', filt)
+    return _compile(filt, _FieldResolver(field_format, field_map))
+
+
+class RecordSplitter(object):
+    """
+    Fan out records from a single stream to many consumers, each with its
+    own filter. Filters are compiled once when added.
+
+    :param str field_format: field format of the records
+    :param dict field_map: optional field ID or name to record key mapping
+    """
+    def __init__(self, field_format='id', field_map=None):
+        self.field_format = field_format
+        self.field_map = field_map
+        self.routes = []
+
+    def add(self, filt, consumer):
+        """
+        Add a consumer that receives the list of matching records of each
+        dispatched batch. Consumers are only called when at least one record
+        of a batch matches.
+
+        :param filt: filter to match, or None to receive all records
+        :param callable consumer: takes a list of records
+        """
+        predicate = compile_filter(filt, self.field_format, self.field_map) \
+            if filt is not None else None
+        self.routes.append((predicate, consumer))
+
+    def dispatch(self, records):
+        """
+        Evaluate a batch of records against each filter and send matches
+        to the consumers.
+
+        :param list records: list of record dicts
+        """
+        for predicate, consumer in self.routes:
+            matches = records if predicate is None else \
+                [record for record in records if predicate(record)]
+            if matches:
+                consumer(matches)
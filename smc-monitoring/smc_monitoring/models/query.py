@@ -22,6 +22,8 @@ from smc_monitoring.models.filters import TranslatedFilter, InFilter, \
     AndFilter, OrFilter, NotFilter, DefinedFilter
 from smc_monitoring.models.formats import TextFormat, DetailedFormat
 from smc_monitoring.models.formatters import TableFormat
+from smc_monitoring.models.constants import LogField
+from smc_monitoring.models.statetable import StateTable, StateTableMirror
 
 
 class Query(object):
@@ -34,7 +36,12 @@ class Query(object):
     
     :ivar dict request: built request, eventually sent to socket
     :ivar TextFormat format: format settings for query
+    :ivar list key_fields: LogField constants that uniquely identify a
+        record of this query type. Required to mirror the query into a
+        state table.
     """
+    key_fields = None
+    
     def __init__(self, definition=None, target=None,
                  format=None, **sockopt):  # @ReservedAssignment
         """
@@ -325,6 +332,71 @@ class Query(object):
             if 'records' in results and results['records'].get('added'):
                 yield fmt.formatted(results['records']['added'])
     
+    def fetch_delta(self):
+        """
+        Fetch the record changes for this query as they are received. Unlike
+        :meth:`.fetch_raw`, updated and removed records are also returned.
+        Each result is a dict with one or more of the keys 'added', 'updated'
+        and 'removed' holding a list of records. This fetch continues until
+        the connection is closed.
+        
+        :return: generator of record deltas
+        :rtype: dict(list)
+        """
+        with SMCSocketProtocol(self, **self.sockopt) as protocol:
+            for result in protocol.receive():
+                records = result.get('records')
+                if not records:
+                    continue
+                if isinstance(records, dict):
+                    delta = {action: records[action]
+                             for action in ('added', 'updated', 'removed')
+                             if records.get(action)}
+                else:
+                    delta = {'added': records}
+                if delta:
+                    yield delta
+    
+    def mirror(self, key=None, max_events=10000):
+        """
+        Mirror the results of this query into an in memory state table.
+        The returned mirror keeps a single query open and applies added,
+        updated and removed records as they are received. The original
+        query is not modified. Records in the table use the 'id' field
+        format.
+        
+        .. seealso:: :py:mod:`smc_monitoring.models.statetable`
+        
+        :param key: optional callable taking a record and returning a
+            hashable key. By default the query ``key_fields`` are used.
+        :param int max_events: max number of buffered change events
+        :raises ValueError: query type has no key fields and no key
+            was provided
+        :rtype: StateTableMirror
+        """
+        if key is None and not self.key_fields:
+            raise ValueError('%s does not define key_fields, provide a key '
+                'callable to mirror this query.' % self.__class__.__name__)
+        
+        clone = self.copy()
+        fmt = TextFormat(field_format='id')
+        if 'resolving' in self.format.data:
+            fmt.set_resolving(**self.format.data['resolving'])
+        
+        # Custom fields must include the fields used to key the table
+        field_ids = self.format.data.get('field_ids')
+        if field_ids or self.format.data.get('field_names'):
+            field_ids = list(field_ids or [])
+            required = [LogField.NODEID] + list(self.key_fields or [])
+            field_ids.extend(f for f in required if f not in field_ids)
+            fmt.field_ids(field_ids)
+            if self.format.data.get('field_names'):
+                fmt.field_names(self.format.data['field_names'])
+        clone.update_format(fmt)
+        
+        table = StateTable(key_fields=self.key_fields, key=key)
+        return StateTableMirror(clone, table, max_events=max_events)
+    
     def fetch_as_element(self):
         """
         Each inheriting class will override this method if supported.
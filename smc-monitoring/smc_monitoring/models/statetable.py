@@ -0,0 +1,294 @@
+"""
+State tables mirror the session monitors (connections, blacklist, etc) of
+one or more engines in memory. Instead of fetching a full snapshot on every
+poll, a single query is kept open and each delta message received from the
+SMC (records added, updated or removed) is applied to a keyed table. The
+current table can then be read at any time without a round trip to the SMC.
+
+Each record is stored under a key built from the query ``key_fields`` and
+grouped by the engine (node) that reported it.
+
+Mirror the connection table of an engine and print changes as they arrive::
+
+    query = ConnectionQuery('sg_vm')
+    with query.mirror() as mirror:
+        for change in mirror.changes():
+            print(change)
+
+Read the current table at any time::
+
+    mirror = BlacklistQuery('sg_vm').mirror()
+    mirror.start()
+    ...
+    print(len(mirror.table))
+    for record in mirror.table.records(engine='sg_vm node 1'):
+        ...
+    mirror.stop()
+
+Callbacks can be registered on the table to receive each
+:class:`~StateChange` as it is applied::
+
+    mirror.table.add_listener(my_callable)
+
+.. note:: Records in a state table are returned in the 'id' field format,
+    meaning record keys are the string value of the
+    :class:`smc_monitoring.models.constants.LogField` constant.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from smc_monitoring.models.constants import LogField
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+logger = logging.getLogger(__name__)
+
+
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
+
+
+class StateChange(object):
+    """
+    A single change applied to a :class:`~StateTable`.
+
+    :ivar str action: 'added', 'updated' or 'removed'
+    :ivar str engine: engine/node reporting the record
+    :ivar key: record key within the table
+    :ivar dict record: the current record, or the removed record
+    :ivar dict previous: record before an update, otherwise None
+    """
+    __slots__ = ('action', 'engine', 'key', 'record', 'previous')
+
+    def __init__(self, action, engine, key, record, previous=None):
+        self.action = action
+        self.engine = engine
+        self.key = key
+        self.record = record
+        self.previous = previous
+
+    def __repr__(self):
+        return '%s(action=%s,engine=%s,key=%r)' % (
+            self.__class__.__name__, self.action, self.engine, self.key)
+
+
+class StateTable(object):
+    """
+    In memory table of monitoring records keyed per engine. Delta messages
+    are applied with :meth:`~apply`. The table is safe to read from other
+    threads while deltas are applied.
+
+    :param list key_fields: LogField constants that uniquely identify a record
+    :param key: optional callable taking a record dict and returning a
+        hashable key. Overrides key_fields.
+    :param engine_field: LogField constant identifying the engine
+        (default: LogField.NODEID)
+    """
+    def __init__(self, key_fields=None, key=None, engine_field=LogField.NODEID):
+        if key is None:
+            if not key_fields:
+                raise ValueError('A state table requires key_fields or a '
+                    'key callable to identify records.')
+            fields = [str(field) for field in key_fields]
+            key = lambda record: tuple(record.get(f) for f in fields)
+        self._key = key
+        self._engine_field = str(engine_field)
+        self._tables = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def add_listener(self, callback):
+        """
+        Add a callable that is called with each :class:`~StateChange`
+        applied to the table.
+
+        :param callable callback: takes a single StateChange argument
+        """
+        if callable(callback):
+            self._listeners.append(callback)
+
+    def apply(self, delta):
+        """
+        Apply a delta message to the table. The delta is a dict with
+        optional 'added', 'updated' and 'removed' lists of records. An
+        update for an unknown record is applied as an add and removal of
+        an unknown record is ignored.
+
+        :param dict delta: records message from the monitoring socket
+        :return: changes applied to the table
+        :rtype: list(StateChange)
+        """
+        changes = []
+        with self._lock:
+            for action in (ADDED, UPDATED):
+                for record in delta.get(action, []):
+                    engine = record.get(self._engine_field)
+                    key = self._key(record)
+                    table = self._tables.setdefault(engine, OrderedDict())
+                    previous = table.get(key)
+                    table[key] = record
+                    if previous is None:
+                        changes.append(StateChange(ADDED, engine, key, record))
+                    elif previous != record:
+                        changes.append(StateChange(
+                            UPDATED, engine, key, record, previous))
+
+            for record in delta.get(REMOVED, []):
+                engine = record.get(self._engine_field)
+                key = self._key(record)
+                removed = self._tables.get(engine, {}).pop(key, None)
+                if removed is not None:
+                    changes.append(StateChange(REMOVED, engine, key, removed))
+
+        for change in changes:
+            for callback in self._listeners:
+                callback(change)
+        return changes
+
+    def get(self, key, engine=None):
+        """
+        Get a record by key. If engine is not provided, all engines are
+        searched.
+
+        :return: record dict or None
+        """
+        with self._lock:
+            if engine is not None:
+                return self._tables.get(engine, {}).get(key)
+            for table in self._tables.values():
+                if key in table:
+                    return table[key]
+
+    def records(self, engine=None):
+        """
+        Current records in the table, optionally for a single engine.
+
+        :param str engine: engine/node name
+        :rtype: list(dict)
+        """
+        with self._lock:
+            if engine is not None:
+                return list(self._tables.get(engine, {}).values())
+            return [record for table in self._tables.values()
+                    for record in table.values()]
+
+    def engines(self):
+        """
+        Engines that currently have records in the table.
+
+        :rtype: list(str)
+        """
+        with self._lock:
+            return [engine for engine, table in self._tables.items() if table]
+
+    def clear(self):
+        """
+        Remove all records without generating change events. Used when a
+        new snapshot is about to be received.
+        """
+        with self._lock:
+            self._tables.clear()
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(table) for table in self._tables.values())
+
+    def __repr__(self):
+        return '%s(records: %s)' % (self.__class__.__name__, len(self))
+
+
+class StateTableMirror(object):
+    """
+    Runs a query in a background thread and applies each delta received
+    to a :class:`~StateTable`. Obtain a mirror by calling ``mirror()`` on
+    a query that supports it, for example
+    :meth:`smc_monitoring.monitors.connections.ConnectionQuery.mirror`.
+
+    :param Query query: query providing the deltas
+    :param StateTable table: table to apply deltas to
+    :param int max_events: max number of change events buffered for
+        :meth:`~changes`. When the buffer is full, new events are dropped
+        but are still applied to the table.
+    """
+    def __init__(self, query, table, max_events=10000):
+        self.query = query
+        self.table = table
+        self._events = queue.Queue(maxsize=max_events)
+        self._stop = threading.Event()
+        self._thread = None
+        self.table.add_listener(self._buffer)
+
+    def _buffer(self, change):
+        try:
+            self._events.put_nowait(change)
+        except queue.Full:
+            logger.debug('State table event buffer full, dropping: %s', change)
+
+    def start(self):
+        """
+        Start mirroring in a background thread.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self.table.clear()
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            for delta in self.query.fetch_delta():
+                if self._stop.is_set():
+                    break
+                self.table.apply(delta)
+        except Exception as e:
+            logger.error('State table mirror stopped with error: %s', e)
+        finally:
+            self._stop.set()
+
+    def stop(self):
+        """
+        Stop mirroring. The table retains the last known state.
+        """
+        self._stop.set()
+
+    @property
+    def running(self):
+        """
+        Whether the mirror is still receiving deltas
+
+        :rtype: bool
+        """
+        return self._thread is not None and not self._stop.is_set()
+
+    def changes(self, timeout=1):
+        """
+        Generator yielding :class:`~StateChange` events as they are applied
+        to the table. The generator ends when the mirror is stopped and all
+        buffered events have been returned.
+
+        :param int timeout: seconds to wait for an event before checking
+            whether the mirror is still running
+        :rtype: StateChange
+        """
+        while True:
+            try:
+                yield self._events.get(timeout=timeout)
+            except queue.Empty:
+                if not self.running:
+                    return
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exctype, value, traceback):
+        self.stop()
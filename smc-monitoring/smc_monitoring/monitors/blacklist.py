@@ -38,6 +38,15 @@ Delete any blacklist entries with a source IP within a network range of 3.3.3.0/
         for record in query.fetch_as_element():    # <-- must get as element to obtain delete() method
             record.delete()
         
+Keep the blacklist of an engine mirrored in memory and read the current
+entries without re-fetching::
+
+    mirror = BlacklistQuery('sg_vm').mirror().start()
+    ...
+    for record in mirror.table.records():
+        ...
+    mirror.stop()
+
 .. seealso:: :class:`smc_monitoring.models.filters` for more information on creating filters
         
 """
@@ -73,6 +82,9 @@ class BlacklistQuery(Query):
         LogField.NODEID,
         LogField.SENDERDOMAIN,
         LogField.BLACKLISTENTRYID]
+    key_fields = [
+        LogField.NODEID,
+        LogField.BLACKLISTENTRYID]
 
     def __init__(self, target, timezone=None, **kw):
     
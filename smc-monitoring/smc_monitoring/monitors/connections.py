@@ -32,6 +32,13 @@ Retrieving live streaming results::
 
     for records in query.fetch_live():
         ...
+
+Mirror the connection table in memory and consume changes as they arrive
+(added, updated and removed connections)::
+
+    with query.mirror() as mirror:
+        for change in mirror.changes():
+            ...
     
 .. seealso:: :class:`smc_monitoring.models.filters` for more information on creating filters
 
@@ -63,6 +70,13 @@ class ConnectionQuery(Query):
         LogField.IPSAPPID,
         LogField.PROTOCOL,
         LogField.STATE]
+    key_fields = [
+        LogField.NODEID,
+        LogField.SRC,
+        LogField.SPORT,
+        LogField.DST,
+        LogField.DPORT,
+        LogField.PROTOCOL]
     
     def __init__(self, target, **kw):
         super(ConnectionQuery, self).__init__('CONNECTIONS', target, **kw)
@@ -0,0 +1,184 @@
+"""
+A fleet query runs the same monitor against many engines concurrently and
+merges the results into a single stream. Each target is queried in its own
+socket session by a bounded pool of worker threads. Every returned record
+is tagged with the target it was retrieved from.
+
+Fetch all VPN SA's for every engine, 20 engines at a time::
+
+    query = FleetQuery(VPNSAQuery, Engine.objects.all(), max_workers=20)
+    for result in query.fetch_as_element():
+        print(result.target, result.record)
+
+Targets that fail or do not complete within the per target timeout do not
+interrupt the stream and are reported separately once the stream finishes::
+
+    query = FleetQuery(UserQuery, ['fw1', 'fw2', 'fw3'], timeout=30)
+    for result in query.fetch_raw():
+        ...
+    print(query.completed)   # ['fw1', 'fw3']
+    print(query.failures)    # {'fw2': InvalidFetch(...)}
+    print(query.timeouts)    # {}
+
+Keyword arguments that are not consumed by the fleet query are passed to
+the monitor constructor, for example to set socket options::
+
+    FleetQuery(SSLVPNQuery, targets, sock_timeout=1)
+"""
+import time
+import logging
+import threading
+from collections import namedtuple
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+logger = logging.getLogger(__name__)
+
+
+#: A record returned from a fleet query tagged with the target name
+FleetRecord = namedtuple('FleetRecord', 'target record')
+
+
+class FleetQuery(object):
+    """
+    Run a monitor query against many targets concurrently.
+
+    :param query_cls: monitor class from :py:mod:`smc_monitoring.monitors`
+        that takes the target as the first constructor argument, i.e.
+        VPNSAQuery, UserQuery, SSLVPNQuery, ConnectionQuery
+    :param targets: engine names or elements with a ``name`` attribute
+    :type targets: list(str,Engine)
+    :param int max_workers: max number of concurrent socket sessions
+    :param int timeout: max seconds allowed per target before the target
+        is abandoned and reported in ``timeouts``
+    :param callable configure: optional callable taking the query instance
+        for each target, used to add filters or change the format
+    :param kw: keyword arguments passed to the monitor constructor
+
+    :ivar list completed: targets that returned successfully
+    :ivar dict failures: target name to exception for failed targets
+    :ivar dict timeouts: target name to elapsed seconds for targets that
+        exceeded the timeout
+    """
+    def __init__(self, query_cls, targets, max_workers=10, timeout=60,
+                 configure=None, **kw):
+        self.query_cls = query_cls
+        self.targets = [getattr(target, 'name', target) for target in targets]
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.configure = configure
+        self.query_kw = kw
+        self.completed = []
+        self.failures = {}
+        self.timeouts = {}
+
+    def fetch_raw(self, **kw):
+        """
+        Fetch raw dict records from all targets. Keyword arguments are
+        passed to the monitors ``fetch_raw`` method.
+
+        :return: generator of records tagged with their target
+        :rtype: FleetRecord
+        """
+        return self._run('fetch_raw', flatten=True, **kw)
+
+    def fetch_as_element(self, **kw):
+        """
+        Fetch records from all targets as the monitors element type.
+        Keyword arguments are passed to the monitors ``fetch_as_element``
+        method.
+
+        :return: generator of elements tagged with their target
+        :rtype: FleetRecord
+        """
+        return self._run('fetch_as_element', **kw)
+
+    def _worker(self, pending, results, abandoned, method, flatten, kw):
+        while True:
+            try:
+                target = pending.get_nowait()
+            except queue.Empty:
+                return
+            results.put(('start', target, time.time()))
+            try:
+                query = self.query_cls(target, **self.query_kw)
+                if self.configure is not None:
+                    self.configure(query)
+                for result in getattr(query, method)(**kw):
+                    if target in abandoned:
+                        break
+                    if flatten and isinstance(result, list):
+                        for record in result:
+                            results.put(('record', target, record))
+                    else:
+                        results.put(('record', target, result))
+            except Exception as e:
+                results.put(('failure', target, e))
+            else:
+                results.put(('done', target, None))
+            if target in abandoned:
+                # Target timed out, a replacement worker was started
+                return
+
+    def _start_worker(self, *args):
+        thread = threading.Thread(target=self._worker, args=args)
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, method, flatten=False, **kw):
+        self.completed, self.failures, self.timeouts = [], {}, {}
+        pending, results = queue.Queue(), queue.Queue()
+        abandoned = set()
+        for target in self.targets:
+            pending.put(target)
+
+        args = (pending, results, abandoned, method, flatten, kw)
+        for _ in range(min(self.max_workers, len(self.targets))):
+            self._start_worker(*args)
+
+        started = {}
+        remaining = len(self.targets)
+        while remaining:
+            try:
+                event, target, value = results.get(timeout=1)
+            except queue.Empty:
+                event = None
+
+            if event is not None and target not in abandoned:
+                if event == 'start':
+                    started[target] = value
+                elif event == 'record':
+                    yield FleetRecord(target, value)
+                elif event == 'done':
+                    started.pop(target, None)
+                    self.completed.append(target)
+                    remaining -= 1
+                elif event == 'failure':
+                    started.pop(target, None)
+                    logger.error('Fleet query failed for target %s: %s',
+                        target, value)
+                    self.failures[target] = value
+                    remaining -= 1
+
+            if self.timeout:
+                now = time.time()
+                for target, start in list(started.items()):
+                    if now - start > self.timeout:
+                        logger.error('Fleet query timed out for target: %s',
+                            target)
+                        del started[target]
+                        abandoned.add(target)
+                        self.timeouts[target] = now - start
+                        remaining -= 1
+                        # The stuck worker is abandoned, keep the pool size
+                        if not pending.empty():
+                            self._start_worker(*args)
+
+    def __repr__(self):
+        return '%s(query=%s,targets: %s)' % (
+            self.__class__.__name__, self.query_cls.__name__,
+            len(self.targets))
@@ -77,11 +77,32 @@ filtering for only HIGH alerts with a source address of 192.168.4.84::
 .. seealso:: :py:mod:`smc.monitoring.filters` for information on how to use and
     combine filters for a query.
 
+A live stream can also be tailed. A tail survives socket disconnects by
+reconnecting with an exponential backoff and backfilling the gap from the
+stored logs, starting from the last record delivered. Records seen twice
+across a reconnect are suppressed::
+
+    query = LogQuery()
+    cursor = TailCursor()
+    for log in query.fetch_tail(cursor=cursor):
+        ...
+
+.. seealso:: :py:mod:`smc_monitoring.models.cursor` for saving and restoring
+    the tail position.
+
 '''
-from smc_monitoring.models.calendar import TimeFormat
+import time
+import logging
+from websocket import WebSocketException
+from smc_monitoring.models.calendar import TimeFormat, current_millis
 from smc_monitoring.models.query import Query
 from smc_monitoring.models.constants import LogField
 from smc_monitoring.models.formatters import TableFormat
+from smc_monitoring.models.formats import CombinedFormat, RawFormat
+from smc_monitoring.models.cursor import TailCursor, RecentKeys
+
+
+logger = logging.getLogger(__name__)
 
 
 class LogQuery(Query):
@@ -150,18 +171,25 @@ class LogQuery(Query):
         if 'quantity' in self.request['fetch']:
             return self.request['fetch']['quantity']
         
-    def fetch_raw(self):
+    def fetch_raw(self, max_recv=None):
         """
         Execute the query and return by batches.
         Optional keyword arguments are passed to Query.execute(). Whether
         this is real-time or stored logs is dependent on the value of
         ``fetch_type``.
         
+        :param int max_recv: max number of batches to return before closing
+            the query. None returns batches until the query ends (default:
+            None)
         :return: generator of dict results
         """
+        iteration = 0
         for results in super(LogQuery, self).execute():
             if 'records' in results and results['records']:
                 yield results['records']
+                iteration += 1
+                if iteration == max_recv:
+                    return
     
     def fetch_batch(self, formatter=TableFormat):
         """
@@ -199,4 +227,116 @@ class LogQuery(Query):
         fmt = formatter(clone)
         for result in clone.fetch_raw():
             yield fmt.formatted(result)
-        
+
+    def fetch_tail(self, formatter=TableFormat, cursor=None, key=None,
+                   recent_keys=10000, backoff=1, max_backoff=60,
+                   max_retries=None):
+        """
+        Tail logs in real-time and survive connection loss. When the web
+        socket closes or cannot be opened, the tail reconnects using an
+        exponential backoff and first backfills any records stored since
+        the cursor position before resuming the live stream. Duplicate
+        records delivered across the reconnect are suppressed using a
+        bounded set of the most recent record keys.
+
+        :param formatter: Formatter type for data representation. Any type
+            in :py:mod:`smc_monitoring.models.formatters`.
+        :param TailCursor cursor: optional cursor to resume from. The cursor
+            is advanced as records are yielded and can be saved by the caller.
+        :param key: optional callable taking a record dict and returning a
+            hashable key used for duplicate suppression. By default the
+            record field/value pairs are used.
+        :param int recent_keys: number of record keys retained for duplicate
+            suppression (default: 10000)
+        :param int backoff: initial reconnect delay in seconds (default: 1)
+        :param int max_backoff: max reconnect delay in seconds (default: 60)
+        :param int max_retries: number of consecutive failed reconnects before
+            the tail ends. None will retry forever (default: None)
+        :return: generator of formatted results
+        """
+        cursor = cursor if cursor is not None else TailCursor()
+        record_key = key if key is not None else _record_key
+        recent = RecentKeys(recent_keys)
+        fmt = formatter(self.copy())
+        retries, delay = 0, backoff
+        while True:
+            received = False
+            for records in self._tail_records(cursor):
+                received = True
+                batch = []
+                for record in records:
+                    data = record.get('data', {})
+                    timestamp = _record_timestamp(record)
+                    rkey = (timestamp, record_key(data))
+                    if recent.seen(rkey):
+                        continue
+                    cursor.advance(timestamp, rkey)
+                    batch.append(data)
+                if batch:
+                    yield fmt.formatted(batch)
+            
+            if received:
+                retries, delay = 0, backoff
+            else:
+                retries += 1
+                if max_retries is not None and retries > max_retries:
+                    logger.info('Tail ended after %s failed reconnects.',
+                        max_retries)
+                    return
+            
+            logger.info('Tail stream closed, reconnecting in %s seconds. '
+                'Cursor: %s', delay, cursor)
+            time.sleep(delay)
+            delay = min(delay * 2, max_backoff)
+
+    def _tail_records(self, cursor):
+        """
+        Generator returning raw combined records for a tail. If the cursor
+        has a position, all stored logs from that position are returned
+        before the live stream. The live stream is read until the connection
+        closes. Connection failures end the generator.
+        """
+        queries = []
+        if cursor.timestamp is not None:
+            queries.append(self._tail_query('stored', cursor.timestamp))
+        queries.append(self._tail_query('current'))
+        try:
+            for query in queries:
+                for records in query.fetch_raw(max_recv=None):
+                    yield records
+        except (IOError, OSError, WebSocketException) as e:
+            logger.info('Tail connection failed: %s', e)
+
+    def _tail_query(self, fetch_type, start_ms=None):
+        """
+        Build a clone of this query used by the tail. Records are returned
+        in a combined format with the query format under the 'data' key
+        and the raw timestamp under the 'cursor' key.
+        """
+        clone = self.copy()
+        position = RawFormat(field_format='id')
+        position.field_ids([LogField.TIMESTAMP])
+        clone.update_format(CombinedFormat(data=self.format, cursor=position))
+        clone.update_query(type=fetch_type)
+        if start_ms is not None:
+            clone.time_range.custom_range(start_ms, current_millis())
+            clone.request['fetch'] = {'backwards': False}
+        return clone
+
+
+def _record_timestamp(record):
+    """
+    Timestamp in milliseconds from a tail record or None if unavailable.
+    """
+    timestamp = record.get('cursor', {}).get(str(LogField.TIMESTAMP))
+    try:
+        return int(timestamp)
+    except (TypeError, ValueError):
+        return None
+
+
+def _record_key(data):
+    """
+    Default record key for duplicate suppression in a tail.
+    """
+    return tuple(sorted((k, str(v)) for k, v in data.items()))
@@ -3,10 +3,15 @@ Created on Sep 24, 2017
 
 @author: davidlepage
 '''
+import logging
+import threading
 from smc.base.model import Element
 from smc_monitoring.wsocket import SMCSocketProtocol
 
    
+logger = logging.getLogger(__name__)
+
+
 EVENT_ACTIONS = set(['create', 'update', 'delete', 'trashed', 'untrashed', 'validating', 'validated'])
 
     
@@ -128,4 +133,35 @@ class Event(object):
         return '%s(subscription_id=%s,action=%s,element=%s)' % \
             (self.__class__.__name__, self.subscription_id, self.action,
              self._element)
-                
\ No newline at end of file
+                
+
+def wake_on_change(scheduler, context='*', **kw):
+    """
+    Wake resources registered on a :class:`~smc.base.scheduler.PollScheduler`
+    when the SMC publishes a change for the element. Waiters and tasks
+    polled by the scheduler are then queried immediately instead of at
+    their next interval. Runs in a daemon thread::
+
+        scheduler = PollScheduler(interval=30)
+        wake_on_change(scheduler, 'single_fw,cluster_virtual_fw')
+        waiter = NodeStatusWaiter(node, 'Online', scheduler=scheduler)
+
+    :param PollScheduler scheduler: scheduler to wake
+    :param str context: entry points to subscribe to, all by default
+    :param kw: socket options passed to the notification
+    :return: notification thread
+    :rtype: threading.Thread
+    """
+    def run():
+        try:
+            for result in Notification(context, **kw).notify():
+                for event in result.get('events', []):
+                    if event.get('element'):
+                        scheduler.wake(event['element'])
+        except Exception as e:
+            logger.error('Notification wakeup stopped: %s', e)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return thread
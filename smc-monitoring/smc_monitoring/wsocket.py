@@ -177,7 +177,7 @@ class SMCSocketProtocol(websocket.WebSocket):
                     (self.sock, ), (), (), 10)
                 
                 if r:
-                    message = json.loads(self.recv())
+                    message = session.codec.loads(self.recv())
                     
                     if 'fetch' in message:
                         self.fetch_id = message['fetch']
@@ -0,0 +1,65 @@
+import time
+import unittest
+from smc_monitoring.monitors.fleet import FleetQuery
+
+
+class FakeQuery(object):
+    """
+    Stand in for a monitor query. Behavior is based on the target name.
+    """
+    def __init__(self, target, **kw):
+        self.target = target
+        self.kw = kw
+
+    def fetch_raw(self, **kw):
+        if self.target == 'broken':
+            raise ValueError('no session')
+        if self.target == 'stuck':
+            time.sleep(3)
+        yield [{'user': '%s-a' % self.target}, {'user': '%s-b' % self.target}]
+
+    def fetch_as_element(self, **kw):
+        for records in self.fetch_raw(**kw):
+            for record in records:
+                yield record['user']
+
+
+class Name(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class Test(unittest.TestCase):
+
+    def test_fleet_fetch_raw(self):
+        targets = ['fw1', Name('fw2'), 'broken', 'fw3']
+        query = FleetQuery(FakeQuery, targets, max_workers=2)
+        results = list(query.fetch_raw())
+        self.assertEqual(len(results), 6)
+        self.assertEqual(
+            sorted(r.record['user'] for r in results if r.target == 'fw2'),
+            ['fw2-a', 'fw2-b'])
+        self.assertEqual(sorted(query.completed), ['fw1', 'fw2', 'fw3'])
+        self.assertEqual(list(query.failures), ['broken'])
+        self.assertIsInstance(query.failures['broken'], ValueError)
+        self.assertEqual(query.timeouts, {})
+
+    def test_fleet_timeout(self):
+        query = FleetQuery(FakeQuery, ['stuck', 'fw1', 'fw2'],
+                           max_workers=1, timeout=1)
+        results = list(query.fetch_as_element())
+        self.assertEqual(sorted(r.record for r in results),
+                         ['fw1-a', 'fw1-b', 'fw2-a', 'fw2-b'])
+        self.assertEqual(list(query.timeouts), ['stuck'])
+        self.assertEqual(sorted(query.completed), ['fw1', 'fw2'])
+
+    def test_configure(self):
+        configured = []
+        query = FleetQuery(FakeQuery, ['fw1'], configure=configured.append,
+                           sock_timeout=1)
+        list(query.fetch_raw())
+        self.assertEqual(configured[0].kw, {'sock_timeout': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+from smc_monitoring.models.values import FieldValue, IPValue, ServiceValue,\
+    StringValue, ConstantValue, ElementValue
+from smc_monitoring.models.filters import InFilter, AndFilter, DefinedFilter,\
+    NotFilter, OrFilter, TranslatedFilter
+from smc_monitoring.models.constants import LogField, Actions
+from smc_monitoring.models.predicates import compile_filter, IPSet,\
+    RecordSplitter, UnsupportedFilter
+
+
+class Element(object):
+    href = 'http://1.1.1.1:8082/6.4/elements/host/1'
+
+
+class Test(unittest.TestCase):
+
+    def test_ipset(self):
+        ipset = IPSet(['10.0.0.1', '192.168.1.0/24', '172.16.0.10-172.16.0.20',
+                       '192.168.1.128/25', '2001:db8::/32'])
+        self.assertIn('10.0.0.1', ipset)
+        self.assertNotIn('10.0.0.2', ipset)
+        self.assertIn('192.168.1.255', ipset)
+        self.assertNotIn('192.168.2.0', ipset)
+        self.assertIn('172.16.0.15', ipset)
+        self.assertNotIn('172.16.0.21', ipset)
+        self.assertIn('2001:db8::1', ipset)
+        self.assertNotIn('2001:db9::1', ipset)
+        self.assertNotIn('not an ip', ipset)
+        self.assertNotIn(None, ipset)
+
+    def test_in_filter_id_format(self):
+        match = InFilter(
+            FieldValue(LogField.SRC),
+            [IPValue('192.168.4.0/24', '10.0.0.1')]).compile()
+        self.assertTrue(match({'7': '192.168.4.84'}))
+        self.assertTrue(match({'7': '10.0.0.1'}))
+        self.assertFalse(match({'7': '10.0.0.2'}))
+        self.assertFalse(match({'8': '10.0.0.1'}))
+
+    def test_in_filter_name_format(self):
+        # Field referenced by id, record keyed by SMC name
+        match = compile_filter(
+            InFilter(FieldValue(LogField.SRC), [IPValue('1.1.1.1')]),
+            field_format='name')
+        self.assertTrue(match({'Src': '1.1.1.1'}))
+        # Field referenced by name, record keyed by id
+        match = compile_filter(
+            InFilter(FieldValue('Src'), [IPValue('1.1.1.1')]))
+        self.assertTrue(match({'7': '1.1.1.1'}))
+
+    def test_ip_in_fields(self):
+        match = InFilter(
+            IPValue('1.1.1.1'),
+            [FieldValue(LogField.SRC, LogField.DST)]).compile()
+        self.assertTrue(match({'7': '2.2.2.2', '8': '1.1.1.1'}))
+        self.assertFalse(match({'7': '2.2.2.2', '8': '3.3.3.3'}))
+
+    def test_service_constant_string(self):
+        service = InFilter(
+            FieldValue(LogField.SERVICE), [ServiceValue('TCP/80', 'UDP/53', 'ICMP')]).compile()
+        self.assertTrue(service({'11': 'TCP', '10': '80'}))
+        self.assertTrue(service({'11': '17', '10': 53}))
+        self.assertTrue(service({'11': 'ICMP'}))
+        self.assertFalse(service({'11': 'TCP', '10': '443'}))
+
+        icmp = InFilter(
+            FieldValue(LogField.SERVICE),
+            [ServiceValue('ICMP/8/0', 'ICMPV6/128', 'TCP/22')]).compile()
+        self.assertTrue(icmp({'11': 'ICMP', '100': '8', '101': '0'}))
+        self.assertFalse(icmp({'11': 'ICMP', '100': '0', '101': '0'}))
+        self.assertFalse(icmp({'11': 'ICMP', '100': '8', '101': '1'}))
+        self.assertFalse(icmp({'11': '1'}))
+        self.assertTrue(icmp({'11': '58', '100': 128, '101': 5}))
+        self.assertTrue(icmp({'11': 'TCP', '10': '22'}))
+        self.assertFalse(icmp({'11': 'ICMP', '10': '22'}))
+
+        for value in ('GRE/1', 'ICMP/8/0/1', 'TCP/22/1', 'TCP/ssh'):
+            with self.assertRaises(UnsupportedFilter):
+                InFilter(FieldValue(LogField.SERVICE),
+                         [ServiceValue(value)]).compile()
+
+        action = InFilter(
+            FieldValue(LogField.ACTION),
+            [ConstantValue(Actions.DISCARD, Actions.BLOCK)]).compile()
+        self.assertTrue(action({'14': 0}))
+        self.assertFalse(action({'14': 1}))
+
+        host = InFilter(
+            FieldValue(LogField.HTTPREQUESTHOST),
+            [StringValue('play.googleapis.com')]).compile()
+        self.assertTrue(host({str(LogField.HTTPREQUESTHOST): 'play.googleapis.com'}))
+
+    def test_boolean_filters(self):
+        src = InFilter(FieldValue(LogField.SRC), [IPValue('172.18.1.20')])
+        dns = InFilter(FieldValue(LogField.SERVICE), [ServiceValue('UDP/53')])
+        match = AndFilter([NotFilter([dns]), src,
+                           DefinedFilter(FieldValue(LogField.ACTION))]).compile()
+        self.assertTrue(match({'7': '172.18.1.20', '11': 'TCP', '10': '80', '14': 1}))
+        self.assertFalse(match({'7': '172.18.1.20', '11': 'UDP', '10': '53', '14': 1}))
+        self.assertFalse(match({'7': '172.18.1.20', '11': 'TCP', '10': '80'}))
+
+        match = OrFilter([src, dns]).compile()
+        self.assertTrue(match({'7': '1.1.1.1', '11': 'UDP', '10': '53'}))
+        self.assertFalse(match({'7': '1.1.1.1', '11': 'TCP', '10': '53'}))
+
+    def test_translated_filter(self):
+        translated = TranslatedFilter()
+        translated.within_ipv4_range('$Src', ['1.1.1.1-1.1.1.254'])
+        match = translated.compile(field_format='name')
+        self.assertTrue(match({'Src': '1.1.1.100'}))
+        self.assertFalse(match({'Src': '1.1.2.1'}))
+
+        translated.within_ipv4_network('$Dst', ['192.168.4.0/24'])
+        self.assertTrue(translated.compile()({'8': '192.168.4.1'}))
+
+        translated.exact_ipv4_match('$Src', ['172.18.1.152'])
+        self.assertTrue(translated.compile()({'7': '172.18.1.152'}))
+
+    def test_unsupported(self):
+        self.assertRaises(UnsupportedFilter, compile_filter, InFilter(
+            FieldValue(LogField.SRC), [ElementValue(Element())]))
+        self.assertRaises(UnsupportedFilter, compile_filter, InFilter(
+            FieldValue(LogField.SRC), [IPValue('1.1.1.1')]), field_format='pretty')
+        match = compile_filter(
+            InFilter(FieldValue(LogField.SRC), [IPValue('1.1.1.1')]),
+            field_format='pretty', field_map={LogField.SRC: 'Src Addr'})
+        self.assertTrue(match({'Src Addr': '1.1.1.1'}))
+
+    def test_splitter(self):
+        internal, dns, everything = [], [], []
+        splitter = RecordSplitter()
+        splitter.add(InFilter(FieldValue(LogField.SRC), [IPValue('10.0.0.0/8')]),
+                     internal.extend)
+        splitter.add(InFilter(FieldValue(LogField.SERVICE), [ServiceValue('UDP/53')]),
+                     dns.extend)
+        splitter.add(None, everything.extend)
+        splitter.dispatch([
+            {'7': '10.1.1.1', '11': 'TCP', '10': '80'},
+            {'7': '8.8.8.8', '11': 'UDP', '10': '53'}])
+        self.assertEqual(len(internal), 1)
+        self.assertEqual(len(dns), 1)
+        self.assertEqual(len(everything), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
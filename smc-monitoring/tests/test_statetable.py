@@ -0,0 +1,86 @@
+import unittest
+from smc_monitoring.monitors.connections import ConnectionQuery
+from smc_monitoring.monitors.blacklist import BlacklistQuery
+from smc_monitoring.models.statetable import StateTable
+from smc_monitoring.models.constants import LogField
+
+
+def cxn(node, src, sport, state='TCP established'):
+    return {'4': node, '7': src, '9': sport, '8': '2.2.2.2',
+            '10': '443', '11': 'TCP', '116': state}
+
+
+class ReplayConnectionQuery(ConnectionQuery):
+    deltas = []
+
+    def fetch_delta(self):
+        for delta in self.deltas:
+            yield delta
+
+
+class Test(unittest.TestCase):
+
+    def test_apply_deltas(self):
+        table = StateTable(key_fields=ConnectionQuery.key_fields)
+        events = []
+        table.add_listener(events.append)
+
+        changes = table.apply({'added': [cxn('fw1', '1.1.1.1', '1000'),
+                                         cxn('fw2', '1.1.1.2', '1001')]})
+        self.assertEqual([c.action for c in changes], ['added', 'added'])
+        self.assertEqual(len(table), 2)
+        self.assertEqual(sorted(table.engines()), ['fw1', 'fw2'])
+
+        # Update an existing record, unchanged records emit no event
+        changes = table.apply({
+            'updated': [cxn('fw1', '1.1.1.1', '1000', 'TCP closing'),
+                        cxn('fw2', '1.1.1.2', '1001')]})
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].action, 'updated')
+        self.assertEqual(changes[0].previous['116'], 'TCP established')
+        self.assertEqual(table.records('fw1')[0]['116'], 'TCP closing')
+
+        # Remove known and unknown records
+        changes = table.apply({
+            'removed': [cxn('fw2', '1.1.1.2', '1001'),
+                        cxn('fw2', '9.9.9.9', '1')]})
+        self.assertEqual([c.action for c in changes], ['removed'])
+        self.assertEqual(table.engines(), ['fw1'])
+        self.assertEqual(len(events), 4)
+
+        key = ('fw1', '1.1.1.1', '1000', '2.2.2.2', '443', 'TCP')
+        self.assertIsNotNone(table.get(key))
+        self.assertIsNotNone(table.get(key, engine='fw1'))
+        self.assertIsNone(table.get(key, engine='fw2'))
+
+    def test_table_requires_key(self):
+        self.assertRaises(ValueError, StateTable)
+
+    def test_mirror_query(self):
+        query = BlacklistQuery('sg_vm')
+        query.format.field_ids([LogField.TIMESTAMP])
+        mirror = query.mirror()
+        fmt = mirror.query.request['format']
+        self.assertEqual(fmt['field_format'], 'id')
+        self.assertEqual(
+            fmt['field_ids'],
+            [LogField.TIMESTAMP, LogField.NODEID, LogField.BLACKLISTENTRYID])
+        # Original query is unchanged
+        self.assertEqual(query.format.data['field_format'], 'pretty')
+        self.assertEqual(query.format.data['field_ids'], [LogField.TIMESTAMP])
+
+    def test_mirror_run(self):
+        ReplayConnectionQuery.deltas = [
+            {'added': [cxn('fw1', '1.1.1.1', '1000')]},
+            {'removed': [cxn('fw1', '1.1.1.1', '1000')],
+             'added': [cxn('fw1', '1.1.1.3', '1003')]}]
+        mirror = ReplayConnectionQuery('fw1').mirror()
+        with mirror:
+            actions = [change.action for change in mirror.changes(timeout=0.1)]
+        self.assertEqual(actions, ['added', 'added', 'removed'])
+        self.assertEqual(len(mirror.table), 1)
+        self.assertFalse(mirror.running)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from smc_monitoring.monitors.logs import LogQuery
+from smc_monitoring.models.cursor import TailCursor, RecentKeys
+from smc_monitoring.models.formatters import RawDictFormat
+
+
+def record(timestamp, src):
+    return {'cursor': {'1': timestamp},
+            'data': {'Creation Time': str(timestamp), 'Src': src}}
+
+
+class ReplayLogQuery(LogQuery):
+    """
+    LogQuery that replays canned batches instead of opening a socket.
+    Each connection pops the next list of batches from `connections` and
+    closes after `max_recv` batches. The default bounds the connection to a
+    single batch so a tail that does not read the full stream is detected.
+    """
+    connections = []
+    requests = []
+    max_recvs = []
+
+    def fetch_raw(self, max_recv=1):
+        ReplayLogQuery.requests.append(self.request)
+        ReplayLogQuery.max_recvs.append(max_recv)
+        if ReplayLogQuery.connections:
+            batches = ReplayLogQuery.connections.pop(0)
+            for iteration, batch in enumerate(batches, 1):
+                yield batch
+                if iteration == max_recv:
+                    return
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        ReplayLogQuery.connections = []
+        ReplayLogQuery.requests = []
+        ReplayLogQuery.max_recvs = []
+
+    def test_recent_keys(self):
+        recent = RecentKeys(maxlen=2)
+        self.assertFalse(recent.seen('a'))
+        self.assertFalse(recent.seen('b'))
+        self.assertTrue(recent.seen('a'))  # refresh 'a'
+        self.assertFalse(recent.seen('c'))  # evicts 'b'
+        self.assertIn('a', recent)
+        self.assertNotIn('b', recent)
+        self.assertEqual(len(recent), 2)
+
+    def test_cursor_advance(self):
+        cursor = TailCursor()
+        self.assertTrue(cursor.advance(100, 'x'))
+        self.assertFalse(cursor.advance(50, 'y'))
+        self.assertFalse(cursor.advance(None, 'z'))
+        self.assertEqual(cursor.as_dict(), {'timestamp': 100, 'key': 'x'})
+        restored = TailCursor(**cursor.as_dict())
+        self.assertEqual(restored.timestamp, 100)
+
+    def test_tail_reconnect_backfill_dedup(self):
+        ReplayLogQuery.connections = [
+            # live stream, then dropped
+            [[record(100, '1.1.1.1'), record(200, '2.2.2.2')]],
+            # backfill of the gap, overlaps the last delivered record
+            [[record(200, '2.2.2.2'), record(300, '3.3.3.3')]],
+            # new live stream repeats the backfilled record
+            [[record(300, '3.3.3.3'), record(400, '4.4.4.4')]]]
+
+        cursor = TailCursor()
+        query = ReplayLogQuery(format=None)
+        results = []
+        for batch in query.fetch_tail(formatter=RawDictFormat, cursor=cursor,
+                                      backoff=0, max_retries=0):
+            results.extend(batch)
+
+        self.assertEqual(
+            [r['Src'] for r in results],
+            ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4'])
+        self.assertEqual(cursor.timestamp, 400)
+
+        # First connection is live, reconnect backfills from the cursor
+        query_types = [r['query']['type'] for r in ReplayLogQuery.requests]
+        self.assertEqual(query_types[:3], ['current', 'stored', 'current'])
+        backfill = ReplayLogQuery.requests[1]
+        self.assertEqual(backfill['query']['start_ms'], 200)
+        self.assertEqual(backfill['fetch'], {'backwards': False})
+        self.assertEqual(backfill['format']['type'], 'combined')
+
+        # Original query is not modified
+        self.assertEqual(query.request['query']['type'], 'stored')
+        self.assertEqual(query.format.data['type'], 'texts')
+
+    def test_tail_multiple_batches(self):
+        ReplayLogQuery.connections = [
+            # live stream delivers several batches before it is dropped
+            [[record(100, '1.1.1.1')], [record(200, '2.2.2.2')],
+             [record(300, '3.3.3.3')]],
+            # backfill is returned in several pages
+            [[record(300, '3.3.3.3')], [record(400, '4.4.4.4')],
+             [record(500, '5.5.5.5')]],
+            [[record(600, '6.6.6.6')], [record(700, '7.7.7.7')]]]
+
+        cursor = TailCursor()
+        query = ReplayLogQuery(format=None)
+        results = []
+        for batch in query.fetch_tail(formatter=RawDictFormat, cursor=cursor,
+                                      backoff=0, max_retries=0):
+            results.extend(batch)
+
+        self.assertEqual(
+            [r['Src'] for r in results],
+            ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4', '5.5.5.5',
+             '6.6.6.6', '7.7.7.7'])
+        self.assertEqual(cursor.timestamp, 700)
+        # Each batch was read on a single connection, without reconnecting
+        query_types = [r['query']['type'] for r in ReplayLogQuery.requests]
+        self.assertEqual(query_types[:3], ['current', 'stored', 'current'])
+        self.assertTrue(all(max_recv is None
+                            for max_recv in ReplayLogQuery.max_recvs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,344 @@
+"""
+Stream elements from archives created by
+:meth:`~smc.administration.system.System.export_elements` and import large
+archives in chunks.
+
+Exported elements are parsed incrementally from the archive without
+extracting it, so memory use does not grow with the size of the export.
+Elements can be filtered and transformed while reading::
+
+    >>> archive = ExportArchive('export_elements.zip')
+    >>> for typeof, data in archive.elements(types=['host']):
+    ...     print(data['name'])
+
+    >>> archive.count(types=['host', 'network'])
+    10250
+    >>> def rename(typeof, data):
+    ...     data['name'] = 'migrated-' + data['name']
+    ...     return data
+    ...
+    >>> for typeof, data in archive.elements(transform=rename):
+    ...     print(typeof, data['name'])
+
+A large archive can be imported as a sequence of smaller imports. The
+archive is split into chunk archives which are imported one at a time.
+Progress is saved to a state file after each chunk, so running the same
+import again after a failure resumes with the chunk that failed::
+
+    >>> importer = ChunkedImport('export_elements.zip', chunk_size=500,
+    ...                          transform=rename)
+    >>> importer.run(callback=print)
+    ImportProgress(chunk=1, chunks=21, filename='.../export_elements_0001.zip', elements=500)
+    ...
+
+Elements are written to the chunks in the order of the archive. Since the
+SMC exports referenced elements before the elements referencing them,
+references are resolved by the time a chunk is imported.
+"""
+import os
+import json
+import zipfile
+import collections
+from xml.etree import ElementTree
+from smc.base.archive import open_archive, iter_xml, iter_json, \
+    dict_to_node, write_xml
+
+
+#: Progress after importing a chunk
+ImportProgress = collections.namedtuple(
+    'ImportProgress', 'chunk chunks filename elements')
+
+
+class ExportArchive(object):
+    """
+    Streaming reader for element export archives. XML and JSON members of
+    the archive are parsed incrementally.
+
+    :param str filename: path to export zip
+    :raises IOError: file is not a valid zip
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        open_archive(filename).close()
+        #: Root node tag, attributes and prolog of XML members, by member
+        #: name
+        self.roots = {}
+
+    @property
+    def members(self):
+        """
+        XML and JSON members of the archive
+
+        :rtype: list(str)
+        """
+        archive = open_archive(self.filename)
+        try:
+            return [name for name in archive.namelist()
+                    if name.lower().endswith(('.xml', '.json'))]
+        finally:
+            archive.close()
+
+    def iter_members(self):
+        """
+        Generator of (member, typeof, data) for each element in the
+        archive, in order.
+
+        :return: generator of tuple
+        """
+        for member, _key, typeof, data in self._entries():
+            yield member, typeof, data
+
+    def _entries(self):
+        """
+        Elements of the archive as (member, key, typeof, data), where key
+        is the list the element was read from in a JSON member, or the
+        node tag in an XML member.
+        """
+        archive = open_archive(self.filename)
+        try:
+            for member in self.members:
+                with archive.open(member) as fileobj:
+                    if member.lower().endswith('.json'):
+                        for key, data in iter_json(fileobj):
+                            if isinstance(data, dict):
+                                yield member, key, data.get('type', key), data
+                    else:
+                        root = self.roots.setdefault(member, {})
+                        for typeof, data in iter_xml(fileobj, root):
+                            yield member, typeof, typeof, data
+        finally:
+            archive.close()
+
+    def elements(self, types=None, where=None, transform=None):
+        """
+        Generator of (typeof, data) for elements in the archive.
+
+        :param list types: only return elements of these types
+        :param callable where: callable taking (typeof, data) returning
+            True if the element should be returned
+        :param callable transform: callable taking (typeof, data) and
+            returning the data to return, or None to skip the element
+        :return: generator of (typeof, dict)
+        """
+        for _member, _key, typeof, data in self._filtered(
+                types, where, transform):
+            yield typeof, data
+
+    def _filtered(self, types, where, transform):
+        for member, key, typeof, data in self._entries():
+            if types and typeof not in types:
+                continue
+            if where is not None and not where(typeof, data):
+                continue
+            if transform is not None:
+                data = transform(typeof, data)
+                if data is None:
+                    continue
+            yield member, key, typeof, data
+
+    def count(self, types=None, where=None):
+        """
+        Number of elements in the archive.
+
+        :param list types: only count elements of these types
+        :param callable where: callable taking (typeof, data) returning
+            True if the element should be counted
+        :rtype: int
+        """
+        return sum(1 for _ in self.elements(types, where))
+
+    def split(self, chunk_size, directory, types=None, where=None,
+              transform=None):
+        """
+        Write the elements to chunk archives of at most `chunk_size`
+        elements, in the format of the member they were read from. Chunks
+        are named after the archive, i.e. export_0001.zip.
+
+        :param int chunk_size: max number of elements per chunk
+        :param str directory: directory to write chunks to
+        :param list types: only include elements of these types
+        :param callable where: callable taking (typeof, data) returning
+            True if the element should be included
+        :param callable transform: callable taking (typeof, data) and
+            returning the data to write, or None to skip the element
+        :return: list of (filename, number of elements)
+        :rtype: list(tuple)
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        prefix = os.path.splitext(os.path.basename(self.filename))[0]
+        chunks, pending = [], []
+
+        def write():
+            filename = os.path.join(directory, '{}_{:04d}.zip'.format(
+                prefix, len(chunks) + 1))
+            self._write_chunk(filename, pending)
+            chunks.append((filename, len(pending)))
+            del pending[:]
+
+        for element in self._filtered(types, where, transform):
+            pending.append(element)
+            if len(pending) >= chunk_size:
+                write()
+        if pending:
+            write()
+        return chunks
+
+    def _write_chunk(self, filename, elements):
+        members = collections.OrderedDict()
+        for member, key, _typeof, data in elements:
+            members.setdefault(member, []).append((key, data))
+
+        with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for member, items in members.items():
+                if member.lower().endswith('.json'):
+                    # Items are written back to the list they were read
+                    # from, or to a top level list if the document was one
+                    if all(key is None for key, _data in items):
+                        content = [data for _key, data in items]
+                    else:
+                        content = collections.OrderedDict()
+                        for key, data in items:
+                            content.setdefault(key, []).append(data)
+                    archive.writestr(member, json.dumps(content))
+                else:
+                    root = self.roots.get(member, {})
+                    node = ElementTree.Element(
+                        root.get('tag', 'generic_import_export'),
+                        root.get('attrib', {}))
+                    for tag, data in items:
+                        node.append(dict_to_node(tag, data))
+                    archive.writestr(member, write_xml(
+                        node, root.get('prolog')))
+
+    def __repr__(self):
+        return '%s(filename=%s)' % (self.__class__.__name__, self.filename)
+
+
+class ChunkedImport(object):
+    """
+    Import an export archive as a sequence of smaller imports.
+
+    The archive is split on first run and the chunks and the number of
+    chunks imported are saved in the state file. Running again with the
+    same archive and chunk size resumes after the last imported chunk.
+    Filters and transforms are applied when splitting, so provide the
+    same arguments when resuming.
+
+    :param str filename: path to export zip
+    :param int chunk_size: max number of elements per import
+    :param str directory: directory for chunks and the state file. By
+        default, <filename>.chunks next to the archive.
+    :param list types: only import elements of these types
+    :param callable where: callable taking (typeof, data) returning True
+        if the element should be imported
+    :param callable transform: callable taking (typeof, data) and
+        returning the data to import, or None to skip the element
+    """
+    def __init__(self, filename, chunk_size=500, directory=None, types=None,
+                 where=None, transform=None):
+        self.archive = ExportArchive(filename)
+        self.chunk_size = chunk_size
+        self.directory = directory or '{}.chunks'.format(
+            os.path.splitext(filename)[0])
+        self.state_file = os.path.join(self.directory, 'import_state.json')
+        self._filters = (types, where, transform)
+        self._state = None
+
+    @property
+    def state(self):
+        """
+        Saved state of the import, a dict with the source archive, chunk
+        size, chunks and the number of chunks completed
+
+        :rtype: dict
+        """
+        if self._state is None:
+            source = os.path.abspath(self.archive.filename)
+            try:
+                with open(self.state_file) as f:
+                    state = json.load(f)
+            except (IOError, ValueError):
+                state = {}
+            if state.get('source') != source or \
+                state.get('size') != os.path.getsize(source) or \
+                state.get('chunk_size') != self.chunk_size or \
+                    not all(os.path.exists(filename)
+                            for filename, _count in state.get('chunks', [])):
+                state = {'source': source, 'size': os.path.getsize(source),
+                         'chunk_size': self.chunk_size, 'chunks': None,
+                         'completed': 0}
+            self._state = state
+        return self._state
+
+    def _save(self):
+        with open(self.state_file, 'w') as f:
+            json.dump(self.state, f)
+
+    @property
+    def chunks(self):
+        """
+        Chunk archives and number of elements in each, splitting the
+        archive if not already split
+
+        :rtype: list(tuple)
+        """
+        if self.state['chunks'] is None:
+            self.state['chunks'] = self.archive.split(
+                self.chunk_size, self.directory, *self._filters)
+            self.state['completed'] = 0
+            self._save()
+        return [tuple(chunk) for chunk in self.state['chunks']]
+
+    @property
+    def completed(self):
+        """
+        Number of chunks imported
+
+        :rtype: int
+        """
+        return self.state['completed']
+
+    def run(self, callback=None):
+        """
+        Import the remaining chunks in sequence.
+
+        :param callable callback: called with :class:`ImportProgress` after
+            each chunk is imported
+        :raises ActionCommandFailed: import of a chunk failed. Running
+            again resumes with this chunk.
+        :return: number of chunks imported by this run
+        :rtype: int
+        """
+        from smc.administration.system import System
+        system = System()
+        chunks = self.chunks
+        imported = 0
+        for index in range(self.completed, len(chunks)):
+            filename, count = chunks[index]
+            system.import_elements(filename)
+            self.state['completed'] = index + 1
+            self._save()
+            imported += 1
+            if callback is not None:
+                callback(ImportProgress(index + 1, len(chunks), filename, count))
+        return imported
+
+    def cleanup(self):
+        """
+        Remove the chunk archives, state file and the directory if empty.
+
+        :return: None
+        """
+        for filename, _count in self.state.get('chunks') or []:
+            if os.path.exists(filename):
+                os.remove(filename)
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+        if os.path.isdir(self.directory) and not os.listdir(self.directory):
+            os.rmdir(self.directory)
+        self._state = None
+
+    def __repr__(self):
+        return '%s(filename=%s, completed=%s)' % (
+            self.__class__.__name__, self.archive.filename, self.completed)
@@ -43,11 +43,41 @@ Generate a report based on an existing or created report design::
     2018-01-07 15:32:56.422000
     >>> report.export_pdf(filename='/foo/bar/a.pdf')
 
+Generate the same designs for many senders and periods using a
+:class:`ReportBatch`. Reports are generated with bounded concurrency, all
+tasks are polled by a single shared scheduler and each report is exported
+as soon as its task completes::
+
+    >>> batch = ReportBatch(
+    ...     [ReportDesign('Firewall Weekly Summary')],
+    ...     senders=list(Engine.objects.all()),
+    ...     periods=[(datetime(2018, 5, 1), datetime(2018, 6, 1)),
+    ...              (datetime(2018, 6, 1), datetime(2018, 7, 1))],
+    ...     directory='/reports', max_concurrent=20)
+    >>> for result in batch.run():
+    ...     print(result.job, result.filename, result.error)
+
 """
+import os
+import re
+import datetime
+import logging
+import itertools
+import threading
+import collections
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 from smc.base.model import Element
 from smc.administration.tasks import Task
-from smc.base.util import datetime_from_ms, element_resolver
-from smc.api.exceptions import CreateElementFailed
+from smc.base.util import datetime_from_ms, element_resolver, \
+    datetime_to_ms, millis_to_utc
+from smc.base.scheduler import PollScheduler
+from smc.api.exceptions import CreateElementFailed, TaskRunFailed
+
+
+logger = logging.getLogger(__name__)
 
 
 class ReportDesign(Element):
@@ -221,3 +251,293 @@ class Report(Element):
 
         if not filename:
             return result.content
+
+
+#: A report to generate. Senders is a tuple of elements used to filter
+#: the report, or None. Start and end time are in milliseconds, 0 when
+#: using the period of the design.
+ReportJob = collections.namedtuple(
+    'ReportJob', 'design senders start_time end_time')
+
+#: Result of a report job. Report is the generated report and filename the
+#: exported file, or None if not exported. Error is the exception raised,
+#: or None if successful.
+ReportResult = collections.namedtuple(
+    'ReportResult', 'job report filename error')
+
+
+def _as_ms(value):
+    if isinstance(value, datetime.datetime):
+        return datetime_to_ms(value)
+    return value or 0
+
+
+def report_filename(job, extension):
+    """
+    Default filename for an exported report, made of the design name,
+    sender names and the period in UTC, i.e.
+    ``Firewall_Weekly_Summary_fw1_201805010000-201806010000.pdf``.
+
+    :param ReportJob job: report job
+    :param str extension: file extension
+    :rtype: str
+    """
+    parts = [job.design.name]
+    if job.senders:
+        parts.append('-'.join(sender.name for sender in job.senders))
+    if job.start_time and job.end_time:
+        parts.append('-'.join(millis_to_utc(ms).strftime('%Y%m%d%H%M')
+                              for ms in (job.start_time, job.end_time)))
+    return '{}.{}'.format(
+        re.sub(r'[^\w.-]+', '_', '_'.join(parts)), extension)
+
+
+class ReportBatch(object):
+    """
+    Generates reports for every combination of design, senders and
+    period. Reports are generated with bounded concurrency and their
+    tasks are polled by a single shared
+    :class:`~smc.base.scheduler.PollScheduler`. Each report is exported
+    by a pool of download threads as soon as its task completes, so
+    generating and exporting overlap.
+
+    The batch runs in a background thread once started. Use :meth:`wait`
+    or :meth:`done` to monitor completion and :attr:`progress` for the
+    aggregated progress.
+
+    :param list designs: ReportDesign elements
+    :param list senders: senders to generate a report for. Each item is an
+        element or a list of elements used together as the report filter.
+        If None, reports are generated without a sender filter.
+    :param list periods: list of (start, end) tuples as datetime or
+        milliseconds. If None, the period of the design is used.
+    :param str directory: directory to export reports to. If None,
+        reports are not exported and are only provided to the callback.
+    :param str export_format: pdf or txt
+    :param callable callback: called with each :class:`ReportResult` from
+        a download thread when the report is complete
+    :param callable filename: callable taking the ReportJob and extension
+        and returning the filename in directory. See
+        :func:`report_filename`.
+    :param int max_concurrent: max number of reports being generated
+    :param int max_downloads: max number of concurrent exports
+    :param int interval: seconds between task status queries
+    :param int max_tries: max number of status queries per report
+    :param PollScheduler scheduler: scheduler used to poll the tasks. A
+        new scheduler is used if not provided.
+    :ivar list jobs: ReportJob for each report to generate
+    :ivar dict results: job to :class:`ReportResult` for completed jobs
+    """
+    def __init__(self, designs, senders=None, periods=None, directory=None,
+                 export_format='pdf', callback=None, filename=None,
+                 max_concurrent=10, max_downloads=4, interval=5,
+                 max_tries=360, scheduler=None):
+        if export_format not in ('pdf', 'txt'):
+            raise ValueError('Invalid export format: {}'.format(export_format))
+        senders = [None] if senders is None else [
+            tuple(sender) if isinstance(sender, (list, tuple)) else
+            (sender,) if sender is not None else None for sender in senders]
+        periods = [(0, 0)] if periods is None else periods
+        # Jobs are unique as they are used to key the results
+        self.jobs = list(collections.OrderedDict.fromkeys(
+            ReportJob(design, sender, _as_ms(start), _as_ms(end))
+            for design, sender, (start, end) in itertools.product(
+                designs, senders, periods)))
+        self.directory = directory
+        self.export_format = export_format
+        self.callback = callback
+        self.filename = filename or report_filename
+        self.max_concurrent = max_concurrent
+        self.max_downloads = max_downloads
+        self.interval = interval
+        self.max_tries = max_tries
+        self.scheduler = scheduler if scheduler is not None else \
+            PollScheduler(interval=interval, max_interval=interval * 4)
+        self.results = collections.OrderedDict()
+        self._pollers = {}
+        # Jobs queued for download, a job may complete more than once
+        # when the task finishes while the callback is added
+        self._queued = set()
+        self._downloads = queue.Queue()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the batch in a background thread.
+
+        :return: self
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def run(self):
+        """
+        Run the batch and block until all reports completed.
+
+        :return: results in the order of the jobs
+        :rtype: list(ReportResult)
+        """
+        self.start().wait()
+        return [self.results[job] for job in self.jobs]
+
+    def wait(self, timeout=None):
+        """
+        Blocking wait for the batch to complete.
+
+        :param int timeout: max seconds to wait
+        :return: None
+        """
+        self._done.wait(timeout)
+
+    def done(self):
+        """
+        Are all reports complete
+
+        :rtype: bool
+        """
+        return self._done.is_set()
+
+    @property
+    def failed(self):
+        """
+        Results of reports that failed
+
+        :rtype: list(ReportResult)
+        """
+        return [result for result in self.results.values() if result.error]
+
+    @property
+    def progress(self):
+        """
+        Aggregated percentage of completion across all reports. Reports
+        being exported count as 100.
+
+        :rtype: int
+        """
+        if not self.jobs:
+            return 100
+        with self._lock:
+            total = 100 * len(self.results)
+            for job, poller in self._pollers.items():
+                total += 100 if poller.done() else (poller.task.progress or 0)
+        return int(min(total, 100 * len(self.jobs)) / len(self.jobs))
+
+    def _finish(self, job, report=None, filename=None, error=None):
+        result = ReportResult(job, report, filename, error)
+        with self._lock:
+            self.results[job] = result
+            self._pollers.pop(job, None)
+        if self.callback is not None:
+            try:
+                self.callback(result)
+            except Exception:
+                logger.exception('Report callback failed for %s', job)
+        self._changed.set()
+
+    def _generate(self, job):
+        try:
+            poller = job.design.generate(
+                start_time=job.start_time, end_time=job.end_time,
+                senders=list(job.senders) if job.senders else None,
+                wait_for_finish=True,
+                timeout=self.interval, max_tries=self.max_tries,
+                scheduler=self.scheduler)
+        except Exception as e:
+            self._finish(job, error=e)
+            return
+        with self._lock:
+            self._pollers[job] = poller
+        try:
+            poller.add_done_callback(lambda task: self._completed(job))
+        except ValueError: # Already finished
+            pass
+        # The task may finish between checking and adding the callback,
+        # in which case the callback is never run
+        if poller.done():
+            self._completed(job)
+
+    def _completed(self, job):
+        with self._lock:
+            if job in self._queued:
+                return
+            self._queued.add(job)
+        self._downloads.put(job)
+        self._changed.set()
+
+    def _export(self, job):
+        task = self._pollers[job].task
+        if task.in_progress:
+            raise TaskRunFailed('Report did not complete after {} status '
+                'queries: {}'.format(self.max_tries, task.last_message))
+        if not task.success:
+            raise TaskRunFailed(task.last_message)
+        report = next((resource for resource in task.resource
+                       if isinstance(resource, Report)), None)
+        if report is None:
+            raise TaskRunFailed('Report task completed without a report: {}'
+                .format(task.last_message))
+        filename = None
+        if self.directory is not None:
+            filename = os.path.join(
+                self.directory, self.filename(job, self.export_format))
+            if self.export_format == 'pdf':
+                report.export_pdf(filename)
+            else:
+                report.export_text(filename)
+        return report, filename
+
+    def _download(self):
+        while True:
+            job = self._downloads.get()
+            if job is None:
+                return
+            try:
+                report, filename = self._export(job)
+            except Exception as e:
+                self._finish(job, error=e)
+            else:
+                self._finish(job, report, filename)
+
+    def _run(self):
+        workers = []
+        try:
+            if self.directory is not None and \
+                    not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            for _ in range(max(1, self.max_downloads)):
+                worker = threading.Thread(target=self._download)
+                worker.daemon = True
+                worker.start()
+                workers.append(worker)
+
+            pending = collections.deque(self.jobs)
+            while len(self.results) < len(self.jobs):
+                with self._lock:
+                    running = sum(1 for poller in self._pollers.values()
+                                  if not poller.done())
+                while pending and running < self.max_concurrent:
+                    self._generate(pending.popleft())
+                    running += 1
+                self._changed.wait(1)
+                self._changed.clear()
+        except Exception as e:
+            logger.exception('Report batch failed')
+            with self._lock:
+                remaining = [job for job in self.jobs
+                             if job not in self.results]
+            for job in remaining:
+                self._finish(job, error=e)
+        finally:
+            for _ in workers:
+                self._downloads.put(None)
+            self._done.set()
+
+    def __repr__(self):
+        return '%s(jobs=%s,progress=%s)' % (
+            self.__class__.__name__, len(self.jobs), self.progress)
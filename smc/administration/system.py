@@ -262,6 +262,9 @@ class System(SubElement):
         :param filename: Name of file for export
         :raises TaskRunFailed: failure during export with reason
         :rtype: DownloadTask
+        
+        .. seealso:: :class:`smc.administration.export.ExportArchive` to
+            read the elements of an export
         """
         valid_types = ['all', 'nw', 'ips', 'sv', 'rb', 'al', 'vpn']
         if typeof not in valid_types:
@@ -290,6 +293,9 @@ class System(SubElement):
         :param str import_file: system level path to file
         :raises: ActionCommandFailed
         :return: None
+        
+        .. seealso:: :class:`smc.administration.export.ChunkedImport` to
+            import large files in chunks
         """
         self.make_request(
             method='create',
@@ -15,6 +15,14 @@ An example of using a task poller when uploading an engine policy
         print("Task Progress {}%".format(poller.task.progress))
     print(poller.last_message())
 
+When running many tasks, such as uploading policy to a large number of
+engines, pass a shared :class:`~smc.base.scheduler.PollScheduler` to
+poll all tasks from a single thread::
+
+    scheduler = PollScheduler(interval=5)
+    pollers = [engine.refresh(wait_for_finish=True, scheduler=scheduler)
+               for engine in Engine.objects.all()]
+
 """
 import re
 import time
@@ -207,22 +215,37 @@ class TaskOperationPoller(object):
     for the status of the task operation. This is returned
     by functions that return a task. Typically these will be
     operations like refreshing policy, uploading policy, etc.
+
+    :param dict task: task json returned from the SMC
+    :param int timeout: seconds between task status queries
+    :param int max_tries: max number of task status queries
+    :param bool wait_for_finish: poll the task until it completes
+    :param PollScheduler scheduler: optional shared scheduler used to poll
+        the task status instead of starting a thread for this task
     """
     def __init__(self, task, timeout=5, max_tries=36,
-                 wait_for_finish=False):
+                 wait_for_finish=False, scheduler=None):
         self._task = Task(task)
         self._thread = None
         self._done = None
         self._exception = None
+        self._scheduler = None
         self.callbacks = [] # Call after operation completes
         if wait_for_finish:
             self._max_tries = max_tries
             self._timeout = timeout
             self._done = threading.Event()
-            self._thread = threading.Thread(
-                target=self._start)
-            self._thread.daemon = True
-            self._thread.start()
+            if scheduler is not None and self._task.href:
+                self._scheduler = scheduler
+                scheduler.register(
+                    self._task.href, self._task.update_status,
+                    self._on_status, interval=timeout,
+                    compare=lambda task: (task.progress, task.in_progress))
+            else:
+                self._thread = threading.Thread(
+                    target=self._start)
+                self._thread.daemon = True
+                self._thread.start()
 
     def _start(self):
         while not self.finished():
@@ -238,6 +261,22 @@ class TaskOperationPoller(object):
         for call in self.callbacks:
             call(self.task)
 
+    def _on_status(self, task):
+        # Called by the scheduler with the updated Task or exception
+        if self._done.is_set():
+            return True
+        if isinstance(task, Exception):
+            self._exception = task
+        else:
+            self._task = task
+            self._max_tries -= 1
+            if not self.finished():
+                return False
+        self._done.set()
+        for call in self.callbacks:
+            call(self.task)
+        return True
+
     def finished(self):
         return self._done.is_set() or not self._task.in_progress or \
             self._max_tries == 0
@@ -269,9 +308,10 @@ class TaskOperationPoller(object):
         """
         Blocking wait for task status.
         """
-        if self._thread is None:
-            return
-        self._thread.join(timeout=timeout)
+        if self._scheduler is not None:
+            self._done.wait(timeout)
+        elif self._thread is not None:
+            self._thread.join(timeout=timeout)
 
     def last_message(self, timeout=5):
         """
@@ -280,8 +320,7 @@ class TaskOperationPoller(object):
 
         :rtype: str
         """
-        if self._thread is not None:
-            self._thread.join(timeout=timeout)
+        self.wait(timeout)
         return self._task.last_message
 
     def done(self):
@@ -290,6 +329,8 @@ class TaskOperationPoller(object):
 
         :rtype: bool
         """
+        if self._scheduler is not None:
+            return self._done.is_set()
         return self._thread is None or not self._thread.isAlive()
 
     @property
@@ -305,7 +346,10 @@ class TaskOperationPoller(object):
         """
         Stop the running task
         """
-        if self._thread is not None and self._thread.isAlive():
+        if self._scheduler is not None:
+            self._done.set()
+            self._scheduler.unregister(self._task.href, self._on_status)
+        elif self._thread is not None and self._thread.isAlive():
             self._done.set()
 
 
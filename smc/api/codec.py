@@ -0,0 +1,130 @@
+"""
+JSON codecs used to serialize request bodies and deserialize responses.
+The standard library ``json`` module is used by default. A faster JSON
+library can be selected on the session, or 'auto' uses the first
+installed library in order: `orjson`, `ujson`, `simdjson` (decoding
+only) and finally `json`::
+
+    >>> from smc import session
+    >>> session.codec
+    JSONCodec(name=json)
+    >>> session.set_json_codec('auto')
+    >>> session.codec
+    JSONCodec(name=orjson)
+
+Libraries differ for values the standard library cannot serialize. For
+example, `orjson` encodes datetime objects as RFC 3339 strings where
+``json`` raises TypeError.
+
+Element caches and other objects exposing a ``data`` attribute are
+serialized using that attribute by every codec, as with the
+:class:`CacheEncoder` used by the standard library.
+"""
+import json
+
+
+#: Order in which JSON libraries are tried when the codec is 'auto'
+BACKENDS = ('orjson', 'ujson', 'simdjson', 'json')
+
+
+class CacheEncoder(json.JSONEncoder):
+    def default(self, o):
+        try:
+            return o.data
+        except AttributeError:
+            json.JSONEncoder.default(self, o)
+
+
+def _default(o):
+    try:
+        return o.data
+    except AttributeError:
+        raise TypeError('Object of type %s is not JSON serializable'
+                        % type(o).__name__)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, cls=CacheEncoder)
+
+
+def _json_loads(data):
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+class JSONCodec(object):
+    """
+    Serialize and deserialize JSON bodies with a specific library.
+
+    :param str name: name of the library
+    :param callable dumps: serialize an object to str or bytes
+    :param callable loads: deserialize from str or bytes
+    """
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '%s(name=%s)' % (self.__class__.__name__, self.name)
+
+
+def _orjson():
+    import orjson
+    option = orjson.OPT_NON_STR_KEYS
+    return JSONCodec(
+        'orjson',
+        lambda obj: orjson.dumps(obj, default=_default, option=option),
+        orjson.loads)
+
+
+def _ujson():
+    import ujson
+    try:
+        ujson.dumps([], default=_default)
+    except TypeError:   # Versions without default cannot encode caches
+        raise ImportError('ujson does not support the default argument')
+    return JSONCodec(
+        'ujson',
+        lambda obj: ujson.dumps(
+            obj, default=_default, escape_forward_slashes=False),
+        ujson.loads)
+
+
+def _simdjson():
+    import simdjson
+    return JSONCodec('simdjson', _json_dumps, simdjson.loads)
+
+
+def _json():
+    return JSONCodec('json', _json_dumps, _json_loads)
+
+
+_loaders = {
+    'orjson': _orjson,
+    'ujson': _ujson,
+    'simdjson': _simdjson,
+    'json': _json}
+
+
+def get_codec(name='json'):
+    """
+    Return the codec for the named JSON library. If name is 'auto', the
+    first library from :data:`BACKENDS` that is installed is used.
+
+    :param str name: orjson, ujson, simdjson, json or auto
+    :raises ValueError: unknown codec name
+    :raises ImportError: the named library is not installed
+    :rtype: JSONCodec
+    """
+    if name == 'auto':
+        for backend in BACKENDS:
+            try:
+                return _loaders[backend]()
+            except ImportError:
+                pass
+    if name not in _loaders:
+        raise ValueError('Unknown JSON codec: %s, valid values are: %s'
+                         % (name, ', '.join(BACKENDS + ('auto',))))
+    return _loaders[name]()
@@ -179,6 +179,16 @@ class UpdateElementFailed(SMCException):
     """
 
 
+class BatchFailed(SMCException):
+    """
+    One or more changes sent by a batch failed. The results of all
+    changes in the batch are available in the `results` attribute.
+    """
+    def __init__(self, message, results=None):
+        super(BatchFailed, self).__init__(message)
+        self.results = results if results is not None else []
+
+
 class CreateVPNFailed(SMCException):
     """
     Creating a policy or route based VPN failed.
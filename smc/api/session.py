@@ -7,6 +7,7 @@ import requests
 
 import smc.api.web
 from smc.api.entry_point import Resource
+from smc.api.codec import get_codec
 from smc.elements.user import ApiClient
 from smc.api.exceptions import ConfigLoadError, SMCConnectionError
 from smc.api.configloader import load_from_file, load_from_environ
@@ -44,8 +45,6 @@ class Session(object):
     when it expires. Best practice is to call logout() after to clear the
     session from the SMC.
     """
-    _MODS_LOADED = False
-    
     #: The default format string to use when configuring the logger
     LOG_FORMAT = '%(asctime)s - %(name)s - [%(levelname)s] - %(message)s'
     
@@ -68,6 +67,12 @@ class Session(object):
         # {'domain': session} to allow for switching domains within a
         # single session
         self._sessions = {}
+        # Name to href caches used by element helpers, by domain
+        self._helper_cache = {}
+        # JSON codec for request and response bodies, set on first use
+        self._codec = None
+        # Coalesces concurrent identical GET requests when enabled
+        self._single_flight = None
     
     @property
     def entry_points(self):
@@ -77,6 +82,82 @@ class Session(object):
                 "login session.")
         return self._resource
 
+    @property
+    def helper_cache(self):
+        """
+        Name to href caches used by the element helpers such as
+        :func:`smc.elements.helpers.zone_helper`, scoped to the current
+        domain. The caches are cleared on login and logout.
+        
+        :rtype: dict
+        """
+        return self._helper_cache.setdefault(self.domain, {})
+    
+    @property
+    def codec(self):
+        """
+        JSON codec used to serialize requests and deserialize responses.
+        By default the standard library json module is used, see
+        :meth:`set_json_codec` to use a faster library.
+        
+        :rtype: smc.api.codec.JSONCodec
+        """
+        if self._codec is None:
+            self._codec = get_codec()
+        return self._codec
+    
+    def set_json_codec(self, name='auto'):
+        """
+        Set the JSON library used for this session.
+        
+        :param str name: orjson, ujson, simdjson, json or auto to use the
+            first installed library in that order
+        :raises ValueError: unknown codec name
+        :raises ImportError: the named library is not installed
+        :return: None
+        """
+        self._codec = get_codec(name)
+    
+    @property
+    def single_flight(self):
+        """
+        The single flight request coalescer if enabled, providing the
+        number of requests sent and coalesced.
+        
+        :rtype: smc.api.web.SingleFlight
+        """
+        return self._single_flight
+    
+    def set_single_flight(self, enabled=True):
+        """
+        Coalesce concurrent identical GET requests into a single request
+        with a shared result. This reduces requests when many threads
+        fetch the same elements, for example waiters polling the same
+        node. Enabling resets the metrics.
+        
+        :param bool enabled: enable or disable
+        :return: None
+        """
+        self._single_flight = smc.api.web.SingleFlight() if enabled else None
+    
+    def batch(self, max_workers=10):
+        """
+        Defer element modifications made within a ``with`` block and send
+        them when the block exits. Multiple modifications to an element
+        are sent as a single update::
+        
+            with session.batch() as batch:
+                host.modify_attribute(comment='foo')
+                host.add_category(['bar'])
+        
+        .. seealso:: :mod:`smc.base.batch`
+        
+        :param int max_workers: max number of concurrent requests on exit
+        :rtype: smc.base.batch.Batch
+        """
+        from smc.base.batch import Batch
+        return Batch(max_workers=max_workers)
+    
     @property
     def api_version(self):
         """ API Version """
@@ -259,6 +340,7 @@ class Session(object):
             
             # Reload entry points
             self.entry_points.clear()
+            self._helper_cache.clear()
             self._resource.add(reload_entry_points(self))
             
         else:
@@ -266,15 +348,6 @@ class Session(object):
                 'Login failed, HTTP status code: %s and reason: %s' % (
                     r.status_code, r.reason))
 
-        if not self._MODS_LOADED:
-            logger.debug('Registering class mappings.')
-            # Load the modules to register needed classes
-            for pkg in ('smc.policy', 'smc.elements', 'smc.routing',
-                        'smc.vpn', 'smc.administration', 'smc.core'):
-                import_submodules(pkg, recursive=False)
-
-            self._MODS_LOADED = True
-
     def logout(self):
         """ Logout session from SMC """
         if self._sessions:
@@ -292,6 +365,7 @@ class Session(object):
                     logger.error('SSL exception thrown during logout: %s', e)
 
             self.entry_points.clear()
+            self._helper_cache.clear()
             self._session = None
 
     def refresh(self):
@@ -8,24 +8,18 @@ SSL certificates are not verified to the CA authority, need to implement for
 urllib3:
 https://urllib3.readthedocs.io/en/latest/user-guide.html#ssl
 """
-import json
+import copy
 import os.path
+import threading
 import collections
 import requests
 import logging
 from smc.api.exceptions import SMCOperationFailure, SMCConnectionError
+from smc.api.codec import CacheEncoder  # @UnusedImport
 
 logger = logging.getLogger(__name__)
 
 
-class CacheEncoder(json.JSONEncoder):
-    def default(self, o):
-        try:
-            return o.data
-        except AttributeError:
-            json.JSONEncoder.default(self, o)
-
-
 class SMCAPIConnection(object):
     """
     Represents the ReST methods used to perform operations against the
@@ -53,10 +47,25 @@ class SMCAPIConnection(object):
     def session_domain(self):
         return self._session.domain
 
+    @property
+    def codec(self):
+        return self._session.codec
+
     def send_request(self, method, request):
         """
-        Send request to SMC
+        Send request to SMC. If single flight is enabled on the session,
+        concurrent identical GET requests are sent once and the result is
+        shared.
         """
+        flight = self._session.single_flight
+        if flight is not None and method and method.upper() == \
+            SMCAPIConnection.GET and not request.filename:
+            return flight.do(
+                _request_key(request, self.session_domain),
+                lambda: self._send_request(method, request))
+        return self._send_request(method, request)
+
+    def _send_request(self, method, request):
         if self.session:
             try:
                 method = method.upper() if method else ''
@@ -87,7 +96,7 @@ class SMCAPIConnection(object):
                     
                     response = self.session.post(
                         request.href,
-                        data=json.dumps(request.json, cls=CacheEncoder),
+                        data=self.codec.dumps(request.json),
                         headers=request.headers,
                         params=request.params)
                     
@@ -110,7 +119,7 @@ class SMCAPIConnection(object):
                     
                     response = self.session.put(
                         request.href,
-                        data=json.dumps(request.json, cls=CacheEncoder),
+                        data=self.codec.dumps(request.json),
                         params=request.params,
                         headers=request.headers)
 
@@ -151,7 +160,7 @@ class SMCAPIConnection(object):
             except SMCOperationFailure as error:
                 if error.code in (401,):
                     self._session.refresh()
-                    return self.send_request(method, request)
+                    return self._send_request(method, request)
                 raise error
             except requests.exceptions.RequestException as e:
                 raise SMCConnectionError(
@@ -159,7 +168,8 @@ class SMCAPIConnection(object):
                     'API service is running and host is correct: %s, '
                     'exiting.' % e)
             else:
-                return SMCResult(response, domain=self.session_domain)
+                return SMCResult(
+                    response, domain=self.session_domain, codec=self.codec)
         else:
             raise SMCConnectionError(
                 "No session found. Please login to continue")
@@ -189,7 +199,8 @@ class SMCAPIConnection(object):
             except IOError as e:
                 raise IOError('Error attempting to save to file: {}'.format(e))
 
-            result = SMCResult(response, domain=self.session_domain)
+            result = SMCResult(
+                response, domain=self.session_domain, codec=self.codec)
             result.content = path
             return result
         else:
@@ -212,11 +223,101 @@ class SMCAPIConnection(object):
         if response.status_code in (201, 202, 204):
             logger.debug(
                 'Success sending file in elapsed time: %s', response.elapsed)
-            return SMCResult(response, domain=self.session_domain)
+            return SMCResult(
+                response, domain=self.session_domain, codec=self.codec)
 
         raise SMCOperationFailure(response)
 
-    
+
+def _request_key(request, domain):
+    return (request.href, repr(sorted((request.params or {}).items())),
+            repr(sorted(request.headers.items())), domain)
+
+
+class _Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent identical GET requests. The first caller sends
+    the request and any caller arriving with the same request before it
+    completes waits and receives its own copy of the same result, or the
+    same exception. Requests are only coalesced while in flight, results are
+    not cached.
+
+    Enable on the session::
+
+        >>> session.set_single_flight(True)
+        ...
+        >>> session.single_flight
+        SingleFlight(requests=120, coalesced=37)
+
+    :ivar int requests: number of requests sent
+    :ivar int coalesced: number of requests saved by sharing a result
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        """
+        Run the function for the key, or wait for the result of an
+        identical call already in flight.
+
+        :param tuple key: key identifying identical requests
+        :param callable function: function sending the request
+        :rtype: SMCResult
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.requests += 1
+            else:
+                self.coalesced += 1
+                counters.update(coalesced=1)
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy_result(flight.result)
+
+        result = None
+        try:
+            result = function()
+            # Followers copy from a snapshot taken before they are woken
+            # up, the leader keeps the original which is not shared
+            flight.result = _copy_result(result)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return result
+
+    def __repr__(self):
+        return '%s(requests=%s, coalesced=%s)' % (
+            self.__class__.__name__, self.requests, self.coalesced)
+
+
+def _copy_result(result):
+    # Element caches wrap the result json directly, each caller gets its
+    # own json so in place modifications are not shared
+    result = copy.copy(result)
+    result.json = copy.deepcopy(result.json)
+    return result
+
+
 class SMCResult(object):
     """
     SMCResult will store the return data for operations performed against the
@@ -234,23 +335,24 @@ class SMCResult(object):
     :ivar dict json: element full json
     """
 
-    def __init__(self, respobj=None, msg=None, domain=None):
+    def __init__(self, respobj=None, msg=None, domain=None, codec=None):
         self.etag = None
         self.href = None
         self.content = None
         self.msg = msg  # Only set in case of error
         self.code = None
         self.domain = domain
-        self.json = self._unpack_response(respobj)  # list or dict
+        self.json = self._unpack_response(respobj, codec)  # list or dict
 
-    def _unpack_response(self, response):
+    def _unpack_response(self, response, codec=None):
         if response:
             self.code = response.status_code
             self.href = response.headers.get('location')
             self.etag = response.headers.get('ETag')
             if response.headers.get('content-type') == 'application/json':
                 try:
-                    result = response.json()
+                    result = codec.loads(response.content) if codec\
+                        else response.json()
                 except ValueError:
                     result = None
                 # Search results return list, direct link fetch
@@ -294,4 +396,5 @@ def debug(response):
 
                     
 counters = collections.Counter(
-    {'read': 0, 'create': 0, 'update': 0, 'delete': 0, 'cache': 0})
+    {'read': 0, 'create': 0, 'update': 0, 'delete': 0, 'cache': 0,
+     'coalesced': 0})
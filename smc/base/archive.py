@@ -0,0 +1,281 @@
+"""
+Helpers for reading SMC archives such as policy snapshots and element
+exports. Archives are zip files holding an XML document where each child
+of the root node is an exported element. Members are read directly from
+the zip file without extracting them and parsed incrementally, so only a
+single top level element is held in memory at a time.
+
+Parsed elements are converted to dicts where the node attributes are
+keys and child nodes are lists of dicts by tag::
+
+    <host name="myhost" comment="">
+        <mvia_address address="1.1.1.1"/>
+    </host>
+
+    {'name': 'myhost', 'comment': '', 'mvia_address': [{'address': '1.1.1.1'}]}
+
+JSON members are also parsed incrementally, yielding each item of the top
+level lists in the document.
+"""
+import re
+import json
+import codecs
+import zipfile
+from xml.etree import ElementTree
+from smc.compat import string_types, unicode
+
+
+def node_to_dict(node):
+    """
+    Convert an XML node and its children to a dict. Non whitespace text
+    of a node is set in the `text` key.
+
+    :param Element node: xml node
+    :rtype: dict
+    """
+    data = dict(node.attrib)
+    for child in node:
+        data.setdefault(child.tag, []).append(node_to_dict(child))
+    if node.text and node.text.strip():
+        data['text'] = node.text.strip()
+    return data
+
+
+def dict_to_node(tag, data):
+    """
+    Convert a dict in the format returned by :func:`node_to_dict` to an
+    XML node.
+
+    :param str tag: node tag
+    :param dict data: node attributes and children
+    :rtype: Element
+    """
+    node = ElementTree.Element(tag)
+    for key, value in data.items():
+        if key == 'text':
+            node.text = value
+        elif isinstance(value, list):
+            for child in value:
+                node.append(dict_to_node(key, child))
+        elif value is not None:
+            node.set(key, value if isinstance(value, string_types) else
+                     unicode(value).lower() if isinstance(value, bool) else
+                     unicode(value))
+    return node
+
+
+_PROLOG = re.compile(
+    br'\s*(<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^\[>]*(\[.*?\])?\s*>)', re.S)
+_ENCODING = re.compile(br'(<\?xml[^>]*?encoding\s*=\s*)(["\'])[^"\']*\2')
+
+
+def xml_prolog(data):
+    """
+    XML declaration, comments and document type declaration preceding
+    the root node of a document. The encoding of the XML declaration is
+    set to UTF-8, the encoding used by :func:`write_xml`.
+
+    :param bytes data: start of the document, including the start of
+        the root node
+    :rtype: bytes
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    pos = 0
+    match = _PROLOG.match(data, pos)
+    while match is not None:
+        pos = match.end()
+        match = _PROLOG.match(data, pos)
+    return _ENCODING.sub(br'\1\2UTF-8\2', data[:pos].strip(), 1)
+
+
+def write_xml(node, prolog=None):
+    """
+    Serialize an XML node as UTF-8, preceded by the prolog returned by
+    :func:`xml_prolog`. Without a prolog, an XML declaration is written.
+
+    :param Element node: root node
+    :param bytes prolog: prolog of the source document
+    :rtype: bytes
+    """
+    if prolog is None:
+        prolog = b"<?xml version='1.0' encoding='UTF-8'?>"
+    body = ElementTree.tostring(node, encoding='utf-8')
+    return prolog + b'\n' + body if prolog else body
+
+
+class _HeadReader(object):
+    """
+    File wrapper keeping the data read until :meth:`release` is called.
+    """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.head = []
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        if self.head is not None:
+            self.head.append(data)
+        return data
+
+    def release(self):
+        head, self.head = b''.join(self.head), None
+        return head
+
+
+def iter_xml(fileobj, root=None):
+    """
+    Incrementally parse an XML document, yielding each child of the
+    root node as (tag, dict). Parsed nodes are released after they are
+    converted.
+
+    :param fileobj: file like object opened in binary mode
+    :param dict root: optional dict updated with the `tag`, `attrib` and
+        `prolog` of the root node when parsing starts, see
+        :func:`xml_prolog`
+    :return: generator of (tag, dict)
+    """
+    if root is not None:
+        fileobj = _HeadReader(fileobj)
+    depth, root_node = 0, None
+    for event, node in ElementTree.iterparse(fileobj, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if depth == 1:
+                root_node = node
+                if root is not None:
+                    root.update(tag=node.tag, attrib=dict(node.attrib),
+                                prolog=xml_prolog(fileobj.release()))
+            continue
+        depth -= 1
+        if depth == 1:
+            yield node.tag, node_to_dict(node)
+            root_node.clear()
+
+
+_TOKEN = re.compile(r'[\[\]{}":]')
+_STRING_END = re.compile(r'["\\]')
+
+
+def iter_json(fileobj, chunk_size=65536):
+    """
+    Incrementally parse a JSON document, yielding each item of the
+    top level lists as (key, item), where key is the name of the list
+    in the top level object, or None if the document is a list. Only
+    the item being decoded is held in memory. Strings and nested
+    containers outside of the top level lists are skipped.
+
+    :param fileobj: file like object opened in binary mode
+    :param int chunk_size: number of characters to read at a time
+    :return: generator of (key, item)
+    """
+    decoder = json.JSONDecoder()
+    reader = codecs.getreader('utf-8')(fileobj)
+    buf, pos, eof, need = '', 0, False, False
+    # Depth of the enclosing containers, 1 is inside the top level object
+    depth, in_string, in_list = 0, False, False
+    text, name, key = [], None, None
+
+    while True:
+        if need or pos >= len(buf):
+            if eof:
+                if need or in_string or in_list or depth:
+                    raise ValueError('Incomplete JSON document')
+                return
+            buf, pos = buf[pos:], 0
+            data = reader.read(chunk_size)
+            eof, need = not data, False
+            buf += data
+            continue
+
+        if in_string:
+            # Only strings in the top level object are kept, as list keys
+            match = _STRING_END.search(buf, pos)
+            if match is None:
+                end = next_pos = len(buf)
+            elif match.group() == '\\':
+                if match.end() >= len(buf):
+                    # Escaped character is in the next chunk
+                    need = True
+                    continue
+                end = next_pos = match.end() + 1
+            else:
+                end, next_pos = match.start(), match.end()
+            if depth == 1:
+                text.append(buf[pos:end])
+            pos = next_pos
+            if match is not None and match.group() == '"':
+                in_string = False
+                if depth == 1:
+                    name = ''.join(text)
+            continue
+
+        if not in_list:
+            match = _TOKEN.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                continue
+            token, pos = match.group(), match.end()
+            if token == '"':
+                in_string, text = True, []
+            elif token == ':':
+                if depth == 1 and name is not None:
+                    key = json.loads('"%s"' % name)
+            elif token == '[' and depth <= 1:
+                in_list = True
+                if depth == 0:
+                    key = None
+            elif token in '[{':
+                depth += 1
+            else:
+                depth -= 1
+            continue
+
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(buf):
+            continue
+        if buf[pos] == ']':
+            pos, in_list = pos + 1, False
+            continue
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            need = True
+            continue
+        # A number may continue in the next chunk, the item is complete
+        # once the separator or the end of the list is read
+        while end < len(buf) and buf[end] in ' \t\r\n':
+            end += 1
+        if end >= len(buf) or buf[end] not in ',]':
+            need = True
+            continue
+        yield key, item
+        pos = end
+
+
+def xml_members(archive):
+    """
+    Names of the XML members of a zip archive.
+
+    :param zipfile.ZipFile archive: open archive
+    :rtype: list(str)
+    """
+    return [info.filename for info in archive.infolist()
+            if info.filename.lower().endswith('.xml')]
+
+
+def open_archive(filename):
+    """
+    Open a zip archive for reading.
+
+    :param str filename: path to the archive
+    :raises IOError: file does not exist or is not a zip file
+    :rtype: zipfile.ZipFile
+    """
+    try:
+        return zipfile.ZipFile(filename)
+    except zipfile.BadZipfile as e:
+        raise IOError('{} is not a valid archive: {}'.format(filename, e))
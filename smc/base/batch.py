@@ -0,0 +1,249 @@
+"""
+A batch defers element modifications made within a ``with`` block and
+sends them when the block exits. Multiple modifications to the same
+element are collapsed into a single update and updates are sent
+concurrently::
+
+    with session.batch() as batch:
+        for host in Host.objects.all():
+            host.modify_attribute(comment='managed')
+            host.rename('managed-' + host.name)
+            host.add_category(['managed'])
+
+    for result in batch.results:
+        print(result)
+
+Modifications recorded by the batch are ``update``, ``modify_attribute``,
+``rename``, ``add_category`` and rule ``save``. Changes are applied to the
+element cache when made, so attribute access within the block reflects
+pending changes. Each element is updated once using the ETag from when it
+was first fetched, so the update fails if the element was modified by
+another session in the meantime.
+
+Creating elements is not deferred since the created element href is
+required to reference it. Creates are therefore always sent before the
+updates that reference them. Category tags that do not exist are created
+before elements are added to them.
+
+If the block raises an exception, pending changes are discarded. If any
+change fails, :class:`~smc.api.exceptions.BatchFailed` is raised after all
+changes have been attempted.
+
+Batches are scoped to the thread that opened them; nested batches are
+sent when the outermost batch exits.
+"""
+import threading
+import collections
+from smc.base.util import merge_dicts, parallel_map
+from smc.api.exceptions import BatchFailed, ElementNotFound
+
+
+_local = threading.local()
+
+
+def current_batch():
+    """
+    Return the batch active in this thread, or None.
+
+    :rtype: Batch
+    """
+    return getattr(_local, 'batch', None)
+
+
+#: Result of a single change sent by a batch. Operation is 'update' for
+#: element updates or 'category' when adding an element to a category.
+#: Error is the exception raised, or None if successful.
+BatchResult = collections.namedtuple(
+    'BatchResult', 'element operation result error')
+
+
+class _PendingUpdate(object):
+    def __init__(self, element, exception):
+        self.element = element
+        self.exception = exception
+
+
+class Batch(object):
+    """
+    Unit of work recording element modifications and sending them on
+    exit. Obtain a batch from :meth:`smc.api.session.Session.batch`.
+
+    :param int max_workers: max number of concurrent requests on exit
+    :ivar list results: list of :class:`BatchResult` after the batch exits
+    """
+    def __init__(self, max_workers=10):
+        self.max_workers = max_workers
+        self.results = []
+        self._updates = collections.OrderedDict()   # href: _PendingUpdate
+        self._categories = collections.OrderedDict()  # tag: [element]
+        self._depth = 0
+        self._outer = None
+
+    def __enter__(self):
+        active = current_batch()
+        if active is not None and active is not self:
+            active._depth += 1
+            self._outer = active
+            return active
+        self._depth += 1
+        _local.batch = self
+        return self
+
+    def __exit__(self, exctype, value, traceback):
+        if self._outer is not None:
+            self._outer._depth -= 1
+            self._outer = None
+            return False
+        self._depth -= 1
+        if self._depth:
+            return False
+        _local.batch = None
+        if exctype is not None:
+            self.discard()
+            return False
+        self.flush()
+        return False
+
+    def update(self, element, exception, changes=None):
+        """
+        Record an update to an element. Changes are merged into the
+        cache of the element first modified in this batch with the same
+        href.
+
+        :param Element element: element modified
+        :param exception: exception raised if the update fails
+        :param dict changes: attribute changes, if None the element cache
+            is assumed to have been modified in place
+        :return: href of the element
+        :rtype: str
+        """
+        changes = dict(changes) if changes else {}
+        append_lists = changes.pop('append_lists', False)
+        if changes:
+            merge_dicts(element.data, changes, append_lists)
+        pending = self._updates.get(element.href)
+        if pending is None:
+            self._updates[element.href] = _PendingUpdate(element, exception)
+        elif element is not pending.element:
+            # Merge only the changes when provided so earlier changes
+            # from the first instance are not overwritten by stale data
+            merge_dicts(pending.element.data,
+                        changes if changes else element.data.data,
+                        append_lists)
+        return element.href
+
+    def add_category(self, element, tags):
+        """
+        Record adding an element to category tags.
+
+        :param Element element: element to tag
+        :param list tags: category names
+        :return: None
+        """
+        for tag in tags:
+            elements = self._categories.setdefault(tag, [])
+            if element.href not in [e.href for e in elements]:
+                elements.append(element)
+
+    @property
+    def pending(self):
+        """
+        Number of changes waiting to be sent
+
+        :rtype: int
+        """
+        return len(self._updates) + sum(
+            len(elements) for elements in self._categories.values())
+
+    @property
+    def failed(self):
+        """
+        Results of changes that failed
+
+        :rtype: list(BatchResult)
+        """
+        return [result for result in self.results if result.error]
+
+    def discard(self):
+        """
+        Discard pending changes and clear the cache of modified elements
+        so they are fetched again on next access.
+
+        :return: None
+        """
+        for pending in self._updates.values():
+            pending.element._del_cache()
+        self._updates.clear()
+        self._categories.clear()
+
+    def flush(self):
+        """
+        Send pending changes. Category tags that do not exist are created
+        first, then element updates and category additions are sent
+        concurrently.
+
+        :raises BatchFailed: one or more changes failed. All changes are
+            attempted before raising.
+        :return: results of this flush
+        :rtype: list(BatchResult)
+        """
+        from smc.elements.other import Category
+        updates, self._updates = list(self._updates.values()), \
+            collections.OrderedDict()
+        categories, self._categories = self._categories, \
+            collections.OrderedDict()
+
+        def create_category(tag):
+            category = Category(tag)
+            try:
+                category.href
+            except ElementNotFound:
+                category = Category.create(name=tag)
+            return category
+
+        results = []
+        tags = {}
+        for tag, category, error in parallel_map(
+                create_category, list(categories), self.max_workers):
+            if error is not None:
+                results.extend(BatchResult(element, 'category', tag, error)
+                               for element in categories[tag])
+            else:
+                tags[tag] = category
+
+        def send(change):
+            if isinstance(change, _PendingUpdate):
+                return change.element.update(change.exception)
+            category, element = change
+            category.add_element(element.href)
+            return category.name
+
+        changes = list(updates)
+        changes.extend((category, element) for tag, category in tags.items()
+                       for element in categories[tag])
+
+        for change, result, error in parallel_map(
+                send, changes, self.max_workers):
+            if isinstance(change, _PendingUpdate):
+                if error is not None:
+                    change.element._del_cache()
+                results.append(BatchResult(
+                    change.element, 'update', result, error))
+            else:
+                category, element = change
+                results.append(BatchResult(
+                    element, 'category', category.name, error))
+
+        self.results.extend(results)
+        failed = [result for result in results if result.error]
+        if failed:
+            raise BatchFailed(
+                '{} of {} changes failed: {}'.format(
+                    len(failed), len(results),
+                    '; '.join('{} {}: {}'.format(
+                        r.operation, r.element, r.error) for r in failed)),
+                results)
+        return results
+
+    def __repr__(self):
+        return '%s(pending=%s)' % (self.__class__.__name__, self.pending)
@@ -374,13 +374,17 @@ class ElementCollection(object):
     def __init__(self, **params):
         self._params = params
         self._iexact = params.pop('iexact', None)
+        self._lazy = params.pop('lazy', False)
 
     def __iter__(self):
         limit = self._params.pop('limit', None)
         count = 0
         
         for item in self._list:
-            element = smc.base.model.Element.from_meta(**item)
+            if self._lazy:
+                element = smc.base.model.ElementProxy(item)
+            else:
+                element = smc.base.model.Element.from_meta(**item)
             if self._iexact:
                 if all(element.data.get(k) == v for k, v in self._iexact.items()):
                     yield element
@@ -429,6 +433,8 @@ class ElementCollection(object):
         params = copy.deepcopy(self._params)
         if self._iexact:
             params.update(iexact=self._iexact)
+        if self._lazy:
+            params.update(lazy=self._lazy)
         params.update(**kwargs)
         clone = self.__class__(**params)
         return clone
@@ -443,6 +449,21 @@ class ElementCollection(object):
         """
         return self._clone(limit=count)
 
+    def lazy(self):
+        """
+        Return lightweight element proxies instead of element instances.
+        A proxy holds only the search result meta data and creates the
+        element on first access of an attribute other than `name`, `href`
+        or `typeof`. Use this when iterating large result sets where most
+        elements are only listed::
+
+            >>> for host in Host.objects.all().lazy():
+            ...   print(host.name, host.href)
+
+        :return: :class:`.ElementCollection`
+        """
+        return self._clone(lazy=True)
+
     def all(self):
         """
         Retrieve all elements based on element type. When using the ``all``
@@ -783,6 +804,9 @@ class Search(ElementCollection):
         Return unused user-created elements.
         
         :rtype: list(Element)
+        
+        .. seealso:: :class:`smc.elements.inventory.ElementInventory` to
+            find unused elements locally
         """
         self._params.update(
             href=self._resource.get('search_unused'))
@@ -793,6 +817,9 @@ class Search(ElementCollection):
         Return duplicate user-created elements.
         
         :rtype: list(Element)
+        
+        .. seealso:: :class:`smc.elements.inventory.ElementInventory` to
+            find duplicate and overlapping elements locally
         """
         self._params.update(
             href=self._resource.get('search_duplicate'))
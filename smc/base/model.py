@@ -63,6 +63,8 @@ from smc.api.exceptions import ElementNotFound, \
 from .util import bytes_to_unicode, unicode_to_bytes, merge_dicts,\
     find_type_from_self
 from smc.base.mixins import RequestAction, UnicodeMixin
+from smc.base.registry import load_module
+from smc.base.batch import current_batch
 
 
 @exception
@@ -385,6 +387,16 @@ class ElementBase(RequestAction, UnicodeMixin):
         else:
             exception = exception[0]
 
+        batch = current_batch()
+        if batch is not None and not any(
+                key in kwargs for key in ('href', 'etag', 'json')):
+            href = batch.update(self, exception, kwargs)
+            if kwargs.get('name'):
+                self._meta = Meta(name=kwargs['name'], href=self.href,
+                                  type=self._meta.type)
+                self._name = kwargs['name']
+            return href
+
         params = {
             'href': self.href,
             'etag': self.etag
@@ -450,6 +462,10 @@ class ElementBase(RequestAction, UnicodeMixin):
             raise ModificationFailed(
                 'Cannot modify system element: %s' % self.name)
 
+        batch = current_batch()
+        if batch is not None:
+            return batch.update(self, UpdateElementFailed, kwargs)
+
         params = {
             'href': self.href,
             'etag': self.etag
@@ -701,6 +717,9 @@ class Element(ElementBase):
         .. seealso:: :class:`smc.elements.other.Category`
         """
         assert isinstance(category, list), 'Category input was expecting list.'
+        batch = current_batch()
+        if batch is not None:
+            return batch.add_category(self, category)
         from smc.elements.other import Category
         for tag in category:
             category = Category(tag)
@@ -758,6 +777,9 @@ class Element(ElementBase):
 
         :return: list referenced elements
         :rtype: list(Element)
+        
+        .. seealso:: :class:`smc.elements.references.ReferenceGraph` to
+            retrieve references of many elements
         """
         href = fetch_entry_point('references_by_element')
         return [Element.from_meta(**ref)
@@ -847,19 +869,110 @@ class SubElement(ElementBase):
         return str(self)
 
 
+#: Dynamic classes created for types without a registered class, keyed
+#: by (typeof, base class)
+_dynamic_classes = {}
+
+
 def lookup_class(typeof, default=Element):
+    # Element classes are registered when their module is imported, load
+    # the module defining this type on first use
+    load_module(typeof)
     cls = ElementMeta._map.get(typeof, None)
     if cls is None: # Create a dynamic class from meta type field
-        attrs = {'typeof': typeof}
         # There are multiple entry points for specific aliases
         # that should derive from the smc.elements.network.Alias
         # class so it has access to Alias class methods like ``resolve``.
         if 'alias' in typeof:
+            load_module('alias')
             default = ElementMeta._map.get('alias')
-        cls_name = '{0}Dynamic'.format(typeof.title())
-        return type(cls_name.replace('_',''), (default,), attrs)
+        cls = _dynamic_classes.get((typeof, default))
+        if cls is None:
+            cls_name = '{0}Dynamic'.format(typeof.title())
+            # Set typeof after creation so the dynamic class is not
+            # registered and cannot shadow a class loaded later
+            cls = type(cls_name.replace('_',''), (default,), {})
+            cls.typeof = typeof
+            _dynamic_classes[(typeof, default)] = cls
+        return cls
         
-    return ElementMeta._map.get(typeof, default)
+    return cls
+
+
+class ElementProxy(object):
+    """
+    Lightweight stand-in for an element returned from a collection search
+    using :meth:`~smc.base.collection.ElementCollection.lazy`. The proxy
+    only holds the search meta data, providing the `name`, `href` and
+    `typeof` of the element. The element instance is created on first
+    access of any other attribute and used from then on.
+
+    A proxy is an instance of the element class it represents::
+
+        >>> host = next(iter(Host.objects.all().lazy()))
+        >>> isinstance(host, Host)
+        True
+        >>> host.address     # creates the Host element and fetches it
+        '1.1.1.1'
+    """
+    __slots__ = ('_meta', '_element')
+
+    def __init__(self, meta):
+        object.__setattr__(self, '_meta', Meta(
+            name=meta.get('name'), href=meta.get('href'),
+            type=meta.get('type')))
+        object.__setattr__(self, '_element', None)
+
+    @property
+    def name(self):
+        return self._meta.name
+
+    @property
+    def href(self):
+        return self._meta.href
+
+    @property
+    def typeof(self):
+        return self._meta.type
+
+    @property
+    def __class__(self):
+        return lookup_class(self.typeof)
+
+    @property
+    def element(self):
+        """
+        The element this proxy represents
+
+        :rtype: Element
+        """
+        if self._element is None:
+            object.__setattr__(self, '_element', Element.from_meta(
+                **self._meta._asdict()))
+        return self._element
+
+    def __getattr__(self, name):
+        return getattr(self.element, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.element, name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, Element):
+            return self.name == other.name and self.typeof == other.typeof
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.name, self.typeof))
+
+    def __str__(self):
+        return '{0}(name={1})'.format(self.__class__.__name__, self.name)
+
+    def __repr__(self):
+        return str(self)
 
 
 class Meta(collections.namedtuple('Meta', 'name href type')):
@@ -0,0 +1,96 @@
+"""
+Element classes register themselves by their ``typeof`` attribute when
+their module is imported (see :class:`smc.base.model.ElementMeta`). Rather
+than importing every module of the package to populate the registry, a
+static map of typeof to module is used to import the module defining a
+class the first time that type is looked up.
+
+The map is stored in :py:mod:`smc.base.typeof_map` and must be regenerated
+when element classes are added or moved::
+
+    python -m smc.base.registry
+
+"""
+import os
+import sys
+import importlib
+import pkgutil
+from smc.base.typeof_map import TYPEOF_MODULES
+
+
+#: Packages containing element classes
+PACKAGES = ('smc.policy', 'smc.elements', 'smc.routing', 'smc.vpn',
+            'smc.administration', 'smc.core')
+
+
+def load_module(typeof):
+    """
+    Import the module that defines the element class for the given type,
+    if it is not yet imported.
+
+    :param str typeof: element type
+    :return: True if a module was imported
+    :rtype: bool
+    """
+    module = TYPEOF_MODULES.get(typeof)
+    if module is None or module in sys.modules:
+        return False
+    importlib.import_module(module)
+    return True
+
+
+def import_all():
+    """
+    Import all modules from the element packages, registering every
+    element class. This is only needed to generate the static map or to
+    iterate all registered classes.
+
+    :return: None
+    """
+    for package in PACKAGES:
+        package = importlib.import_module(package)
+        for _loader, name, _is_pkg in pkgutil.walk_packages(
+                package.__path__, package.__name__ + '.'):
+            importlib.import_module(name)
+
+
+def generate():
+    """
+    Build the typeof to module map from the registered element classes.
+    If multiple classes register the same type, the module of the class
+    that was registered last is used, consistent with importing all
+    modules.
+
+    :rtype: dict
+    """
+    from smc.base.model import ElementMeta
+    import_all()
+    return {typeof: cls.__module__
+            for typeof, cls in ElementMeta._map.items()
+            if not cls.__name__.endswith('Dynamic')}
+
+
+def write(filename=None):
+    """
+    Generate and write the static typeof map module.
+
+    :param str filename: path to write to, by default the installed
+        :py:mod:`smc.base.typeof_map` module
+    :return: None
+    """
+    filename = filename or os.path.join(
+        os.path.dirname(__file__), 'typeof_map.py')
+    with open(filename, 'w') as module:
+        module.write(
+            '"""\n'
+            'Element typeof to module map used to lazily import element\n'
+            'classes. Generated by running: python -m smc.base.registry\n'
+            '"""\n'
+            'TYPEOF_MODULES = {\n')
+        for typeof, name in sorted(generate().items()):
+            module.write('    %r: %r,\n' % (typeof, name))
+        module.write('}\n')
+
+
+if __name__ == '__main__':
+    write()
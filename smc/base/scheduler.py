@@ -0,0 +1,204 @@
+"""
+A poll scheduler runs status polling for many waiters and tasks from a
+single worker thread. Instead of starting a thread per waiter that sleeps
+and polls, waiters register a fetch function with the scheduler and are
+notified with each result.
+
+Registrations are keyed by the href of the polled resource. Waiters that
+poll the same resource share a single request per poll cycle, for example
+a :class:`~smc.core.waiters.ConfigurationStatusWaiter` and a
+:class:`~smc.core.waiters.NodeStateWaiter` on the same node result in one
+call to ``node.status()``.
+
+Polling backs off when a resource returns the same result repeatedly and
+resets to the base interval once the result changes. A resource can also
+be polled immediately by calling :meth:`PollScheduler.wake`, for example
+when a notification is received that the element changed.
+
+Example of waiting for a policy upload on many engines using a shared
+scheduler::
+
+    scheduler = PollScheduler(interval=5, max_interval=30)
+    pollers = [engine.upload(wait_for_finish=True, scheduler=scheduler)
+               for engine in Engine.objects.all()]
+    for poller in pollers:
+        poller.wait()
+        print(poller.task.last_message)
+
+"""
+import time
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PollJob(object):
+    """
+    A polled resource and the subscribers waiting on its result.
+    """
+    def __init__(self, key, fetch, compare, interval):
+        self.key = key
+        self.fetch = fetch
+        self.compare = compare
+        self.base_interval = interval
+        self.interval = interval
+        self.next_run = time.time() + interval
+        self.last_state = None
+        self.subscribers = []
+
+
+class PollScheduler(object):
+    """
+    Shared scheduler polling registered resources from a single worker
+    thread. The worker is started when the first resource is registered
+    and exits once no registrations remain.
+
+    :param int interval: default seconds between polls of a resource
+    :param int max_interval: upper bound for the polling interval when
+        backing off
+    :param float backoff: multiplier applied to the interval each time a
+        poll returns an unchanged result
+    """
+    def __init__(self, interval=5, max_interval=60, backoff=1.5):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def register(self, key, fetch, callback, interval=None, compare=None):
+        """
+        Register a callback to receive the result of polling a resource.
+        If the key is already registered, the existing poll is shared and
+        the fetch function provided is ignored.
+
+        The callback takes a single argument, the result of ``fetch`` or
+        the exception raised by it. The callback returns True when it no
+        longer needs results, which removes the registration.
+
+        :param str key: key identifying the resource, typically the href
+        :param callable fetch: callable taking no arguments that performs
+            the poll request
+        :param callable callback: callable receiving each result
+        :param int interval: base interval for this resource. If multiple
+            registrations share a key, the shortest interval is used.
+        :param callable compare: optional callable taking the result and
+            returning the value used to detect a change. By default the
+            result itself is compared.
+        :return: None
+        """
+        interval = interval or self.interval
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = _PollJob(
+                    key, fetch, compare, interval)
+            elif interval < job.base_interval:
+                job.base_interval = job.interval = interval
+                job.next_run = min(job.next_run, time.time() + interval)
+            job.subscribers.append(callback)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        self._wakeup.set()
+
+    def unregister(self, key, callback):
+        """
+        Remove a callback. The resource is no longer polled once all of
+        its callbacks are removed.
+
+        :param str key: key used when registering
+        :param callable callback: callback to remove
+        :return: None
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                if callback in job.subscribers:
+                    job.subscribers.remove(callback)
+                if not job.subscribers:
+                    del self._jobs[key]
+
+    def wake(self, key=None):
+        """
+        Poll resources immediately, resetting their interval. Use this to
+        react to external change events.
+
+        :param str key: poll the resource with this key and the resources
+            below it in the path, i.e. an engine href will wake the engine
+            nodes. If None, all resources are polled.
+        :return: None
+        """
+        now = time.time()
+        base = key.rstrip('/') if key is not None else None
+        with self._lock:
+            for job in self._jobs.values():
+                if key is None or job.key.rstrip('/') == base or \
+                        job.key.startswith(base + '/'):
+                    job.next_run = now
+                    job.interval = job.base_interval
+        self._wakeup.set()
+
+    @property
+    def pending(self):
+        """
+        Keys of the resources currently being polled
+
+        :rtype: list(str)
+        """
+        with self._lock:
+            return list(self._jobs)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._jobs:
+                    self._thread = None
+                    return
+                now = time.time()
+                due = [job for job in self._jobs.values()
+                       if job.next_run <= now]
+                if not due:
+                    delay = min(job.next_run for job in self._jobs.values()) - now
+            if not due:
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                continue
+
+            for job in due:
+                self._poll(job)
+
+    def _poll(self, job):
+        try:
+            result = job.fetch()
+            state = job.compare(result) if job.compare else result
+        except Exception as e:
+            logger.debug('Poll failed for %s: %s', job.key, e)
+            result = state = e
+
+        for callback in list(job.subscribers):
+            try:
+                finished = callback(result)
+            except Exception:
+                logger.exception('Poll callback failed for %s', job.key)
+                finished = True
+            if finished:
+                self.unregister(job.key, callback)
+
+        with self._lock:
+            if state == job.last_state:
+                job.interval = min(
+                    job.interval * self.backoff, self.max_interval)
+            else:
+                job.interval = job.base_interval
+            job.last_state = state
+            job.next_run = time.time() + job.interval
+
+    def __repr__(self):
+        return '%s(pending=%s)' % (
+            self.__class__.__name__, len(self._jobs))
@@ -0,0 +1,140 @@
+"""
+Element typeof to module map used to lazily import element
+classes. Generated by running: python -m smc.base.registry
+"""
+TYPEOF_MODULES = {
+    'access_control_list': 'smc.administration.access_rights',
+    'address_range': 'smc.elements.network',
+    'admin_domain': 'smc.administration.system',
+    'admin_user': 'smc.elements.user',
+    'alias': 'smc.elements.network',
+    'antispoofing_node': 'smc.core.route',
+    'api_client': 'smc.elements.user',
+    'application_situation': 'smc.elements.service',
+    'as_path_access_list': 'smc.routing.bgp_access_list',
+    'autonomous_system': 'smc.routing.bgp',
+    'backup_task': 'smc.administration.scheduled_tasks',
+    'bgp_connection_profile': 'smc.routing.bgp',
+    'bgp_peering': 'smc.routing.bgp',
+    'bgp_profile': 'smc.routing.bgp',
+    'category_group_tag': 'smc.elements.other',
+    'category_tag': 'smc.elements.other',
+    'community_access_list': 'smc.routing.bgp_access_list',
+    'country': 'smc.elements.network',
+    'create_system_snapshot_task': 'smc.administration.scheduled_tasks',
+    'delete_log_task': 'smc.administration.scheduled_tasks',
+    'delete_old_executed_task': 'smc.administration.scheduled_tasks',
+    'delete_old_snapshots_task': 'smc.administration.scheduled_tasks',
+    'disable_unused_admin_task': 'smc.administration.scheduled_tasks',
+    'dns_relay_profile': 'smc.elements.profiles',
+    'dns_server': 'smc.elements.servers',
+    'domain_name': 'smc.elements.network',
+    'engine_clusters': 'smc.core.engine',
+    'ethernet_rule': 'smc.policy.rule',
+    'ethernet_service': 'smc.elements.service',
+    'expression': 'smc.elements.network',
+    'extended_community_access_list': 'smc.routing.bgp_access_list',
+    'external_bgp_peer': 'smc.routing.bgp',
+    'external_endpoint': 'smc.vpn.elements',
+    'external_gateway': 'smc.vpn.elements',
+    'fetch_certificate_revocation_task': 'smc.administration.scheduled_tasks',
+    'file_filtering_policy': 'smc.policy.file_filtering',
+    'file_filtering_rule': 'smc.policy.file_filtering',
+    'filter_expression': 'smc.elements.other',
+    'fw_cluster': 'smc.core.engines',
+    'fw_ipv4_access_rule': 'smc.policy.rule',
+    'fw_ipv4_nat_rule': 'smc.policy.rule_nat',
+    'fw_ipv6_access_rule': 'smc.policy.rule',
+    'fw_ipv6_nat_rule': 'smc.policy.rule_nat',
+    'fw_policy': 'smc.policy.layer3',
+    'fw_template_policy': 'smc.policy.layer3',
+    'gateway_certificate': 'smc.administration.certificates.vpn',
+    'gateway_profile': 'smc.vpn.elements',
+    'gateway_settings': 'smc.vpn.elements',
+    'group': 'smc.elements.group',
+    'host': 'smc.elements.network',
+    'http_proxy': 'smc.elements.servers',
+    'icmp_ipv6_service': 'smc.elements.service',
+    'icmp_service': 'smc.elements.service',
+    'icmp_service_group': 'smc.elements.group',
+    'inspection_template_policy': 'smc.policy.policy',
+    'interface_zone': 'smc.elements.network',
+    'internal_gateway': 'smc.core.engine',
+    'ip_access_list': 'smc.routing.access_list',
+    'ip_country_group': 'smc.elements.network',
+    'ip_list': 'smc.elements.network',
+    'ip_prefix_list': 'smc.routing.prefix_list',
+    'ip_service': 'smc.elements.service',
+    'ip_service_group': 'smc.elements.group',
+    'ips_policy': 'smc.policy.ips',
+    'ips_template_policy': 'smc.policy.ips',
+    'ipv6_access_list': 'smc.routing.access_list',
+    'ipv6_prefix_list': 'smc.routing.prefix_list',
+    'l2_interface_policy': 'smc.policy.interface',
+    'l2_interface_template_policy': 'smc.policy.interface',
+    'layer2_ipv4_access_rule': 'smc.policy.rule',
+    'layer2_policy': 'smc.policy.layer2',
+    'layer2_template_policy': 'smc.policy.layer2',
+    'location': 'smc.elements.other',
+    'log_server': 'smc.elements.servers',
+    'logical_interface': 'smc.elements.other',
+    'mac_address': 'smc.elements.other',
+    'master_engine': 'smc.core.engines',
+    'match_expression': 'smc.policy.rule_elements',
+    'mgt_server': 'smc.elements.servers',
+    'netlink': 'smc.elements.netlink',
+    'network': 'smc.elements.network',
+    'ospfv2_area': 'smc.routing.ospf',
+    'ospfv2_domain_settings': 'smc.routing.ospf',
+    'ospfv2_interface_settings': 'smc.routing.ospf',
+    'ospfv2_key_chain': 'smc.routing.ospf',
+    'ospfv2_profile': 'smc.routing.ospf',
+    'outbound_multilink': 'smc.elements.netlink',
+    'physical_interface': 'smc.core.interfaces',
+    'protocol': 'smc.elements.service',
+    'rbvpn_tunnel': 'smc.vpn.route',
+    'rbvpn_tunnel_monitoring_group': 'smc.vpn.route',
+    'refresh_master_and_virtual_policy_task': 'smc.administration.scheduled_tasks',
+    'refresh_policy_task': 'smc.administration.scheduled_tasks',
+    'renew_gw_certificates_task': 'smc.administration.scheduled_tasks',
+    'renew_internal_ca_task': 'smc.administration.scheduled_tasks',
+    'renew_internal_certificates_task': 'smc.administration.scheduled_tasks',
+    'report_design': 'smc.administration.reports',
+    'report_file': 'smc.administration.reports',
+    'report_template': 'smc.administration.reports',
+    'role': 'smc.administration.role',
+    'route_map': 'smc.routing.route_map',
+    'route_map_rule': 'smc.routing.route_map',
+    'router': 'smc.elements.network',
+    'routing_node': 'smc.core.route',
+    'rpc_service': 'smc.elements.service',
+    'sandbox_service': 'smc.elements.profiles',
+    'service_group': 'smc.elements.group',
+    'sginfo_task': 'smc.administration.scheduled_tasks',
+    'single_fw': 'smc.core.engines',
+    'single_ips': 'smc.core.engines',
+    'single_layer2': 'smc.core.engines',
+    'snmp_agent': 'smc.elements.profiles',
+    'sub_ipv4_fw_policy': 'smc.policy.layer3',
+    'task_progress': 'smc.administration.tasks',
+    'tcp_service': 'smc.elements.service',
+    'tcp_service_group': 'smc.elements.group',
+    'tls_certificate_authority': 'smc.administration.certificates.tls',
+    'tls_server_credentials': 'smc.administration.certificates.tls',
+    'tls_signing_certificate_authority': 'smc.administration.certificates.tls',
+    'tunnel_interface': 'smc.core.interfaces',
+    'udp_service': 'smc.elements.service',
+    'udp_service_group': 'smc.elements.group',
+    'upload_policy_task': 'smc.administration.scheduled_tasks',
+    'url_category': 'smc.elements.service',
+    'url_category_group': 'smc.elements.group',
+    'url_list_application': 'smc.elements.network',
+    'validate_policy_task': 'smc.administration.scheduled_tasks',
+    'virtual_fw': 'smc.core.engines',
+    'virtual_physical_interface': 'smc.core.interfaces',
+    'virtual_resource': 'smc.core.engine',
+    'vpn': 'smc.vpn.policy',
+    'vpn_certificate_authority': 'smc.administration.certificates.vpn',
+    'vpn_profile': 'smc.vpn.elements',
+    'vpn_site': 'smc.vpn.elements',
+}
@@ -3,6 +3,7 @@ Utility functions used in different areas of smc-python
 """
 import time
 import datetime
+import threading
 import smc.compat as compat
 import smc.api.exceptions
 
@@ -102,6 +103,51 @@ def element_resolver(elements, do_raise=True):
             raise
 
 
+def parallel_map(function, items, max_workers=10):
+    """
+    Call function for each item using a bounded pool of threads. Used
+    when running the same request against many elements, such as
+    operations that span multiple engines. Exceptions raised by the
+    function are returned with the result instead of being raised.
+    ::
+    
+        for engine, status, error in parallel_map(
+                lambda engine: engine.nodes[0].status(), engines):
+            ...
+    
+    :param callable function: function taking a single item
+    :param list items: items to process
+    :param int max_workers: max number of concurrent threads
+    :return: list of (item, result, exception) in the order of items
+    :rtype: list(tuple)
+    """
+    items = list(items)
+    results = [None] * len(items)
+    iterator = iter(enumerate(items))
+    lock = threading.Lock()
+    
+    def worker():
+        while True:
+            with lock:
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    return
+            try:
+                results[index] = (item, function(item), None)
+            except Exception as e:
+                results[index] = (item, None, e)
+    
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, len(items)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
 def find_link_by_name(link_name, linklist):
     """
     Utility method to find the reference link based on
@@ -17,6 +17,7 @@ from smc.routing.bgp import BGP
 from smc.routing.ospf import OSPF, OSPFProfile
 from smc.core.route import Antispoofing, Routing, Route, PolicyRoute
 from smc.core.contact_address import ContactAddressCollection
+from smc.core.reconcile import EngineReconciler
 from smc.core.general import DNSRelay, Layer2Settings, DefaultNAT, \
     SNMP, RankedDNSAddress
 from smc.core.addon import AntiVirus, FileReputation,\
@@ -483,17 +484,22 @@ class Engine(Element):
         :return: access control list permissions
         :rtype: list(AccessControlList)
         """
-        acl_list = list(AccessControlList.objects.all())
-        def acl_map(elem_href):
-            for elem in acl_list:
-                if elem.href == elem_href:
-                    return elem
+        acl_map = {acl.href: acl for acl in AccessControlList.objects.all()}
+        for acl in self.granted_acls():
+            yield acl_map.get(acl)
+    
+    def granted_acls(self):
+        """
+        Return the hrefs of the access control lists granted on this
+        engine, without resolving the ACL elements.
         
+        :raises UnsupportedEngineFeature: requires SMC version >= 6.1
+        :rtype: list(str)
+        """
         acls = self.make_request(
             UnsupportedEngineFeature,
             resource='permissions')
-        for acl in acls['granted_access_control_list']:
-            yield(acl_map(acl))
+        return acls['granted_access_control_list']
 
     @property
     def pending_changes(self):
@@ -528,9 +534,9 @@ class Engine(Element):
         :return: generator of aliases
         :rtype: Alias
         """
-        alias_list = list(Alias.objects.all())
+        alias_map = {alias.href: alias for alias in Alias.objects.all()}
         for alias in self.make_request(resource='alias_resolving'):
-            yield Alias.from_engine(alias, alias_list)
+            yield Alias.from_engine(alias, alias_map)
 
     def blacklist(self, src, dst, duration=3600, **kw):
         """
@@ -989,6 +995,32 @@ class Engine(Element):
             json=interface)
         self._del_cache()
         
+    def reconcile(self, desired, dry_run=False, ignore_mgmt=True):
+        """
+        Apply a desired configuration to this engine. The differences
+        between the engine and desired configuration are applied in memory
+        and committed with a single engine update. Routing changes are
+        committed with a single update to the routing tree.
+        ::
+
+            changes = engine.reconcile({
+                'interfaces': [{'interface_id': 1, 'zone_ref': 'internal'}],
+                'dns': ['8.8.8.8'],
+                'antivirus': True})
+
+        .. seealso:: :py:mod:`smc.core.reconcile` for the desired format
+
+        :param dict desired: desired engine configuration
+        :param bool dry_run: return the changes without committing
+        :param bool ignore_mgmt: ignore management settings on interfaces
+        :raises UpdateElementFailed: failed to commit the changes, for
+            example if the engine was modified by another session, or an
+            interface cannot be reconciled
+        :return: computed changes
+        :rtype: list(Change)
+        """
+        return EngineReconciler(self, desired, ignore_mgmt).apply(dry_run)
+
     def refresh(self, timeout=3, wait_for_finish=False, **kw):
         """
         Refresh existing policy on specified device. This is an asynchronous
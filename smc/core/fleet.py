@@ -0,0 +1,620 @@
+"""
+A fleet groups many engines to run the same operation against all of them
+concurrently. Elements that are needed to resolve the results, such as
+aliases or access control lists, are listed once and shared across all
+engines in the fleet instead of being listed for each engine.
+
+Create a fleet from engine names or engine instances::
+
+    fleet = Fleet(Engine.objects.all(), max_workers=20)
+
+Resolve aliases for every engine::
+
+    for engine, aliases in fleet.alias_resolving().items():
+        for alias in aliases:
+            print(engine, alias.name, alias.resolved_value)
+
+Retrieve the access control lists granted on every engine::
+
+    >>> fleet.permissions()
+    {'fw1': [AccessControlList(name=ALL Firewalls)], 'fw2': [...]}
+
+Collect a health snapshot of every engine and node. Status, appliance
+status, pending changes and installed policy are retrieved concurrently
+with a single request per resource::
+
+    for name, snapshot in fleet.health_snapshot().items():
+        for node in snapshot.nodes:
+            print(name, node.name, node.status, node.installed_policy)
+
+    json.dumps({name: snapshot.as_dict()
+                for name, snapshot in fleet.health_snapshot().items()})
+
+Push policy to every engine with bounded concurrency. Master engines are
+pushed before their virtual engines, all tasks are polled by a single
+shared scheduler and uploads that fail because the policy is locked are
+retried::
+
+    push = fleet.upload('Standard Policy', max_concurrent=20)
+    while not push.done():
+        push.wait(5)
+        print('Overall progress: %s%%' % push.progress)
+    for name, result in push.results.items():
+        print(name, result.success, result.message)
+
+Find rules of a shared policy that were not hit on any engine. Rule
+counters are retrieved concurrently and joined to the rule base, which is
+loaded once::
+
+    for hits in fleet.rule_hits(FirewallPolicy('Standard Policy')).never_hit():
+        print(hits.rule.name)
+
+Engines that fail an operation are not included in the result and the
+exception is available in ``failures`` by engine name until the next
+operation is run::
+
+    >>> fleet.failures
+    {'fw3': UnsupportedEngineFeature(...)}
+"""
+import time
+import logging
+import threading
+import collections
+from smc.core.engine import Engine
+from smc.core.resource import PendingChanges
+from smc.elements.network import Alias
+from smc.administration.access_rights import AccessControlList
+from smc.core.node import item_status
+from smc.base.util import parallel_map
+from smc.base.scheduler import PollScheduler
+
+
+logger = logging.getLogger(__name__)
+
+
+def _as_dicts(items):
+    return [dict(item._asdict()) for item in items] if items is not None \
+        else None
+
+
+class NodeSnapshot(collections.namedtuple('NodeSnapshot',
+        'name nodeid status state configuration_status installed_policy '
+        'version dyn_up platform interfaces hardware errors')):
+    """
+    Health of a single engine node. Interfaces are a list of
+    :class:`~smc.core.node.InterfaceStatus` and hardware a flat list of
+    hardware Status entries. If a resource could not be retrieved, the
+    related fields are None and the error is in ``errors`` by resource.
+    Use ``as_dict`` for a json serializable representation.
+    """
+    __slots__ = ()
+
+    def as_dict(self):
+        data = dict(self._asdict())
+        data.update(
+            interfaces=_as_dicts(self.interfaces),
+            hardware=_as_dicts(self.hardware),
+            errors={name: str(e) for name, e in self.errors.items()})
+        return data
+
+
+class EngineSnapshot(collections.namedtuple('EngineSnapshot',
+        'name type installed_policy pending_changes nodes errors')):
+    """
+    Health of an engine and its nodes. Pending changes are a list of
+    :class:`~smc.core.resource.ChangeRecord`, or None if the engine does
+    not support pending changes.
+    """
+    __slots__ = ()
+
+    def as_dict(self):
+        data = dict(self._asdict())
+        data.update(
+            pending_changes=_as_dicts(self.pending_changes),
+            nodes=[node.as_dict() for node in self.nodes],
+            errors={name: str(e) for name, e in self.errors.items()})
+        return data
+
+
+#: Result of a policy push to a single engine
+PushResult = collections.namedtuple(
+    'PushResult', 'engine success message attempts')
+
+
+def is_locked(message):
+    """
+    Default retry condition for policy pushes, retry when the policy or
+    engine is locked by another operation.
+
+    :param str message: failure message from the task
+    :rtype: bool
+    """
+    return 'lock' in (message or '').lower()
+
+
+class PolicyPush(object):
+    """
+    Orchestrates a policy upload or refresh to many engines. Uploads run
+    with bounded concurrency and all upload tasks are polled by a single
+    shared :class:`~smc.base.scheduler.PollScheduler`. Engines may depend
+    on other engines; an engine is only pushed after all the engines it
+    depends on succeeded and is skipped if one of them failed. Virtual
+    engines depend on their master engine automatically when both are
+    part of the push.
+
+    The push runs in a background thread once started. Use :meth:`wait`
+    or :meth:`done` to monitor completion and :attr:`progress` for the
+    aggregated progress.
+
+    :param list(Engine) engines: engines to push policy to
+    :param str policy: name of policy to upload. If None, the currently
+        installed policy is refreshed.
+    :param int max_concurrent: max number of uploads in progress
+    :param int retries: max number of retries per engine for failures
+        matching ``retry_if``
+    :param int retry_delay: seconds to wait before retrying an engine
+    :param callable retry_if: callable taking the failure message and
+        returning True if the upload should be retried. By default uploads
+        are retried when the policy is locked.
+    :param dict depends: optional engine name to list of engine names that
+        must be pushed first
+    :param int interval: seconds between task status queries
+    :param int max_tries: max number of status queries per upload
+    :param PollScheduler scheduler: scheduler used to poll the upload
+        tasks. A new scheduler is used if not provided.
+    :ivar dict results: engine name to :class:`PushResult` for completed
+        engines
+    """
+    def __init__(self, engines, policy=None, max_concurrent=10, retries=3,
+                 retry_delay=30, retry_if=is_locked, depends=None, interval=5,
+                 max_tries=360, scheduler=None):
+        self.engines = collections.OrderedDict(
+            (engine.name, engine) for engine in engines)
+        self.policy = policy
+        self.max_concurrent = max_concurrent
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.retry_if = retry_if
+        self.interval = interval
+        self.max_tries = max_tries
+        self.scheduler = scheduler if scheduler is not None else \
+            PollScheduler(interval=interval, max_interval=interval * 4)
+        self.depends = self._dependencies(depends or {})
+        self.results = collections.OrderedDict()
+        self._pollers = {}
+        self._attempts = collections.defaultdict(int)
+        self._not_before = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    def _dependencies(self, depends):
+        dependencies = {name: set(depends.get(name, []))
+                        for name in self.engines}
+        masters = {engine.href: name for name, engine in self.engines.items()
+                   if engine.type == 'master_engine'}
+        if masters:
+            for name, engine in self.engines.items():
+                if engine.type.startswith('virtual'):
+                    resource = engine.data.get('virtual_resource') or ''
+                    master = masters.get(resource.split('/virtual_resource')[0])
+                    if master is not None:
+                        dependencies[name].add(master)
+        return dependencies
+
+    def start(self):
+        """
+        Start the push in a background thread.
+
+        :return: self
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def run(self):
+        """
+        Run the push and block until all engines completed.
+
+        :return: engine name to result
+        :rtype: dict(str, PushResult)
+        """
+        self.start().wait()
+        return self.results
+
+    def wait(self, timeout=None):
+        """
+        Blocking wait for the push to complete.
+
+        :param int timeout: max seconds to wait
+        :return: None
+        """
+        self._done.wait(timeout)
+
+    def done(self):
+        """
+        Is the push complete for all engines
+
+        :rtype: bool
+        """
+        return self._done.is_set()
+
+    @property
+    def progress(self):
+        """
+        Aggregated percentage of completion across all engines. Completed
+        engines count as 100 regardless of the outcome.
+
+        :rtype: int
+        """
+        if not self.engines:
+            return 100
+        with self._lock:
+            total = 100 * len(self.results)
+            pollers = list(self._pollers.values())
+        for poller in pollers:
+            total += poller.task.progress or 0
+        return int(total / len(self.engines))
+
+    @property
+    def status(self):
+        """
+        Current state of each engine: pending, running, retry, success,
+        failed or skipped.
+
+        :rtype: dict(str, str)
+        """
+        with self._lock:
+            results = dict(self.results)
+            running = set(self._pollers)
+            retry = set(self._not_before)
+        status = {}
+        for name in self.engines:
+            if name in results:
+                result = results[name]
+                status[name] = 'success' if result.success else (
+                    'skipped' if not result.attempts else 'failed')
+            elif name in running:
+                status[name] = 'running'
+            elif name in retry:
+                status[name] = 'retry'
+            else:
+                status[name] = 'pending'
+        return status
+
+    def _finish(self, name, success, message):
+        with self._lock:
+            self.results[name] = PushResult(
+                name, success, message, self._attempts[name])
+
+    def _start_upload(self, name):
+        engine = self.engines[name]
+        self._attempts[name] += 1
+        with self._lock:
+            self._not_before.pop(name, None)
+        try:
+            if self.policy is not None:
+                poller = engine.upload(
+                    self.policy, timeout=self.interval, wait_for_finish=True,
+                    max_tries=self.max_tries, scheduler=self.scheduler)
+            else:
+                poller = engine.refresh(
+                    timeout=self.interval, wait_for_finish=True,
+                    max_tries=self.max_tries, scheduler=self.scheduler)
+        except Exception as e:
+            self._failed(name, str(e))
+            return
+        with self._lock:
+            self._pollers[name] = poller
+        try:
+            poller.add_done_callback(lambda task: self._changed.set())
+        except ValueError: # Already finished
+            self._changed.set()
+
+    def _failed(self, name, message):
+        if self._attempts[name] <= self.retries and self.retry_if and \
+            self.retry_if(message):
+            logger.info('Policy push to %s will be retried: %s', name, message)
+            with self._lock:
+                self._not_before[name] = time.time() + self.retry_delay
+        else:
+            logger.error('Policy push to %s failed: %s', name, message)
+            self._finish(name, False, message)
+
+    def _collect(self):
+        for name, poller in list(self._pollers.items()):
+            if not poller.done():
+                continue
+            with self._lock:
+                del self._pollers[name]
+            task = poller.task
+            if task.in_progress:
+                self._failed(name, 'Task did not complete after {} status '
+                    'queries: {}'.format(self.max_tries, task.last_message))
+            elif task.success:
+                self._finish(name, True, task.last_message)
+            else:
+                self._failed(name, task.last_message)
+
+    def _ready(self, name):
+        for dependency in self.depends[name]:
+            if dependency not in self.engines:
+                continue
+            result = self.results.get(dependency)
+            if result is None:
+                return False
+            if not result.success:
+                self._finish(name, False, 'Skipped, dependency {} failed'
+                    .format(dependency))
+                return False
+        return True
+
+    def _skip_failed(self):
+        # Repeat until no engine is skipped to follow chains of dependencies
+        count = None
+        while count != len(self.results):
+            count = len(self.results)
+            for name in self.engines:
+                if name not in self.results:
+                    self._ready(name)
+
+    def _run(self):
+        while len(self.results) < len(self.engines):
+            self._collect()
+            now = time.time()
+            for name in self.engines:
+                if len(self._pollers) >= self.max_concurrent:
+                    break
+                if name in self.results or name in self._pollers or \
+                    self._not_before.get(name, 0) > now:
+                    continue
+                if self._ready(name):
+                    self._start_upload(name)
+            if not self._pollers and not self._not_before:
+                # A dependency may have failed after its dependents were
+                # checked, skip those before any engine is circular
+                self._skip_failed()
+                remaining = [name for name in self.engines
+                             if name not in self.results]
+                if not any(self._ready(name) for name in remaining):
+                    for name in remaining:
+                        self._finish(name, False,
+                            'Skipped, circular dependency')
+            self._changed.wait(1)
+            self._changed.clear()
+        self._done.set()
+
+    def __repr__(self):
+        return '%s(engines=%s,progress=%s)' % (
+            self.__class__.__name__, len(self.engines), self.progress)
+
+
+class Fleet(object):
+    """
+    A group of engines for running operations concurrently.
+
+    :param engines: engines by name or instance
+    :type engines: list(str,Engine)
+    :param int max_workers: max number of engines processed concurrently
+    :ivar dict failures: engine name to exception for engines that failed
+        the last operation
+    """
+    def __init__(self, engines, max_workers=10):
+        self.engines = [engine if isinstance(engine, Engine) else Engine(engine)
+                        for engine in engines]
+        self.max_workers = max_workers
+        self.failures = {}
+        self._alias_map = None
+        self._acl_map = None
+
+    @property
+    def alias_map(self):
+        """
+        Aliases by href, listed once and shared by all engines in the
+        fleet.
+
+        :rtype: dict
+        """
+        if self._alias_map is None:
+            self._alias_map = {alias.href: alias
+                               for alias in Alias.objects.all()}
+        return self._alias_map
+
+    @property
+    def acl_map(self):
+        """
+        Access control lists by href, listed once and shared by all
+        engines in the fleet.
+
+        :rtype: dict
+        """
+        if self._acl_map is None:
+            self._acl_map = {acl.href: acl
+                             for acl in AccessControlList.objects.all()}
+        return self._acl_map
+
+    def refresh(self):
+        """
+        Clear the shared alias and access control list indexes. They are
+        reloaded on next use.
+
+        :return: None
+        """
+        self._alias_map = self._acl_map = None
+
+    def run(self, function):
+        """
+        Run a function against every engine in the fleet concurrently.
+        The function takes the engine as the only argument.
+
+        :param callable function: function to run for each engine
+        :return: engine name to function result, for engines that did
+            not raise an exception
+        :rtype: dict
+        """
+        results, self.failures = {}, {}
+        for engine, result, error in parallel_map(
+                function, self.engines, self.max_workers):
+            if error is not None:
+                logger.error('Fleet operation failed for engine %s: %s',
+                    engine.name, error)
+                self.failures[engine.name] = error
+            else:
+                results[engine.name] = result
+        return results
+
+    def alias_resolving(self):
+        """
+        Resolve the alias values for every engine in the fleet.
+
+        :return: engine name to list of aliases with resolved values
+        :rtype: dict(str, list(Alias))
+        """
+        alias_map = self.alias_map
+
+        def resolve(engine):
+            return [Alias.from_engine(alias, alias_map)
+                    for alias in engine.make_request(resource='alias_resolving')]
+        return self.run(resolve)
+
+    def permissions(self):
+        """
+        Retrieve the access control lists granted on every engine in the
+        fleet.
+
+        :return: engine name to list of access control lists
+        :rtype: dict(str, list(AccessControlList))
+        """
+        acl_map = self.acl_map
+
+        def permissions(engine):
+            return [acl_map.get(acl) for acl in engine.granted_acls()]
+        return self.run(permissions)
+
+    def health_snapshot(self, appliance_status=True):
+        """
+        Collect the health of all engines and nodes in the fleet. Engine
+        json and pending changes are retrieved for each engine, then
+        status and appliance status for each node, all requests running
+        concurrently.
+
+        :param bool appliance_status: include interface and hardware
+            status for each node
+        :return: engine name to snapshot
+        :rtype: dict(str, EngineSnapshot)
+        """
+        def load_engine(engine):
+            nodes = list(engine.nodes)
+            errors, pending = {}, None
+            if 'pending_changes' in engine.data.links:
+                try:
+                    pending = list(PendingChanges(engine))
+                except Exception as e:
+                    errors['pending_changes'] = e
+            return nodes, pending, errors
+
+        engines = self.run(load_engine)
+
+        tasks = []
+        for engine in self.engines:
+            if engine.name in engines:
+                for node in engines[engine.name][0]:
+                    tasks.append((node, 'status'))
+                    if appliance_status:
+                        tasks.append((node, 'appliance_status'))
+
+        def fetch(task):
+            node, resource = task
+            return getattr(node, resource)()
+
+        node_results = collections.defaultdict(dict)
+        node_errors = collections.defaultdict(dict)
+        for (node, resource), result, error in parallel_map(
+                fetch, tasks, self.max_workers):
+            if error is not None:
+                node_errors[node.href][resource] = error
+            else:
+                node_results[node.href][resource] = result
+
+        snapshot = {}
+        for engine in self.engines:
+            if engine.name not in engines:
+                continue
+            nodes, pending, errors = engines[engine.name]
+            node_snapshots = []
+            for node in nodes:
+                status = node_results[node.href].get('status')
+                interfaces, hardware = node_results[node.href].get(
+                    'appliance_status', (None, None))
+                if hardware is not None:
+                    hardware = [status_entry for item in hardware
+                                for status_entry in item_status(item)]
+                node_snapshots.append(NodeSnapshot(
+                    name=node.name,
+                    nodeid=node.nodeid,
+                    status=getattr(status, 'status', None),
+                    state=getattr(status, 'state', None),
+                    configuration_status=getattr(
+                        status, 'configuration_status', None),
+                    installed_policy=getattr(status, 'installed_policy', None),
+                    version=getattr(status, 'version', None),
+                    dyn_up=getattr(status, 'dyn_up', None),
+                    platform=getattr(status, 'platform', None),
+                    interfaces=list(interfaces) if interfaces is not None \
+                        else None,
+                    hardware=hardware,
+                    errors=node_errors.get(node.href, {})))
+
+            installed_policy = next((node.installed_policy
+                for node in node_snapshots if node.installed_policy), None)
+            snapshot[engine.name] = EngineSnapshot(
+                name=engine.name,
+                type=engine.type,
+                installed_policy=installed_policy,
+                pending_changes=pending,
+                nodes=node_snapshots,
+                errors=errors)
+        return snapshot
+
+    def rule_hits(self, policy, duration_type='one_week', **kw):
+        """
+        Rule counters of a policy aggregated across all engines in the
+        fleet. Engines that fail to return counters are set in
+        ``failures``. Keyword arguments are passed to
+        :class:`~smc.policy.analytics.RuleHitAnalytics`.
+
+        :param Policy policy: policy installed on the engines
+        :param str duration_type: duration for the rule counters
+        :rtype: RuleHitAnalytics
+        """
+        from smc.policy.analytics import RuleHitAnalytics
+        kw.setdefault('max_workers', self.max_workers)
+        analytics = RuleHitAnalytics(
+            policy, self.engines, duration_type=duration_type, **kw)
+        self.failures = dict(analytics.failures)
+        return analytics
+
+    def upload(self, policy=None, **kw):
+        """
+        Upload policy to all engines in the fleet. If policy is None, the
+        installed policy is refreshed. Keyword arguments are passed to
+        :class:`PolicyPush`.
+
+        :param str policy: name of policy to upload
+        :return: the started policy push
+        :rtype: PolicyPush
+        """
+        kw.setdefault('max_concurrent', self.max_workers)
+        return PolicyPush(self.engines, policy, **kw).start()
+
+    def __len__(self):
+        return len(self.engines)
+
+    def __iter__(self):
+        return iter(self.engines)
+
+    def __repr__(self):
+        return '%s(engines=%s)' % (self.__class__.__name__, len(self.engines))
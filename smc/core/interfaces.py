@@ -658,6 +658,28 @@ class Interface(SubElement):
         
         .. note:: Interfaces with multiple IP addresses are ignored
         """
+        updated, invalid_routes = self._merge_interface(
+            other_interface, ignore_mgmt)
+        
+        interface = self
+        if updated:
+            interface = self.update()
+            if invalid_routes: # Interface updated, check the routes
+                del_invalid_routes(self._engine, invalid_routes)
+            
+        return interface, updated
+    
+    def _merge_interface(self, other_interface, ignore_mgmt=True):
+        """
+        Merge the settings of another interface into this interface data
+        without committing the change. Called by :meth:`update_interface`
+        and the engine reconciler which commits multiple interface changes
+        in a single engine update.
+        
+        :return: whether the interface was modified, and nicids of sub
+            interfaces where the network changed
+        :rtype: tuple(bool, list)
+        """
         base_updated = self._update_interface(other_interface)
         
         mgmt = ('auth_request', 'backup_heartbeat', 'backup_mgt',
@@ -723,14 +745,8 @@ class Interface(SubElement):
             _updated, routes = process_interfaces(self, other_interface)
             if _updated: updated = True
             invalid_routes.extend(routes)
-            
-        interface = self
-        if updated or base_updated:
-            interface = self.update()
-            if invalid_routes: # Interface updated, check the routes
-                del_invalid_routes(self._engine, invalid_routes)
-            
-        return interface, base_updated or updated
+        
+        return base_updated or updated, invalid_routes
 
     @property
     def name(self):
@@ -1306,6 +1322,10 @@ class Layer2PhysicalInterface(PhysicalInterface):
         #TODO: Not Yet Implemented
         pass
     
+    def _merge_interface(self, other_interface, ignore_mgmt=True):
+        #TODO: Not Yet Implemented
+        return False, []
+    
 
 class Layer3PhysicalInterface(PhysicalInterface):
     """
@@ -278,10 +278,7 @@ class Node(SubElement):
         :raises NodeCommandFailed: failure to retrieve current status
         :rtype: InterfaceStatus
         """
-        result = self.make_request(
-            NodeCommandFailed,
-            resource='appliance_status')
-        return InterfaceStatus(result.get('interface_statuses', []))
+        return self.appliance_status()[0]
     
     @property
     def hardware_status(self):
@@ -293,10 +290,25 @@ class Node(SubElement):
         :raises NodeCommandFailed: failure to retrieve current status
         :rtype: HardwareStatus
         """
+        return self.appliance_status()[1]
+    
+    def appliance_status(self):
+        """
+        Obtain both the interface and hardware status for this node
+        with a single request. Use this instead of calling
+        :attr:`interface_status` and :attr:`hardware_status` separately
+        when both are needed::
+        
+            interfaces, hardware = node.appliance_status()
+        
+        :raises NodeCommandFailed: failure to retrieve current status
+        :rtype: tuple(InterfaceStatus, HardwareStatus)
+        """
         result = self.make_request(
             NodeCommandFailed,
             resource='appliance_status')
-        return HardwareStatus(result.get('hardware_statuses', []))
+        return (InterfaceStatus(result.get('interface_statuses', [])),
+                HardwareStatus(result.get('hardware_statuses', [])))
     
     @property
     def health(self):
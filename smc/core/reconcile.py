@@ -0,0 +1,340 @@
+"""
+The engine reconciler applies a desired engine configuration to an
+existing engine. The desired state is compared against a single fetch of
+the engine json, all differences are applied to the engine json in memory
+and the engine is committed with a single update. The update uses the
+ETag of the original fetch so the commit fails if the engine was modified
+by another session in the meantime.
+
+Interfaces use the same format as ``create_bulk`` on the engine types, or
+can be provided as interface instances. Only interfaces and settings
+provided in the desired state are compared; settings that are omitted are
+left unchanged::
+
+    desired = {
+        'interfaces': [
+            {'interface_id': 1,
+             'interfaces': [{'nodes': [{'address': '2.2.2.2',
+                                        'network_value': '2.2.2.0/24'}]}],
+             'zone_ref': 'internal'},
+            {'interface_id': 3,
+             'interfaces': [{'nodes': [{'address': '3.3.3.3',
+                                        'network_value': '3.3.3.0/24'}],
+                             'vlan_id': 3}]}],
+        'dns': ['8.8.8.8', DNSServer('internal-dns')],
+        'antivirus': True,
+        'file_reputation': True,
+        'default_nat': False,
+        'snmp': {'snmp_agent': 'myagent', 'snmp_location': 'dc1',
+                 'snmp_interface': [1]},
+        'routing': [
+            {'interface_id': 1, 'gateway': Router('gw-2.2.2.1'),
+             'destination': [Network('remote-10.0.0.0/8')]}]
+    }
+
+    engine = Engine('myfw')
+    for change in engine.reconcile(desired):
+        print(change)
+
+Use ``dry_run=True`` to compute the differences without committing. The
+in memory engine json is discarded after a dry run.
+
+Routing is a separate resource on the SMC and cannot be part of the engine
+update. When interface networks change or static routes are requested,
+the routing tree is fetched once after the engine update, invalid routes
+are pruned and new routes added in memory, and the routing tree is
+committed with a single ETag guarded update.
+"""
+import copy
+import collections
+from smc.core.interfaces import InterfaceEditor, Interface, TunnelInterface,\
+    Layer3PhysicalInterface, Layer2PhysicalInterface, ClusterPhysicalInterface
+from smc.core.route import Routing, RoutingNodeGateway, _which_ip_protocol
+from smc.elements.profiles import SNMPAgent
+from smc.base.util import element_resolver
+from smc.api.exceptions import InterfaceNotFound, UpdateElementFailed
+
+
+#: A single difference between the current and desired engine state.
+#: Section is the configuration area such as 'interface', 'dns', 'snmp',
+#: an addon name or 'routing'. Before and after are json values.
+Change = collections.namedtuple('Change', 'section name action before after')
+
+
+#: Addon settings that can be enabled or disabled by the reconciler, mapped
+#: to the engine json key that must exist for the helper to modify
+ADDONS = collections.OrderedDict([
+    ('antivirus', 'antivirus'),
+    ('file_reputation', 'gti_settings'),
+    ('url_filtering', 'ts_settings'),
+    ('sidewinder_proxy', None),
+    ('default_nat', None)])
+
+
+class EngineReconciler(object):
+    """
+    Compute and apply the differences between an engine and a desired
+    engine configuration.
+
+    :param Engine engine: engine to reconcile
+    :param dict desired: desired engine state. Valid keys are `interfaces`,
+        `dns`, `snmp`, `routing` and the addon settings `antivirus`,
+        `file_reputation`, `url_filtering`, `sidewinder_proxy` and
+        `default_nat`.
+    :param bool ignore_mgmt: ignore management settings on interfaces.
+        These are better set using `engine.interface_options`.
+    :ivar list changes: changes computed by the last call to :meth:`plan`
+    """
+    def __init__(self, engine, desired, ignore_mgmt=True):
+        self.engine = engine
+        self.desired = desired
+        self.ignore_mgmt = ignore_mgmt
+        self.changes = []
+        self._invalid_routes = []
+
+    def plan(self):
+        """
+        Apply the desired state to the engine json in memory and return
+        the changes. Nothing is committed to the SMC.
+
+        :raises UpdateElementFailed: an existing interface cannot be
+            reconciled, such as a layer 2 interface
+        :rtype: list(Change)
+        """
+        self.engine._del_cache()    # Start with a single fresh fetch
+        self.changes, self._invalid_routes = [], []
+
+        for interface in self.desired.get('interfaces', []):
+            self._reconcile_interface(interface)
+
+        if 'dns' in self.desired:
+            self._reconcile_dns(self.desired['dns'])
+
+        for addon, key in ADDONS.items():
+            if addon in self.desired:
+                self._reconcile_addon(addon, key, self.desired[addon])
+
+        if 'snmp' in self.desired:
+            self._reconcile_snmp(self.desired['snmp'])
+
+        return self.changes
+
+    def apply(self, dry_run=False):
+        """
+        Compute the changes and commit the engine with a single update.
+        If interface networks changed or routes are provided, the routing
+        tree is then updated with a single update.
+
+        :param bool dry_run: compute the changes only
+        :raises UpdateElementFailed: failed to commit, for example when the
+            engine was modified after it was fetched
+        :return: changes applied
+        :rtype: list(Change)
+        """
+        changes = self.plan()
+        if dry_run:
+            self.engine._del_cache()
+            return changes
+
+        if changes:
+            self.engine.update()
+
+        routes = self.desired.get('routing', [])
+        if self._invalid_routes or routes:
+            self._reconcile_routing(routes)
+
+        return self.changes
+
+    def _as_interface(self, interface):
+        if isinstance(interface, Interface):
+            return interface
+        interface = dict(interface)
+        if interface.get('type', None) == 'tunnel_interface':
+            return TunnelInterface(**interface)
+        if 'fw_cluster' in self.engine.type:
+            return ClusterPhysicalInterface(**interface)
+        if self.engine.type == 'single_fw':
+            interface.update(interface='single_node_interface')
+        return Layer3PhysicalInterface(**interface)
+
+    def _reconcile_interface(self, desired):
+        desired = self._as_interface(desired)
+        try:
+            interface = InterfaceEditor(self.engine).get(desired.interface_id)
+        except InterfaceNotFound:
+            self.engine.data.setdefault('physicalInterfaces', []).append(
+                {desired.typeof: desired.data.data})
+            self.changes.append(Change(
+                'interface', desired.interface_id, 'created', None,
+                desired.data.data))
+            return
+
+        if isinstance(interface, Layer2PhysicalInterface):
+            # Merging layer 2 interfaces is not supported. Discard changes
+            # already applied to the engine json
+            self.engine._del_cache()
+            raise UpdateElementFailed(
+                'Interface {} on engine {} cannot be reconciled: merging '
+                'layer 2 interfaces is not supported'.format(
+                    interface.interface_id, self.engine.name))
+
+        before = copy.deepcopy(interface.data.data)
+        modified, invalid_routes = interface._merge_interface(
+            desired, self.ignore_mgmt)
+        if modified:
+            self._invalid_routes.extend(invalid_routes)
+            self.changes.append(Change(
+                'interface', interface.interface_id, 'modified', before,
+                interface.data.data))
+
+    def _reconcile_dns(self, servers):
+        current = self.engine.data.get('domain_server_address', [])
+        desired = []
+        for rank, server in enumerate(servers):
+            href = element_resolver(server)
+            if href.startswith('http'):
+                desired.append({'rank': rank, 'ne_ref': href})
+            else:
+                desired.append({'rank': rank, 'value': href})
+
+        def key(entries):
+            return [(entry.get('value'), entry.get('ne_ref'))
+                    for entry in sorted(entries, key=lambda e: e.get('rank', 0))]
+
+        if key(current) != key(desired):
+            self.engine.data['domain_server_address'] = desired
+            self.changes.append(Change(
+                'dns', 'domain_server_address', 'modified', current, desired))
+
+    def _reconcile_addon(self, addon, key, enabled):
+        if key is not None:
+            self.engine.data.setdefault(key, {})
+        helper = getattr(self.engine, addon)
+        if bool(helper.status) != bool(enabled):
+            if enabled:
+                helper.enable()
+            else:
+                helper.disable()
+            self.changes.append(Change(
+                addon, 'enabled', 'modified', not enabled, bool(enabled)))
+
+    def _reconcile_snmp(self, snmp):
+        data = self.engine.data
+        current = dict(
+            snmp_agent_ref=data.get('snmp_agent_ref'),
+            snmp_location=data.get('snmp_location', ''),
+            snmp_interface=data.get('snmp_interface', []))
+
+        if not snmp:
+            if current['snmp_agent_ref']:
+                self.engine.snmp.disable()
+                self.changes.append(Change(
+                    'snmp', 'snmp_agent', 'removed', current, None))
+            return
+
+        agent = snmp.get('snmp_agent')
+        if not element_resolver(agent).startswith('http'):
+            agent = SNMPAgent(agent).href
+        self.engine.snmp.enable(
+            agent, snmp.get('snmp_location'), snmp.get('snmp_interface'))
+
+        desired = dict(
+            snmp_agent_ref=data.get('snmp_agent_ref'),
+            snmp_location=data.get('snmp_location', ''),
+            snmp_interface=data.get('snmp_interface', []))
+
+        def nics(entries):
+            return sorted((nic.get('address'), str(nic.get('nicid')))
+                          for nic in entries)
+
+        if current['snmp_agent_ref'] != desired['snmp_agent_ref'] or \
+            current['snmp_location'] != desired['snmp_location'] or \
+            nics(current['snmp_interface']) != nics(desired['snmp_interface']):
+            self.changes.append(Change(
+                'snmp', 'snmp_agent', 'modified', current, desired))
+        else: # Keep the original ordering of interfaces
+            data.update(current)
+
+    def _reconcile_routing(self, routes):
+        routing = Routing(href=self.engine.get_relation('routing'))
+        nicids = set(map(str, self._invalid_routes))
+        modified = False
+
+        interfaces = routing.data.get('routing_node', [])
+        for interface in list(interfaces):
+            if str(interface.get('nic_id')) not in nicids:
+                continue
+            if interface.get('to_delete', False):
+                interfaces.remove(interface)
+                self.changes.append(Change(
+                    'routing', interface.get('name'), 'removed', interface, None))
+                modified = True
+                continue
+            networks = interface.get('routing_node', [])
+            for network in list(networks):
+                if network.get('invalid', False) or network.get('to_delete', False):
+                    networks.remove(network)
+                    self.changes.append(Change(
+                        'routing', network.get('name'), 'removed', network, None))
+                    modified = True
+
+        for route in routes:
+            if self._add_route(interfaces, **route):
+                modified = True
+
+        if modified:
+            routing.update()
+
+    def _add_route(self, interfaces, interface_id, gateway, destination=None,
+                   network=None):
+        interface = None
+        for node in interfaces:
+            if str(node.get('nic_id')) == str(interface_id) or \
+                str(node.get('dynamic_nicid')) == str(interface_id):
+                interface = node
+                break
+        if interface is None:
+            raise UpdateElementFailed(
+                'Interface {} has no routing node on engine {}, routes '
+                'cannot be added.'.format(interface_id, self.engine.name))
+
+        destination = destination if destination else []
+        gw_ipv4, gw_ipv6 = _which_ip_protocol(gateway)
+        modified = False
+        for network_node in interface.get('routing_node', []):
+            ip = network_node.get('ip', '')
+            if network is not None and ip != network:
+                continue
+            if not (gw_ipv6 if ':' in ip else gw_ipv4):
+                continue
+
+            gateway_node = None
+            for node in network_node.get('routing_node', []):
+                if node.get('href') == gateway.href:
+                    gateway_node = node
+                    break
+
+            if gateway_node is None:
+                gateway_node = RoutingNodeGateway(
+                    gateway, destinations=destination).data.data
+                network_node.setdefault('routing_node', []).append(gateway_node)
+                self.changes.append(Change(
+                    'routing', gateway.name, 'created', None, gateway_node))
+                modified = True
+                continue
+
+            existing = [node.get('href') for node in
+                        gateway_node.get('routing_node', [])]
+            added = [dest for dest in destination if dest.href not in existing]
+            for dest in added:
+                gateway_node.setdefault('routing_node', []).append(
+                    {'level': 'any', 'href': dest.href, 'name': dest.name})
+            if added:
+                self.changes.append(Change(
+                    'routing', gateway.name, 'modified', existing,
+                    [node.get('href') for node in gateway_node['routing_node']]))
+                modified = True
+        return modified
+
+    def __repr__(self):
+        return '%s(engine=%s)' % (self.__class__.__name__, self.engine.name)
@@ -25,6 +25,9 @@ class Snapshot(SubElement):
                 snapshot.download()
 
     Snapshot filename will be <snapshot_name>.zip if not specified.
+    
+    Downloaded snapshots can be queried offline using
+    :class:`smc.core.snapshot.SnapshotReader`.
     """
 
     def download(self, filename=None):
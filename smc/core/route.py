@@ -125,6 +125,8 @@ def flush_parent_cache(node):
     and a clean way to force the object to update itself
     if attributes or methods are referenced after update.
     """
+    if node is None:
+        return
     if node._parent is None:
         node._del_cache()
         return
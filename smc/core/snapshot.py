@@ -0,0 +1,457 @@
+"""
+Offline reader for policy snapshots downloaded using
+:meth:`~smc.core.engine.Engine.generate_snapshot` or
+:meth:`~smc.core.resource.Snapshot.download`. The snapshot zip is read in
+place, without extracting it, and indexed on first use. Elements and
+policies are queried similar to the live elements, without requests to
+the SMC::
+
+    >>> with SnapshotReader('snapshot.zip') as snapshot:
+    ...     policy = snapshot.policy()
+    ...     for rule in policy.fw_ipv4_access_rules:
+    ...         if not rule.is_rule_section and rule.sources.is_any:
+    ...             print(rule.tag, rule.action, rule.services.all())
+    ...
+    2097152.0 allow [SnapshotElement(name=HTTP)]
+    >>> snapshot.get('myhost').data
+    {'name': 'myhost', 'mvia_address': [{'address': '1.1.1.1'}]}
+
+Element references in rules are resolved by name to the elements in the
+snapshot. Referenced elements that are not part of the snapshot, such as
+system elements, are returned as elements without data.
+"""
+import collections
+from smc.base.archive import iter_xml, xml_members, open_archive
+from smc.base.collection import SubElementCollection
+from smc.api.exceptions import ElementNotFound
+
+
+#: Element types that are policies
+POLICY_TYPES = ('fw_policy', 'fw_template_policy', 'fw_sub_ipv4_policy',
+                'ips_policy', 'ips_template_policy', 'layer2_policy',
+                'layer2_template_policy', 'inspection_template_policy',
+                'file_filtering_policy')
+
+#: XML rule container of each rule collection
+RULE_ENTRIES = {
+    'fw_ipv4_access_rules': 'access_entry',
+    'fw_ipv4_nat_rules': 'nat_entry',
+    'fw_ipv6_access_rules': 'ipv6_access_entry',
+    'fw_ipv6_nat_rules': 'ipv6_nat_entry',
+    'ips_ipv4_access_rules': 'access_entry',
+    'ips_ethernet_rules': 'ethernet_entry',
+    'layer2_ipv4_access_rules': 'access_entry',
+    'layer2_ethernet_rules': 'ethernet_entry',
+    'file_filtering_rules': 'file_filtering_entry'}
+
+
+class SnapshotElement(object):
+    """
+    Element read from a snapshot.
+
+    :ivar str typeof: element type
+    :ivar dict data: element data
+    """
+    def __init__(self, typeof, data, snapshot=None):
+        self.typeof = typeof
+        self.data = data
+        self._snapshot = snapshot
+
+    @property
+    def name(self):
+        return self.data.get('name')
+
+    @property
+    def comment(self):
+        return self.data.get('comment')
+
+    def __eq__(self, other):
+        return isinstance(other, SnapshotElement) and \
+            (self.typeof, self.name) == (other.typeof, other.name)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.typeof, self.name))
+
+    def __repr__(self):
+        return '%s(name=%s)' % (self.__class__.__name__, self.name)
+
+
+class SnapshotRuleElement(object):
+    """
+    Source, destination or service cell of a rule read from a snapshot.
+    """
+    def __init__(self, refs, snapshot):
+        self._refs = refs
+        self._snapshot = snapshot
+
+    @property
+    def is_any(self):
+        """
+        Is the field set to any
+
+        :rtype: bool
+        """
+        return any(ref.get('type') == 'any' or
+                   str(ref.get('value')).lower() == 'any'
+                   for ref in self._refs)
+
+    @property
+    def is_none(self):
+        """
+        Is the field set to none
+
+        :rtype: bool
+        """
+        return not self._refs
+
+    def all_as_names(self):
+        """
+        Names of the referenced elements.
+
+        :rtype: list(str)
+        """
+        if self.is_any:
+            return []
+        return [ref.get('value') for ref in self._refs]
+
+    def all(self):
+        """
+        Referenced elements, resolved to the elements in the snapshot.
+
+        :rtype: list(SnapshotElement)
+        """
+        if self.is_any:
+            return []
+        return [self._snapshot._resolve(ref.get('value'), ref.get('type'))
+                for ref in self._refs]
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.all_as_names())
+
+
+class SnapshotRule(SnapshotElement):
+    """
+    Rule read from a snapshot policy. Rule sections have no sources,
+    destinations or services.
+    """
+    #: Match cells and the reference tags in each
+    MATCH = {'sources': ('match_sources', 'match_source_ref'),
+             'destinations': ('match_destinations', 'match_destination_ref'),
+             'services': ('match_services', 'match_service_ref')}
+
+    def __init__(self, typeof, data, snapshot=None):
+        super(SnapshotRule, self).__init__(typeof, data, snapshot)
+        # The rule type is the single child of the rule entry
+        self.rule_type, self.rule = next(
+            ((tag, value[0]) for tag, value in data.items()
+             if isinstance(value, list) and value), (None, {}))
+
+    @property
+    def name(self):
+        return self.data.get('name') or 'Rule @{}'.format(self.tag)
+
+    @property
+    def tag(self):
+        return self.data.get('tag')
+
+    @property
+    def comment(self):
+        return self.data.get('comment') or self.rule.get('comment')
+
+    @property
+    def is_disabled(self):
+        return self.data.get('is_disabled') == 'true'
+
+    @property
+    def is_rule_section(self):
+        return 'match_part' not in self.rule
+
+    @property
+    def action(self):
+        """
+        Rule action type, such as allow or discard, or None
+
+        :rtype: str
+        """
+        action = self.rule.get('action')
+        return action[0].get('type') if action else None
+
+    @property
+    def options(self):
+        """
+        Rule options, such as NAT and logging, as parsed from the snapshot
+
+        :rtype: dict
+        """
+        return {key: value for key, value in self.rule.items()
+                if key not in ('match_part', 'action')}
+
+    def _match(self, cell):
+        container, ref = self.MATCH[cell]
+        match = self.rule.get('match_part', [{}])[0].get(container, [{}])[0]
+        return SnapshotRuleElement(match.get(ref, []), self._snapshot)
+
+    @property
+    def sources(self):
+        return self._match('sources')
+
+    @property
+    def destinations(self):
+        return self._match('destinations')
+
+    @property
+    def services(self):
+        return self._match('services')
+
+
+class SnapshotRuleCollection(SubElementCollection):
+    """
+    Rules of a snapshot policy. Provides the same methods as live rule
+    collections for iterating and finding rules.
+    """
+    def __init__(self, rules):
+        super(SnapshotRuleCollection, self).__init__(None, SnapshotRule)
+        self._result_cache = rules
+
+    def _fetch_all(self):
+        pass
+
+
+def _rules(relation):
+    return property(lambda self: self.rules(relation),
+                    doc='Rules in {}\n\n:rtype: SnapshotRuleCollection'
+                    .format(relation))
+
+
+class SnapshotPolicy(SnapshotElement):
+    """
+    Policy read from a snapshot. Rule collections have the same names as
+    the rule collections of the live policy.
+    """
+    def __init__(self, typeof, data, snapshot=None):
+        super(SnapshotPolicy, self).__init__(typeof, data, snapshot)
+        self._rules = {}
+
+    def rules(self, relation):
+        """
+        Rules of a rule collection, parsed on first access.
+
+        :param str relation: rule collection, such as fw_ipv4_access_rules
+        :rtype: SnapshotRuleCollection
+        """
+        entry = RULE_ENTRIES.get(relation, relation)
+        if entry not in self._rules:
+            entries = self.data.get(entry, [{}])[0].get('rule_entry', [])
+            self._rules[entry] = SnapshotRuleCollection(
+                [SnapshotRule(entry, rule, self._snapshot)
+                 for rule in entries])
+        return self._rules[entry]
+
+    fw_ipv4_access_rules = _rules('fw_ipv4_access_rules')
+    fw_ipv4_nat_rules = _rules('fw_ipv4_nat_rules')
+    fw_ipv6_access_rules = _rules('fw_ipv6_access_rules')
+    fw_ipv6_nat_rules = _rules('fw_ipv6_nat_rules')
+    ips_ipv4_access_rules = _rules('ips_ipv4_access_rules')
+    ips_ethernet_rules = _rules('ips_ethernet_rules')
+    layer2_ipv4_access_rules = _rules('layer2_ipv4_access_rules')
+    layer2_ethernet_rules = _rules('layer2_ethernet_rules')
+    file_filtering_rules = _rules('file_filtering_rules')
+
+    @property
+    def template(self):
+        """
+        Template of the policy, if part of the snapshot
+
+        :rtype: SnapshotPolicy
+        """
+        name = self.data.get('template_ref') or self.data.get('template')
+        return self._snapshot._resolve(name) if name else None
+
+    def search_rule(self, search):
+        """
+        Search rules in all rule collections by tag, name or comment.
+
+        :param str search: search string
+        :rtype: list(SnapshotRule)
+        """
+        results = []
+        for entry in sorted(set(RULE_ENTRIES.values())):
+            for rule in self.rules(entry):
+                if search == rule.tag or search in rule.name or \
+                        search in (rule.comment or ''):
+                    results.append(rule)
+        return results
+
+
+class SnapshotReader(object):
+    """
+    Read a policy snapshot zip. The zip is kept open until :meth:`close`
+    is called, or the reader is used as a context manager.
+
+    :param str filename: path to the snapshot zip
+    :raises IOError: file is not a valid zip
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.archive = open_archive(filename)
+        self._index = None   # typeof: OrderedDict(name: element)
+        self._names = None   # name: [element]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Close the snapshot zip. Elements already indexed remain available.
+
+        :return: None
+        """
+        self.archive.close()
+
+    @property
+    def members(self):
+        """
+        Names of the files in the snapshot
+
+        :rtype: list(str)
+        """
+        return self.archive.namelist()
+
+    def open(self, member):
+        """
+        Open a file in the snapshot for streaming read.
+
+        :param str member: name of the file
+        :return: file like object
+        """
+        return self.archive.open(member)
+
+    def _load(self):
+        if self._index is not None:
+            return
+        index = collections.OrderedDict()
+        names = collections.defaultdict(list)
+        for member in xml_members(self.archive):
+            with self.open(member) as fileobj:
+                for typeof, data in iter_xml(fileobj):
+                    cls = SnapshotPolicy if typeof in POLICY_TYPES \
+                        else SnapshotElement
+                    element = cls(typeof, data, self)
+                    index.setdefault(typeof, collections.OrderedDict())[
+                        element.name] = element
+                    names[element.name].append(element)
+        self._index, self._names = index, names
+
+    def _resolve(self, name, typeof=None):
+        self._load()
+        elements = self._names.get(name, [])
+        for element in elements:
+            if element.typeof == typeof:
+                return element
+        if elements:
+            return elements[0]
+        return SnapshotElement(typeof, {'name': name}, self)
+
+    @property
+    def types(self):
+        """
+        Element types in the snapshot
+
+        :rtype: list(str)
+        """
+        self._load()
+        return list(self._index)
+
+    def objects(self, typeof):
+        """
+        Elements of the given type.
+
+        :param str typeof: element type, such as host or fw_policy
+        :rtype: list(SnapshotElement)
+        """
+        self._load()
+        return list(self._index.get(typeof, {}).values())
+
+    def all(self):
+        """
+        All elements in the snapshot.
+
+        :rtype: list(SnapshotElement)
+        """
+        self._load()
+        return [element for elements in self._index.values()
+                for element in elements.values()]
+
+    def get(self, name, typeof=None):
+        """
+        Get an element by name.
+
+        :param str name: name of element
+        :param str typeof: element type, required if names are not unique
+        :raises ElementNotFound: element is not in the snapshot
+        :rtype: SnapshotElement
+        """
+        self._load()
+        for element in self._names.get(name, []):
+            if typeof is None or element.typeof == typeof:
+                return element
+        raise ElementNotFound('Element {} was not found in snapshot {}'
+                              .format(name, self.filename))
+
+    def filter(self, value, typeof=None, case_sensitive=True):
+        """
+        Elements with the value in the name or comment.
+
+        :param str value: value to match
+        :param str typeof: only return elements of this type
+        :param bool case_sensitive: whether the match should consider case
+        :rtype: list(SnapshotElement)
+        """
+        self._load()
+        if not case_sensitive:
+            value = value.lower()
+        elements = self.objects(typeof) if typeof else self.all()
+        results = []
+        for element in elements:
+            text = '{}\n{}'.format(element.name, element.comment or '')
+            if value in (text if case_sensitive else text.lower()):
+                results.append(element)
+        return results
+
+    @property
+    def policies(self):
+        """
+        Policies in the snapshot
+
+        :rtype: list(SnapshotPolicy)
+        """
+        self._load()
+        return [element for typeof in POLICY_TYPES
+                for element in self._index.get(typeof, {}).values()]
+
+    def policy(self, name=None):
+        """
+        Get a policy by name. If no name is provided, the first policy
+        that is not a template is returned, which is the policy installed
+        on the engine.
+
+        :param str name: name of policy
+        :raises ElementNotFound: policy is not in the snapshot
+        :rtype: SnapshotPolicy
+        """
+        policies = self.policies
+        for policy in policies:
+            if name == policy.name or (
+                    name is None and 'template' not in policy.typeof):
+                return policy
+        raise ElementNotFound('Policy {} was not found in snapshot {}'
+                              .format(name or '', self.filename))
+
+    def __repr__(self):
+        return '%s(filename=%s)' % (self.__class__.__name__, self.filename)
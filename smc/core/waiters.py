@@ -33,6 +33,17 @@ to block input while waiting for the engine to reach a specific status::
     while not waiter.done():
         print("Status after 5 sec wait: %s" % waiter.result(5))
 
+When waiting on many nodes, provide a shared
+:class:`~smc.base.scheduler.PollScheduler` instead of running a thread
+per waiter. Waiters on the same node share a single status request per
+poll cycle::
+
+    scheduler = PollScheduler(interval=5)
+    waiters = [NodeStatusWaiter(node, 'Online', scheduler=scheduler)
+               for engine in Engine.objects.all() for node in engine.nodes]
+    for waiter in waiters:
+        waiter.wait()
+
 """
 import time
 import threading
@@ -53,9 +64,17 @@ class NodeWaiter(threading.Thread):
     """
     Node Waiter provides a common threaded interface to monitoring
     a nodes status and wait for a specific response.
+
+    :param Node resource: Engine node to check for status
+    :param str status: used defined status to wait for
+    :param int timeout: seconds between status queries
+    :param int max_wait: max number of status queries
+    :param PollScheduler scheduler: optional shared scheduler. If provided,
+        status is polled by the scheduler instead of starting a thread
+        for this waiter.
     """
     def __init__(self, resource, status, timeout=5,
-                 max_wait=36, **kw):
+                 max_wait=36, scheduler=None, **kw):
         threading.Thread.__init__(self)
         self._desired_status = status
         self._resource = resource #node resource
@@ -64,8 +83,14 @@ class NodeWaiter(threading.Thread):
         self._timeout = timeout
         self.callbacks = []
         self._done = threading.Event()
+        self._scheduler = scheduler
         self.daemon = True
-        self.start()
+        if scheduler is not None:
+            scheduler.register(
+                resource.href, resource.status, self._on_status,
+                interval=timeout)
+        else:
+            self.start()
 
     def run(self):
         while not self.finished():
@@ -81,6 +106,22 @@ class NodeWaiter(threading.Thread):
         for call in self.callbacks:
             call(self._status)
 
+    def _on_status(self, status):
+        # Called by the scheduler with the ApplianceStatus or exception
+        if self._done.is_set():
+            return True
+        if isinstance(status, Exception):
+            self._status = status
+        else:
+            self._status = getattr(status, self.value)
+            self._max_wait -= 1
+            if not self.finished():
+                return False
+        self._done.set()
+        for call in self.callbacks:
+            call(self._status)
+        return True
+
     def _get_status(self):
         # Raises NodeCommandFailed
         latest = getattr(self._resource.status(), self.value)
@@ -111,6 +152,8 @@ class NodeWaiter(threading.Thread):
 
         :rtype: bool
         """
+        if self._scheduler is not None:
+            return self._done.is_set()
         return self._done.is_set() or not self.isAlive()
 
     def result(self, timeout=None):
@@ -127,13 +170,19 @@ class NodeWaiter(threading.Thread):
         """
         Blocking method to wait for thread
         """
-        self.join(timeout)
+        if self._scheduler is not None:
+            self._done.wait(timeout)
+        else:
+            self.join(timeout)
 
     def stop(self):
         """
         Stop thread if it's still running
         """
-        if self.isAlive():
+        if self._scheduler is not None:
+            self._done.set()
+            self._scheduler.unregister(self._resource.href, self._on_status)
+        elif self.isAlive():
             self._done.set()
 
 
@@ -1,13 +1,122 @@
 """
 Helper functions to retrieve various elements that may be required by specific
 constructors.
+
+Locations, zones and logical interfaces resolved by name are cached for the
+current session. The first lookup of a type lists all elements of that type
+once and subsequent lookups are served from the cache. Elements created by
+the helpers are added to the cache. When creating many engines or
+interfaces referencing the same zones, only a single listing per type is
+required::
+
+    warm_helper_cache()    # Optional, otherwise warmed on first use
+    for name in engines:
+        Layer3Firewall.create_bulk(name, interfaces=..., location_ref='DC1')
+
+If elements are removed outside of this session, call
+:func:`clear_helper_cache`.
 """
+import threading
+import smc
 from smc.elements.network import Zone
 from smc.administration.system import AdminDomain
 from smc.elements.other import LogicalInterface, Location
 from smc.api.exceptions import ElementNotFound
     
 
+class HelperCache(object):
+    """
+    Name to href cache for a single element type. The cache is warmed
+    with a single listing of all elements of the type.
+
+    :param Element element_cls: element class to cache
+    """
+    def __init__(self, element_cls):
+        self.element_cls = element_cls
+        self._hrefs = None
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """
+        Load all elements of this type by name.
+
+        :return: None
+        """
+        hrefs = {element.name: element.href
+                 for element in self.element_cls.objects.all()}
+        with self._lock:
+            self._hrefs = hrefs
+
+    def get(self, name):
+        """
+        Get the href for the element by name.
+
+        :rtype: str or None
+        """
+        if self._hrefs is None:
+            self.warm()
+        return self._hrefs.get(name)
+
+    def add(self, name, href):
+        with self._lock:
+            if self._hrefs is not None:
+                self._hrefs[name] = href
+
+    def get_or_create(self, name):
+        """
+        Get the href for the element by name, creating the element if
+        it does not exist.
+
+        :raises CreateElementFailed: failed to create the element
+        :rtype: str
+        """
+        href = self.get(name)
+        if href is None:
+            # May have been created by another session since warming
+            href = self.element_cls.get_or_create(name=name).href
+            self.add(name, href)
+        return href
+
+    def __len__(self):
+        return len(self._hrefs) if self._hrefs else 0
+
+
+def helper_cache(element_cls):
+    """
+    Return the session cache for the element type.
+
+    :param Element element_cls: Zone, Location or LogicalInterface
+    :rtype: HelperCache
+    """
+    caches = smc.session.helper_cache
+    cache = caches.get(element_cls.typeof)
+    if cache is None:
+        cache = caches.setdefault(
+            element_cls.typeof, HelperCache(element_cls))
+    return cache
+
+
+def warm_helper_cache():
+    """
+    Pre-load the zone, location and logical interface caches, each with
+    a single listing.
+
+    :return: None
+    """
+    for element_cls in (Zone, Location, LogicalInterface):
+        helper_cache(element_cls).warm()
+
+
+def clear_helper_cache():
+    """
+    Clear the zone, location and logical interface caches for the current
+    session domain.
+
+    :return: None
+    """
+    smc.session.helper_cache.clear()
+
+
 def location_helper(name):
     """
     Location finder by name. If location doesn't exist, create it
@@ -27,15 +136,14 @@ def location_helper(name):
     except ElementNotFound:
         return Location.get_or_create(name=name.name).href
         
-    # Get all locations; tmp to support earlier 6.x versions
+    # Listing locations supports earlier 6.x versions
     if name is not None:
-        locations = [location 
-                     for location in Location.objects.all()
-                     if location.name == name]
-        if not locations:
-            return Location.create(name=name).href
-
-        return locations[0].href
+        cache = helper_cache(Location)
+        href = cache.get(name)
+        if href is None:
+            href = Location.create(name=name).href
+            cache.add(name, href)
+        return href
 
 def zone_helper(zone):
     """
@@ -51,7 +159,7 @@ def zone_helper(zone):
         return zone.href
     elif zone.startswith('http'):
         return zone
-    return Zone.get_or_create(name=zone).href
+    return helper_cache(Zone).get_or_create(zone)
     
 
 def logical_intf_helper(interface):
@@ -64,12 +172,12 @@ def logical_intf_helper(interface):
     :return str href: href of logical interface
     """
     if interface is None:
-        return LogicalInterface.get_or_create(name='default_eth').href
+        return helper_cache(LogicalInterface).get_or_create('default_eth')
     elif isinstance(interface, LogicalInterface):
         return interface.href
     elif interface.startswith('http'):
         return interface
-    return LogicalInterface.get_or_create(name=interface).href
+    return helper_cache(LogicalInterface).get_or_create(interface)
 
 
 def domain_helper(name):
@@ -0,0 +1,377 @@
+"""
+Local detection of duplicate, overlapping and unused elements. The
+server side searches :meth:`~smc.base.collection.Search.duplicates` and
+:meth:`~smc.base.collection.Search.unused` only return meta data and can
+time out on large installations. The inventory instead lists the
+selected element types and loads their data concurrently, then analyzes
+the elements locally without further requests::
+
+    >>> inventory = ElementInventory(types=('host', 'network', 'address_range'))
+    >>> inventory
+    ElementInventory(elements=15250, errors=0)
+    >>> for elements in inventory.duplicates():
+    ...     print([element.name for element in elements])
+    ['web-1', 'host-10.0.0.5', 'net-10.0.0.5-32']
+
+Element values are normalized before they are compared. Networks are
+compared by their canonical cidr, so 10.0.0.5/24 and 10.0.0.0/24 are
+equal, and hosts, networks and address ranges are compared by the
+addresses they cover, so a /32 network is a duplicate of a host with the
+same address. Services are compared by protocol and port range and groups
+by their sorted members.
+
+Address elements and TCP and UDP services are also indexed as integer
+ranges, which finds elements contained in another element and elements
+that partially overlap::
+
+    >>> for outer, inner in inventory.contained():
+    ...     print('%s is within %s' % (inner.name, outer.name))
+    >>> inventory.overlapping()
+    [Overlap(element=AddressRange(name=dhcp-pool), other=Network(name=servers))]
+
+Unused elements are elements not referenced by any loaded element or by
+the rules of the given policies::
+
+    >>> inventory.unused(policies=[FirewallPolicy('Standard Policy')])
+
+Elements can also be referenced by configuration that is not loaded, such
+as engines, VPNs or other element types, so verify candidates with
+:class:`~smc.elements.references.ReferenceGraph` before deleting them.
+"""
+import collections
+from smc.base.collection import Search
+from smc.base.util import parallel_map
+from smc.elements.resolver import ElementResolver, GROUP_TYPES
+from smc.policy.diff import referenced_hrefs
+from smc.policy.nat_simulator import IPRanges, PROTOCOLS, ip_range
+from smc.policy.rule import policy_rules
+
+
+#: Element types loaded by default
+DEFAULT_TYPES = ('host', 'network', 'address_range', 'tcp_service',
+                 'udp_service', 'ip_service', 'icmp_service',
+                 'icmp_ipv6_service', 'group', 'service_group',
+                 'tcp_service_group', 'udp_service_group',
+                 'ip_service_group', 'icmp_service_group')
+
+#: Element types compared by the addresses they cover
+ADDRESS_TYPES = ('host', 'network', 'address_range')
+
+_PORT_SERVICES = {'tcp_service': PROTOCOLS['tcp'],
+                  'udp_service': PROTOCOLS['udp']}
+
+
+#: Element contained in another element. For addresses, all addresses of
+#: the inner element are within the outer element and for services, the
+#: port range of the inner service is within the outer service.
+Containment = collections.namedtuple('Containment', 'outer inner')
+
+#: Elements that share part of their addresses or ports, where neither
+#: contains the other
+Overlap = collections.namedtuple('Overlap', 'element other')
+
+
+def _int(value):
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+def address_ranges(typeof, data):
+    """
+    Addresses covered by a host, network or address range as sorted and
+    merged integer ranges. See :func:`~smc.policy.nat_simulator.ip_range`.
+
+    :param str typeof: element type
+    :param dict data: element json
+    :return: tuple of (start, end), or None for other types
+    :rtype: tuple
+    """
+    if typeof == 'host':
+        values = [data.get('address'), data.get('ipv6_address')] + \
+            list(data.get('secondary') or [])
+    elif typeof == 'network':
+        values = [data.get('ipv4_network'), data.get('ipv6_network')]
+    elif typeof == 'address_range':
+        values = [data.get('ip_range')]
+    else:
+        return None
+    ranges = IPRanges([ip_range(value) for value in values if value])
+    return tuple(zip(ranges.starts, ranges.ends))
+
+
+def port_range(typeof, data):
+    """
+    Protocol number and destination port range of a TCP or UDP service.
+    Services without a max port match a single port.
+
+    :param str typeof: element type
+    :param dict data: element json
+    :return: (protocol, min port, max port), or None for other types
+    :rtype: tuple
+    """
+    if typeof not in _PORT_SERVICES:
+        return None
+    min_port = _int(data.get('min_dst_port'))
+    max_port = _int(data.get('max_dst_port'))
+    if min_port is None:
+        min_port, max_port = 0, 65535
+    elif max_port is None:
+        max_port = min_port
+    return _PORT_SERVICES[typeof], min_port, max_port
+
+
+def normalize(typeof, data, members=None):
+    """
+    Normalized value of an element. Elements with the same value are
+    duplicates.
+
+    :param str typeof: element type
+    :param dict data: element json
+    :param list members: group members to use instead of the members in
+        the element json, for example expanded nested groups
+    :return: hashable value, or None if the type is not supported
+    :rtype: tuple
+    """
+    if typeof in ADDRESS_TYPES:
+        return ('address',) + address_ranges(typeof, data)
+    if typeof in _PORT_SERVICES:
+        return (typeof,) + port_range(typeof, data) + \
+            (data.get('protocol_agent_ref'),)
+    if typeof == 'ip_service':
+        return (typeof, _int(data.get('protocol_number')),
+                data.get('protocol_agent_ref'))
+    if typeof in ('icmp_service', 'icmp_ipv6_service'):
+        return (typeof, _int(data.get('icmp_type')),
+                _int(data.get('icmp_code')))
+    if typeof in GROUP_TYPES:
+        if members is None:
+            members = data.get('element', [])
+        return (typeof,) + tuple(sorted(set(members)))
+    return None
+
+
+def _intervals(typeof, data):
+    """
+    Integer ranges of an element in the index shared by elements that
+    can contain each other. Ports are offset by the protocol so TCP and
+    UDP services do not overlap.
+    """
+    if typeof in ADDRESS_TYPES:
+        return 'address', address_ranges(typeof, data)
+    if typeof in _PORT_SERVICES:
+        protocol, min_port, max_port = port_range(typeof, data)
+        return 'service', ((protocol << 16 | min_port,
+                            protocol << 16 | max_port),)
+    return None, ()
+
+
+def _sweep(by_interval):
+    """
+    Find the intervals containing each interval and the intervals that
+    partially overlap. Intervals are visited by start, with the longest
+    first for the same start, keeping the intervals that have not ended
+    as active. Each active interval overlaps the current interval and
+    contains it if it ends at or after the current interval.
+    """
+    containers = collections.defaultdict(list)
+    overlaps = []
+    active = []
+    for interval in sorted(by_interval, key=lambda item: (item[0], -item[1])):
+        start, end = interval
+        active = [other for other in active if other[1] >= start]
+        for other in active:
+            if other[1] >= end:
+                containers[interval].append(other)
+            else:
+                overlaps.append((other, interval))
+        active.append(interval)
+    return containers, overlaps
+
+
+class ElementInventory(object):
+    """
+    Elements of the selected types with their data loaded, for local
+    detection of duplicate, overlapping and unused elements.
+
+    :param list types: element types to load. Types other than address,
+        service and group types are only checked for being unused.
+    :param bool expand_groups: compare groups by their members after
+        expanding nested groups. Nested groups must be of a loaded type.
+    :param int max_workers: max number of concurrent requests
+    :ivar ElementResolver resolver: loaded elements by href
+    :ivar dict errors: href or type to exception for elements or element
+        types that could not be loaded
+    """
+    def __init__(self, types=DEFAULT_TYPES, expand_groups=False,
+                 max_workers=10):
+        self.types = tuple(types)
+        self.expand_groups = expand_groups
+        self.max_workers = max_workers
+        self.load()
+
+    def load(self):
+        """
+        List and load the elements of all types, replacing previously
+        loaded elements.
+
+        :return: None
+        """
+        self.resolver = ElementResolver(self.max_workers)
+        self.errors = {}
+
+        def list_elements(typeof):
+            return [element.href for element in
+                    Search.objects.entry_point(typeof)]
+
+        hrefs = []
+        for typeof, result, error in parallel_map(
+                list_elements, self.types, self.max_workers):
+            if error is not None:
+                self.errors[typeof] = error
+                continue
+            hrefs.extend(result)
+
+        self.resolver.load(hrefs, members=False)
+        self.errors.update(self.resolver.errors)
+        self.elements = [self.resolver[href] for href in
+                         collections.OrderedDict.fromkeys(hrefs)
+                         if href in self.resolver]
+        self._keys = {}
+        for element in self.elements:
+            members = None
+            if self.expand_groups and element.typeof in GROUP_TYPES:
+                members = self.resolver.expand(
+                    element.data.get('element', []))
+            self._keys[element.href] = normalize(
+                element.typeof, element.data.data, members)
+
+    def key(self, element):
+        """
+        Normalized value of a loaded element, see :func:`normalize`.
+
+        :param element: element or href
+        :raises KeyError: element is not loaded
+        :rtype: tuple
+        """
+        return self._keys[getattr(element, 'href', element)]
+
+    def duplicates(self):
+        """
+        Groups of elements with the same normalized value, in load order.
+
+        :rtype: list(list(Element))
+        """
+        by_key = collections.OrderedDict()
+        for element in self.elements:
+            key = self._keys[element.href]
+            if key is not None:
+                by_key.setdefault(key, []).append(element)
+        return [elements for elements in by_key.values() if len(elements) > 1]
+
+    def _index(self):
+        """
+        Compare the intervals of all elements. Returns the containment
+        pairs and the overlapping pairs as tuples of hrefs.
+        """
+        families = collections.defaultdict(dict)
+        for element in self.elements:
+            family, intervals = _intervals(
+                element.typeof, element.data.data)
+            if family is not None and intervals:
+                families[family][element.href] = intervals
+
+        contained, touching = [], set()
+        for ranges in families.values():
+            by_interval = collections.defaultdict(list)
+            for href, intervals in ranges.items():
+                for interval in intervals:
+                    by_interval[interval].append(href)
+            containers, overlaps = _sweep(by_interval)
+
+            def covering(interval):
+                hrefs = set(by_interval[interval])
+                for other in containers.get(interval, ()):
+                    hrefs.update(by_interval[other])
+                return hrefs
+
+            for href, intervals in ranges.items():
+                outer = set.intersection(*[covering(interval)
+                                           for interval in intervals])
+                key = self._keys[href]
+                contained.extend((other, href) for other in outer
+                                 if self._keys[other] != key)
+
+            for hrefs in by_interval.values():
+                touching.update((first, second) for first in hrefs
+                                for second in hrefs if first < second)
+            pairs = list(overlaps) + [
+                (other, interval) for interval, others in containers.items()
+                for other in others]
+            for first, second in pairs:
+                for href in by_interval[first]:
+                    touching.update(tuple(sorted((href, other)))
+                                    for other in by_interval[second]
+                                    if other != href)
+
+        order = {element.href: index for index, element in
+                 enumerate(self.elements)}
+        contained.sort(key=lambda pair: (order[pair[0]], order[pair[1]]))
+        excluded = set(tuple(sorted(pair)) for pair in contained)
+        overlapping = sorted(
+            (tuple(sorted(pair, key=order.get)) for pair in touching
+             if pair not in excluded and
+             self._keys[pair[0]] != self._keys[pair[1]]),
+            key=lambda pair: (order[pair[0]], order[pair[1]]))
+        return contained, overlapping
+
+    def contained(self):
+        """
+        Address elements within another address element and TCP or UDP
+        services within the port range of another service of the same
+        protocol. Duplicates are not included.
+
+        :rtype: list(Containment)
+        """
+        contained, _overlapping = self._index()
+        return [Containment(self.resolver[outer], self.resolver[inner])
+                for outer, inner in contained]
+
+    def overlapping(self):
+        """
+        Address elements and TCP or UDP services that share addresses or
+        ports, where neither contains the other.
+
+        :rtype: list(Overlap)
+        """
+        _contained, overlapping = self._index()
+        return [Overlap(self.resolver[first], self.resolver[second])
+                for first, second in overlapping]
+
+    def unused(self, policies=(), include_template=True):
+        """
+        Elements of the inventory that are not referenced by any loaded
+        element, such as a group, or by a rule of the policies. Elements
+        can be referenced by configuration that is not loaded, so these
+        are candidates to verify before deleting.
+
+        :param list policies: policies whose rules are checked for
+            references
+        :param bool include_template: also check the rules of the policy
+            templates
+        :raises FetchElementFailed: failed to load the rules
+        :rtype: list(Element)
+        """
+        referenced = set()
+        for element in self.resolver.elements.values():
+            referenced.update(href for href in referenced_hrefs(
+                element.data.data) if href != element.href)
+        for rule in policy_rules(policies, include_template,
+                                 self.max_workers):
+            referenced.update(referenced_hrefs(rule.data.data))
+        return [element for element in self.elements
+                if element.href not in referenced]
+
+    def __repr__(self):
+        return '%s(elements=%s, errors=%s)' % (
+            self.__class__.__name__, len(self.elements), len(self.errors))
@@ -615,19 +615,24 @@ class Alias(Element):
         """
         Return an alias for the engine. The data is dict provided
         when calling engine.alias_resolving(). The alias list is
-        the list of aliases pre-fetched from Alias.objects.all().
-        This will return an Alias element by taking the alias_ref
-        and finding the name in the alias list.
+        the list of aliases pre-fetched from Alias.objects.all(), or
+        a dict of alias href to alias which avoids scanning the list
+        when resolving many aliases. This will return an Alias element
+        by taking the alias_ref and finding the name in the alias list.
         
         :rtype: Alias
         """
-        for alias in alias_list:
-            href = data.get('alias_ref')
-            if alias.href == href:
-                _alias = Alias(alias.name, href=href)
-                _alias.resolved_value = data.get('resolved_value')
-                _alias.typeof = alias._meta.type
-                return _alias
+        href = data.get('alias_ref')
+        if isinstance(alias_list, dict):
+            alias = alias_list.get(href)
+        else:
+            alias = next((alias for alias in alias_list
+                          if alias.href == href), None)
+        if alias is not None:
+            _alias = Alias(alias.name, href=href)
+            _alias.resolved_value = data.get('resolved_value')
+            _alias.typeof = alias._meta.type
+            return _alias
 
     def resolve(self, engine):
         """
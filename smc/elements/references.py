@@ -0,0 +1,348 @@
+"""
+Reference graph of elements, used for impact analysis and deleting many
+elements safely. References of many elements are retrieved concurrently
+and stored as an index of the elements referencing each element::
+
+    >>> graph = ReferenceGraph(max_workers=20)
+    >>> graph.load(Host.objects.all())
+    >>> graph.unreferenced(Host.objects.all())
+    [Host(name=old-server), ...]
+
+Find everything that is affected by deleting an element, following
+references transitively. References of referencing elements are loaded
+as needed::
+
+    >>> graph.dependents(Host('webserver'))
+    [Group(name=web-servers), IPv4Rule(name=Rule @2097166.0), ...]
+
+Delete elements in dependency order. Elements referencing other elements
+in the set are deleted first, so a group and its members can be deleted
+together. Elements still referenced by elements outside of the set are
+not deleted::
+
+    >>> for result in graph.bulk_delete(candidates):
+    ...     print(result.element, result.deleted, result.reason)
+
+The index can be saved to a file and reused in a later run. Elements are
+only looked up again if not in the index or after calling
+:meth:`ReferenceGraph.invalidate`::
+
+    >>> graph.save('references.json')
+    >>> graph = ReferenceGraph.from_file('references.json')
+"""
+import json
+import collections
+from smc.base.model import Element
+from smc.base.util import parallel_map
+from smc.api.common import SMCRequest, fetch_entry_point
+from smc.api.exceptions import ActionCommandFailed, ElementNotFound
+
+
+#: Result of deleting an element. Reason is the exception if the delete
+#: failed, or the reason the element was not deleted.
+DeleteResult = collections.namedtuple(
+    'DeleteResult', 'element deleted reason')
+
+
+def _meta(element):
+    if isinstance(element, dict):
+        return element
+    if isinstance(element, Element):
+        return {'href': element.href, 'name': element.name,
+                'type': element.typeof}
+    return {'href': element}
+
+
+class ReferenceGraph(object):
+    """
+    Index of the elements referencing each element.
+
+    :param int max_workers: max number of concurrent requests
+    :ivar dict nodes: meta data (href, name and type) of known elements
+        by href
+    :ivar dict references: href to list of hrefs of the elements
+        referencing it, for elements where references are loaded
+    :ivar dict errors: href to exception for elements where references
+        could not be retrieved
+    """
+    def __init__(self, max_workers=10):
+        self.max_workers = max_workers
+        self.nodes = {}
+        self.references = {}
+        self.errors = {}
+        # href to set of hrefs of the elements it references, the reverse
+        # of references, so removing an element only updates its neighbours
+        self._forward = collections.defaultdict(set)
+
+    def _set_references(self, href, refs):
+        self._unset_references(href)
+        self.references[href] = refs
+        for ref in refs:
+            self._forward[ref].add(href)
+
+    def _unset_references(self, href):
+        for ref in self.references.pop(href, ()):
+            targets = self._forward.get(ref)
+            if targets is not None:
+                targets.discard(href)
+                if not targets:
+                    del self._forward[ref]
+
+    def _fetch(self, href):
+        request = SMCRequest(
+            href=fetch_entry_point('references_by_element'),
+            json={'value': href})
+        request.exception = ActionCommandFailed
+        return request.create().json
+
+    def load(self, elements, transitive=False):
+        """
+        Retrieve the references of elements not already in the index.
+
+        :param elements: elements, element meta dicts or hrefs
+        :param bool transitive: also load the references of the
+            referencing elements, recursively
+        :return: None
+        """
+        pending = []
+        for element in elements:
+            meta = _meta(element)
+            self.nodes.setdefault(meta['href'], meta)
+            pending.append(meta['href'])
+
+        while pending:
+            pending = [href for href in collections.OrderedDict.fromkeys(
+                       pending) if href not in self.references]
+            found = []
+            for href, result, error in parallel_map(
+                    self._fetch, pending, self.max_workers):
+                if error is not None:
+                    self.errors[href] = error
+                    continue
+                self.errors.pop(href, None)
+                refs = []
+                for ref in result or []:
+                    self.nodes.setdefault(ref['href'], ref)
+                    refs.append(ref['href'])
+                self._set_references(href, refs)
+                found.extend(refs)
+            pending = found if transitive else []
+
+    def invalidate(self, elements=None):
+        """
+        Remove elements from the index so their references are retrieved
+        again on next load. If no elements are provided, the index is
+        cleared.
+
+        :param elements: elements or hrefs
+        :return: None
+        """
+        if elements is None:
+            self.references.clear()
+            self._forward.clear()
+            self.errors.clear()
+            return
+        for element in elements:
+            href = _meta(element)['href']
+            self._unset_references(href)
+            self.errors.pop(href, None)
+
+    def element(self, href):
+        """
+        Element for an href in the index, without fetching it.
+
+        :rtype: Element
+        """
+        meta = self.nodes.get(href, {'href': href})
+        if meta.get('type'):
+            return Element.from_meta(**meta)
+        return Element.from_href(href)
+
+    def referenced_by(self, element):
+        """
+        Elements directly referencing an element, loading the references
+        if needed.
+
+        :param element: element or href
+        :rtype: list(Element)
+        """
+        href = _meta(element)['href']
+        self.load([element])
+        return [self.element(ref) for ref in self.references.get(href, [])]
+
+    def _dependents(self, hrefs):
+        self.load(hrefs, transitive=True)
+        seen = collections.OrderedDict()
+        stack = list(reversed(hrefs))
+        while stack:
+            for ref in self.references.get(stack.pop(), []):
+                if ref not in seen and ref not in hrefs:
+                    seen[ref] = None
+                    stack.append(ref)
+        return list(seen)
+
+    def dependents(self, element):
+        """
+        All elements affected by deleting an element: the elements
+        referencing it and, recursively, the elements referencing those.
+
+        :param element: element or href
+        :rtype: list(Element)
+        """
+        meta = _meta(element)
+        self.nodes.setdefault(meta['href'], meta)
+        return [self.element(href) for href in self._dependents([meta['href']])]
+
+    def unreferenced(self, elements):
+        """
+        Elements that are not referenced by any other element.
+
+        :param elements: elements or hrefs
+        :rtype: list(Element)
+        """
+        metas = [_meta(element) for element in elements]
+        self.load(metas)
+        return [self.element(meta['href']) for meta in metas
+                if meta['href'] in self.references and
+                not self.references[meta['href']]]
+
+    def delete_order(self, elements):
+        """
+        Order elements for deletion. Each wave contains elements that can
+        be deleted concurrently once the previous waves are deleted.
+        Elements referenced by elements outside of the set, or that are
+        part of a circular reference, are returned as blocked.
+
+        :param elements: elements or hrefs
+        :return: list of waves, each a list of hrefs, and a dict of
+            blocked href to reason
+        :rtype: tuple(list, dict)
+        """
+        metas = [_meta(element) for element in elements]
+        for meta in metas:
+            self.nodes.setdefault(meta['href'], meta)
+        hrefs = list(collections.OrderedDict.fromkeys(
+            meta['href'] for meta in metas))
+        self.load(hrefs)
+
+        blocked = collections.OrderedDict()
+        for href in hrefs:
+            if href in self.errors:
+                blocked[href] = self.errors[href]
+        candidates = set(hrefs) - set(blocked)
+
+        # Remove elements referenced from outside the set until stable,
+        # an element referenced by a blocked element is also blocked
+        changed = True
+        while changed:
+            changed = False
+            for href in hrefs:
+                if href not in candidates:
+                    continue
+                outside = [ref for ref in self.references.get(href, [])
+                           if ref not in candidates]
+                if outside:
+                    names = ', '.join(
+                        self.nodes.get(ref, {}).get('name') or ref
+                        for ref in outside)
+                    blocked[href] = 'Referenced by {}'.format(names)
+                    candidates.discard(href)
+                    changed = True
+
+        waves, deleted = [], set()
+        remaining = [href for href in hrefs if href in candidates]
+        while remaining:
+            wave = [href for href in remaining
+                    if all(ref in deleted for ref in self.references[href])]
+            if not wave:
+                for href in remaining:
+                    blocked[href] = 'Circular reference'
+                break
+            waves.append(wave)
+            deleted.update(wave)
+            remaining = [href for href in remaining if href not in deleted]
+        return waves, blocked
+
+    def bulk_delete(self, elements, dry_run=False):
+        """
+        Delete elements in dependency order. Each wave of elements is
+        deleted concurrently. Elements depending on an element that failed
+        to delete are not deleted.
+
+        :param elements: elements or hrefs
+        :param bool dry_run: return the results without deleting
+        :return: result for each element
+        :rtype: list(DeleteResult)
+        """
+        waves, blocked = self.delete_order(elements)
+        results = [DeleteResult(self.element(href), False, reason)
+                   for href, reason in blocked.items()]
+        failed = set()
+
+        for wave in waves:
+            wave = [self.element(href) for href in wave]
+            if dry_run:
+                results.extend(DeleteResult(element, True, None)
+                               for element in wave)
+                continue
+            ready = []
+            for element in wave:
+                # Skip if a referencing element in the set was not deleted
+                refs = [ref for ref in self.references[element.href]
+                        if ref in failed]
+                if refs:
+                    failed.add(element.href)
+                    results.append(DeleteResult(element, False,
+                        'Referencing element was not deleted'))
+                else:
+                    ready.append(element)
+
+            for element, _result, error in parallel_map(
+                    lambda element: element.delete(), ready,
+                    self.max_workers):
+                if error is not None and not isinstance(error, ElementNotFound):
+                    failed.add(element.href)
+                    results.append(DeleteResult(element, False, error))
+                else:
+                    self._remove(element.href)
+                    results.append(DeleteResult(element, True, None))
+        return results
+
+    def _remove(self, href):
+        self._unset_references(href)
+        self.nodes.pop(href, None)
+        for target in self._forward.pop(href, ()):
+            refs = self.references.get(target)
+            if refs is not None and href in refs:
+                refs.remove(href)
+
+    def save(self, filename):
+        """
+        Save the index to a json file.
+
+        :param str filename: path to file
+        :return: None
+        """
+        with open(filename, 'w') as f:
+            json.dump({'nodes': self.nodes, 'references': self.references}, f)
+
+    @classmethod
+    def from_file(cls, filename, max_workers=10):
+        """
+        Load an index saved with :meth:`save`.
+
+        :param str filename: path to file
+        :param int max_workers: max number of concurrent requests
+        :rtype: ReferenceGraph
+        """
+        with open(filename) as f:
+            data = json.load(f)
+        graph = cls(max_workers)
+        graph.nodes = data.get('nodes', {})
+        for href, refs in data.get('references', {}).items():
+            graph._set_references(href, refs)
+        return graph
+
+    def __repr__(self):
+        return '%s(elements=%s)' % (
+            self.__class__.__name__, len(self.references))
@@ -0,0 +1,163 @@
+"""
+Bulk resolution of element references. Rules and other configuration
+reference elements by href, and resolving them one at a time results in
+a request per reference. The resolver fetches all unique references
+concurrently, then fetches the members of any groups found, one group
+depth at a time, so each element is fetched only once::
+
+    resolver = ElementResolver()
+    resolver.load(rule.sources.all_as_href() for rule in rules)
+    for href in resolver.members(group_href):
+        print(resolver[href].name, resolver.data(href))
+
+Aliases can be resolved for an engine with a single request using
+:meth:`ElementResolver.resolve_aliases`.
+"""
+import itertools
+from smc.base.model import Element
+from smc.base.util import parallel_map
+
+
+#: Element types that are groups, where members are in the 'element' key
+GROUP_TYPES = ('group', 'service_group', 'tcp_service_group',
+               'udp_service_group', 'ip_service_group', 'icmp_service_group',
+               'icmp_ipv6_service_group', 'ethernet_service_group')
+
+
+class ElementResolver(object):
+    """
+    Cache of elements fetched concurrently by href.
+
+    :param int max_workers: max number of concurrent requests
+    :ivar dict elements: loaded elements by href
+    :ivar dict errors: exceptions by href for elements that could not be
+        fetched
+    :ivar dict aliases: resolved values of aliases by alias href, set by
+        :meth:`resolve_aliases`
+    """
+    def __init__(self, max_workers=10):
+        self.max_workers = max_workers
+        self.elements = {}
+        self.errors = {}
+        self.aliases = {}
+
+    def load(self, hrefs, members=True):
+        """
+        Fetch the elements and any group members not already loaded.
+        Values that are not hrefs, such as 'any', are ignored.
+
+        :param hrefs: hrefs, or iterables of hrefs, to load
+        :param bool members: also load the members of groups
+        :return: None
+        """
+        pending = set()
+        for href in hrefs:
+            if isinstance(href, (list, tuple, set)):
+                pending.update(href)
+            elif href is not None:
+                pending.add(href)
+
+        while pending:
+            pending = [href for href in pending
+                       if href and str(href).startswith('http') and
+                       href not in self.elements and href not in self.errors]
+            group_members = set()
+            for href, element, error in parallel_map(
+                    Element.from_href, pending, self.max_workers):
+                if error is not None:
+                    self.errors[href] = error
+                    continue
+                self.elements[href] = element
+                if members and self.is_group(href):
+                    group_members.update(element.data.get('element', []))
+            pending = group_members
+
+    def __getitem__(self, href):
+        return self.elements[href]
+
+    def __contains__(self, href):
+        return href in self.elements
+
+    def get(self, href, default=None):
+        """
+        Loaded element for the href.
+
+        :rtype: Element
+        """
+        return self.elements.get(href, default)
+
+    def data(self, href):
+        """
+        Json of the loaded element, or an empty dict if it was not loaded.
+
+        :rtype: dict
+        """
+        element = self.elements.get(href)
+        return element.data.data if element is not None else {}
+
+    def typeof(self, href):
+        """
+        Type of the loaded element, or None if it was not loaded.
+
+        :rtype: str
+        """
+        element = self.elements.get(href)
+        return element.typeof if element is not None else None
+
+    def is_group(self, href):
+        """
+        Whether the element is a group type with members.
+
+        :rtype: bool
+        """
+        return self.typeof(href) in GROUP_TYPES
+
+    def members(self, href):
+        """
+        Expand groups recursively and return the hrefs of the non group
+        members. If the element is not a group, the href itself is
+        returned.
+
+        :param str href: element href
+        :rtype: list(str)
+        """
+        result, seen, stack = [], set(), [href]
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            if self.is_group(current):
+                stack.extend(reversed(self.data(current).get('element', [])))
+            else:
+                result.append(current)
+        return result
+
+    def expand(self, hrefs):
+        """
+        Expand a list of hrefs, returning all non group members without
+        duplicates in order.
+
+        :param list hrefs: element hrefs
+        :rtype: list(str)
+        """
+        seen = set()
+        return [href for href in itertools.chain.from_iterable(
+                    self.members(href) for href in hrefs)
+                if not (href in seen or seen.add(href))]
+
+    def resolve_aliases(self, engine):
+        """
+        Resolve the values of all aliases for an engine with a single
+        request. Resolved values are set in :attr:`aliases`.
+
+        :param Engine engine: engine to resolve aliases for
+        :return: None
+        """
+        self.aliases = {
+            alias.get('alias_ref'): alias.get('resolved_value', [])
+            for alias in engine.make_request(resource='alias_resolving')}
+
+    def __repr__(self):
+        return '%s(elements=%s, errors=%s)' % (
+            self.__class__.__name__, len(self.elements), len(self.errors))
@@ -0,0 +1,51 @@
+"""
+Measure the time to register element classes, comparing importing all
+element modules (previous behavior at login) with lazily importing only
+the modules for the types used.
+
+Each measurement runs in a fresh interpreter so module caching does not
+affect the results. No SMC connection is required.
+
+To run::
+
+    python smc/examples/startup_benchmark.py
+
+"""
+import sys
+import timeit
+import subprocess
+
+
+EAGER = '''
+from smc.api.session import import_submodules
+for pkg in ('smc.policy', 'smc.elements', 'smc.routing',
+            'smc.vpn', 'smc.administration', 'smc.core'):
+    import_submodules(pkg, recursive=False)
+'''
+
+LAZY = '''
+from smc.base.model import lookup_class
+for typeof in ('host', 'network', 'single_fw', 'fw_policy'):
+    lookup_class(typeof)
+'''
+
+BASELINE = 'import smc'
+
+
+def run(statement, repeat=5):
+    """
+    Return the best wall time of running the statement in a new
+    interpreter.
+    """
+    command = [sys.executable, '-c', statement]
+    return min(timeit.repeat(
+        lambda: subprocess.check_call(command), number=1, repeat=repeat))
+
+
+if __name__ == '__main__':
+    baseline = run(BASELINE)
+    for name, statement in (('import all modules', EAGER),
+                            ('lazy lookup of 4 types', LAZY)):
+        elapsed = run(statement)
+        print('{:<24} {:8.1f} ms  ({:+.1f} ms over import smc)'.format(
+            name, elapsed * 1000, (elapsed - baseline) * 1000))
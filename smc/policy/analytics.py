@@ -0,0 +1,207 @@
+"""
+Rule hit analytics across many engines sharing a policy. Rule counters
+are retrieved from all engines concurrently and the hits are accumulated
+per rule in arrays indexed by the position of the rule in the rule base.
+The rule base of the policy and its template is listed and loaded once
+and joined to the counters by rule href, instead of fetching the rule of
+each counter for each engine::
+
+    >>> analytics = RuleHitAnalytics(
+    ...     FirewallPolicy('Standard Policy'), Engine.objects.all(),
+    ...     duration_type='six_months')
+    >>> analytics
+    RuleHitAnalytics(policy=Standard Policy, engines=200, rules=1250)
+    >>> for hits in analytics.never_hit():
+    ...     print(hits.rule.name, hits.rule.tag)
+    >>> for hits in analytics.low_hit(threshold=10):
+    ...     print(hits.rule.name, hits.hits, hits.engines)
+
+Rules in the rule base that have no counter on an engine are counted as
+zero hits on that engine. Engines that fail to return counters are listed
+in ``failures`` and excluded from the totals. Rules referenced by counters
+that cannot be fetched, for example rules deleted since the counters were
+collected, are listed in ``errors`` and their hits are kept.
+
+Analytics can also be obtained from a fleet using
+:meth:`smc.core.fleet.Fleet.rule_hits`.
+"""
+import array
+import logging
+import collections
+from smc.base.model import Element
+from smc.base.util import parallel_map
+from smc.policy.rule import policy_rules, is_rule_section
+from smc.api.exceptions import ElementNotFound
+
+
+logger = logging.getLogger(__name__)
+
+
+#: Hits for a single rule. Hits is the total across all engines, engines
+#: the number of engines with at least one hit and engine_hits a dict of
+#: engine name to hits.
+RuleHits = collections.namedtuple('RuleHits', 'rule hits engines engine_hits')
+
+
+class RuleHitAnalytics(object):
+    """
+    Rule counters of a policy aggregated across engines.
+
+    :param Policy policy: policy installed on the engines
+    :param list engines: engines to retrieve rule counters from
+    :param str duration_type: duration for the rule counters, see
+        :meth:`smc.policy.policy.Policy.rule_counters`
+    :param bool include_template: include rules of the policy template
+    :param int max_workers: max number of concurrent requests
+    :ivar list rules: rules of the rule base in order, followed by rules
+        referenced by counters that are not part of the rule base
+    :ivar dict failures: engine name to exception for engines that failed
+        to return rule counters
+    :ivar dict errors: rule href to exception for rules referenced by
+        counters that could not be fetched, such as deleted rules. The
+        hits are kept and these rules are listed in ``rules`` as elements
+        named by their href, without data
+    """
+    def __init__(self, policy, engines, duration_type='one_week',
+                 include_template=True, max_workers=10):
+        self.policy = policy
+        self.engines = list(engines)
+        self.duration_type = duration_type
+        self.include_template = include_template
+        self.max_workers = max_workers
+        self.load()
+
+    def load(self):
+        """
+        Retrieve the rule counters from all engines and the rule base,
+        replacing previously loaded results.
+
+        :raises FetchElementFailed: failed to load the rule base
+        :return: None
+        """
+        self.rules = [rule for rule in policy_rules(
+            [self.policy], self.include_template, self.max_workers)
+            if not is_rule_section(rule)]
+        self._index = {rule.href: index for index, rule in
+                       enumerate(self.rules)}
+        self.failures = {}
+        self.errors = {}
+
+        def counters(engine):
+            return self.policy.rule_counters(
+                engine, duration_type=self.duration_type)
+
+        # Hits per rule for each engine, in the order of self.rules
+        self._hits = collections.OrderedDict()
+        unknown = []
+        for engine, result, error in parallel_map(
+                counters, self.engines, self.max_workers):
+            if error is not None:
+                logger.error('Failed to get rule counters for engine %s: %s',
+                             engine.name, error)
+                self.failures[engine.name] = error
+                continue
+            hits = self._hits[engine.name] = array.array(
+                'd', [0]) * len(self.rules)
+            for counter in result:
+                index = self._index.get(counter.rule_ref)
+                if index is None:
+                    index = self._index[counter.rule_ref] = \
+                        len(self.rules) + len(unknown)
+                    unknown.append(counter.rule_ref)
+                if index >= len(hits):
+                    hits.extend([0] * (index + 1 - len(hits)))
+                hits[index] += counter.hits or 0
+
+        if unknown:
+            for href, rule, error in parallel_map(
+                    Element.from_href, unknown, self.max_workers):
+                if error is None and rule is None:
+                    error = ElementNotFound('Rule {} not found'.format(href))
+                if error is not None:
+                    # Keep the hits of rules that were deleted or cannot
+                    # be fetched under a placeholder rule
+                    logger.error('Failed to get rule %s: %s', href, error)
+                    self.errors[href] = error
+                    typeof = href.rstrip('/').split('/')[-2]
+                    rule = Element.from_meta(
+                        name=href, href=href, type=typeof)
+                self.rules.append(rule)
+
+        size = len(self.rules)
+        self._total = array.array('d', [0]) * size
+        self._engines = array.array('l', [0]) * size
+        for hits in self._hits.values():
+            if len(hits) < size:
+                hits.extend([0] * (size - len(hits)))
+            for index, value in enumerate(hits):
+                if value:
+                    self._total[index] += value
+                    self._engines[index] += 1
+
+    def _result(self, index):
+        return RuleHits(
+            self.rules[index], int(self._total[index]),
+            self._engines[index],
+            {name: int(hits[index]) for name, hits in self._hits.items()})
+
+    def hits(self, rule):
+        """
+        Hits for a rule.
+
+        :param rule: rule or rule href
+        :raises KeyError: rule is not part of the policy or counters
+        :rtype: RuleHits
+        """
+        return self._result(self._index[getattr(rule, 'href', rule)])
+
+    def all(self):
+        """
+        Hits for all rules, in rule base order.
+
+        :rtype: list(RuleHits)
+        """
+        return [self._result(index) for index in range(len(self.rules))]
+
+    def never_hit(self, include_disabled=False):
+        """
+        Rules without hits on any engine.
+
+        :param bool include_disabled: include disabled rules
+        :rtype: list(RuleHits)
+        """
+        return self.low_hit(1, include_disabled)
+
+    def low_hit(self, threshold, include_disabled=False):
+        """
+        Rules with fewer total hits than the threshold across all engines.
+
+        :param int threshold: hit threshold
+        :param bool include_disabled: include disabled rules
+        :rtype: list(RuleHits)
+        """
+        return [self._result(index) for index, total in enumerate(self._total)
+                if total < threshold and (include_disabled or
+                    not self._is_disabled(index))]
+
+    def _is_disabled(self, index):
+        rule = self.rules[index]
+        return rule.href not in self.errors and \
+            bool(rule.data.get('is_disabled'))
+
+    def unused_on(self, engine):
+        """
+        Rules without hits on a specific engine.
+
+        :param engine: engine or engine name
+        :raises KeyError: engine did not return rule counters
+        :rtype: list(Rule)
+        """
+        hits = self._hits[getattr(engine, 'name', engine)]
+        return [self.rules[index] for index, value in enumerate(hits)
+                if not value]
+
+    def __repr__(self):
+        return '%s(policy=%s, engines=%s, rules=%s)' % (
+            self.__class__.__name__, self.policy.name, len(self._hits),
+            len(self.rules))
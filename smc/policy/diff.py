@@ -0,0 +1,308 @@
+"""
+Structural diff of policy rule bases. Rules of both policies are fetched
+concurrently and each rule is reduced to a canonical form where element
+references are replaced by the element type and name. The canonical form
+is hashed into a fingerprint and the rule order is compared using the
+longest matching sequence of fingerprints, so comparing large rule bases
+only requires a single pass over the rules::
+
+    >>> changes = diff_policies(FirewallPolicy('old'), FirewallPolicy('new'))
+    >>> changes
+    PolicyDiff(added=2, removed=1, moved=1, modified=3)
+    >>> for change in changes:
+    ...     print(change.relation, change.change, change.name, change.fields)
+    fw_ipv4_access_rules modified Rule @2097166.0 ['sources', 'action']
+    ...
+
+Rules that were changed are identified by rule name. Rules created by
+the SMC are named by the rule tag, so a rule keeps its name when modified
+but rules copied to another policy are reported as added and removed.
+
+To compare a policy across time, save a snapshot of the policy. A snapshot
+is json serializable and can be compared with a policy or another
+snapshot::
+
+    >>> import json
+    >>> with open('policy.json', 'w') as f:
+    ...     json.dump(snapshot(FirewallPolicy('mypolicy')), f)
+    ...
+    >>> with open('policy.json') as f:
+    ...     changes = diff_policies(json.load(f), FirewallPolicy('mypolicy'))
+"""
+import json
+import hashlib
+import difflib
+import collections
+from smc.policy.rule import load_rules, RULE_COLLECTIONS
+from smc.elements.resolver import ElementResolver
+from smc.api.exceptions import ResourceNotFound
+
+
+#: Rule attributes that do not affect the rule and are not compared
+IGNORED_FIELDS = ('link', 'key', 'name', 'tag', 'rank', 'parent_policy',
+                  'read_only', 'system')
+
+
+#: A change between two rule bases. Change is 'added', 'removed', 'moved'
+#: or 'modified'. Old and new are the rule entries from :func:`rule_entries`,
+#: None for added or removed rules. Fields are the changed rule attributes
+#: for modified rules.
+RuleChange = collections.namedtuple(
+    'RuleChange', 'relation change name old new fields')
+
+
+def _is_href(value):
+    return hasattr(value, 'startswith') and value.startswith('http')
+
+
+def referenced_hrefs(value):
+    """
+    Generator of all hrefs referenced in rule or element json, excluding
+    links.
+
+    :param value: json of a rule or element
+    :return: generator of str
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key not in ('link', 'parent_policy'):
+                for href in referenced_hrefs(item):
+                    yield href
+    elif isinstance(value, list):
+        for item in value:
+            for href in referenced_hrefs(item):
+                yield href
+    elif _is_href(value):
+        yield value
+
+
+def canonical_rule(rule, resolver):
+    """
+    Canonical form of a rule. Element references are replaced with
+    'type:name' and lists of references are sorted so that the order of
+    elements in a rule cell does not matter.
+
+    :param Rule rule: rule with data loaded
+    :param ElementResolver resolver: resolver with referenced elements
+        loaded
+    :rtype: dict
+    """
+    def canonical(value):
+        if isinstance(value, dict):
+            return {key: canonical(item) for key, item in value.items()}
+        if isinstance(value, list):
+            items = [canonical(item) for item in value]
+            if all(_is_href(item) for item in value):
+                items.sort()
+            return items
+        if _is_href(value):
+            element = resolver.get(value)
+            if element is not None:
+                return '{}:{}'.format(element.typeof, element.name)
+        return value
+
+    return {key: canonical(value) for key, value in rule.data.items()
+            if key not in IGNORED_FIELDS}
+
+
+def fingerprint(canonical):
+    """
+    Stable hash of a canonical rule.
+
+    :param dict canonical: rule from :func:`canonical_rule`
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps(
+        canonical, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def rule_entries(rules, resolver=None, max_workers=10):
+    """
+    Load rules concurrently and return the canonical entry for each rule
+    in order. An entry is a dict with the rule `name`, `tag`, `position`,
+    canonical `rule` and `fingerprint`.
+
+    :param rules: rule collection or list of rules
+    :param ElementResolver resolver: resolver to use, elements referenced
+        by the rules are loaded into the resolver
+    :param int max_workers: max number of concurrent requests
+    :rtype: list(dict)
+    """
+    rules = load_rules(rules, max_workers)
+    resolver = resolver or ElementResolver(max_workers)
+    resolver.load((href for rule in rules
+                   for href in referenced_hrefs(rule.data.data)),
+                  members=False)
+    entries = []
+    for position, rule in enumerate(rules, 1):
+        canonical = canonical_rule(rule, resolver)
+        entries.append({'name': rule.name, 'tag': rule.data.get('tag'),
+                        'position': position, 'rule': canonical,
+                        'fingerprint': fingerprint(canonical)})
+    return entries
+
+
+def snapshot(policy, max_workers=10, resolver=None):
+    """
+    Canonical entries for all rule collections of a policy, by
+    collection name. The snapshot is json serializable and can be saved
+    and compared later using :func:`diff_policies`.
+
+    :param Policy policy: policy to snapshot
+    :param int max_workers: max number of concurrent requests
+    :param ElementResolver resolver: optional resolver to reuse
+    :rtype: dict
+    """
+    resolver = resolver or ElementResolver(max_workers)
+    result = collections.OrderedDict()
+    for name in RULE_COLLECTIONS:
+        try:
+            rules = getattr(policy, name)
+        except (AttributeError, ResourceNotFound):
+            continue
+        result[name] = rule_entries(rules, resolver, max_workers)
+    return result
+
+
+def diff_rules(old, new, relation=None):
+    """
+    Compare two lists of rule entries.
+
+    Rules with the same fingerprint in the longest matching sequence are
+    unchanged. Of the remaining rules, rules with the same fingerprint are
+    moved, rules with the same name are modified and other rules are
+    added or removed.
+
+    :param list old: entries from :func:`rule_entries`
+    :param list new: entries from :func:`rule_entries`
+    :param str relation: rule collection name set on the changes
+    :rtype: list(RuleChange)
+    """
+    matcher = difflib.SequenceMatcher(
+        None, [entry['fingerprint'] for entry in old],
+        [entry['fingerprint'] for entry in new], autojunk=False)
+    removed, added = [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            removed.extend(old[i1:i2])
+            added.extend(new[j1:j2])
+
+    changes = []
+    by_fingerprint = collections.defaultdict(collections.deque)
+    for entry in added:
+        by_fingerprint[entry['fingerprint']].append(entry)
+    remaining = []
+    moved = set()
+    for entry in removed:
+        candidates = by_fingerprint.get(entry['fingerprint'])
+        if candidates:
+            target = candidates.popleft()
+            moved.add(id(target))
+            changes.append(RuleChange(
+                relation, 'moved', target['name'], entry, target, []))
+        else:
+            remaining.append(entry)
+    added = [entry for entry in added if id(entry) not in moved]
+
+    by_name = collections.defaultdict(collections.deque)
+    for entry in added:
+        by_name[entry['name']].append(entry)
+    modified = set()
+    for entry in remaining:
+        candidates = by_name.get(entry['name'])
+        if candidates:
+            target = candidates.popleft()
+            modified.add(id(target))
+            fields = sorted(
+                key for key in set(entry['rule']) | set(target['rule'])
+                if entry['rule'].get(key) != target['rule'].get(key))
+            changes.append(RuleChange(
+                relation, 'modified', target['name'], entry, target, fields))
+        else:
+            changes.append(RuleChange(
+                relation, 'removed', entry['name'], entry, None, []))
+
+    changes.extend(RuleChange(relation, 'added', entry['name'], None, entry, [])
+                   for entry in added if id(entry) not in modified)
+    changes.sort(key=lambda change: (change.new or change.old)['position'])
+    return changes
+
+
+class PolicyDiff(object):
+    """
+    Changes between two policies. Iterate to obtain all changes as
+    :class:`RuleChange` in order of rule collection and position.
+
+    :ivar list changes: list of RuleChange
+    """
+    def __init__(self, changes):
+        self.changes = changes
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __bool__(self):
+        return bool(self.changes)
+    __nonzero__ = __bool__
+
+    def _by_change(self, change):
+        return [c for c in self.changes if c.change == change]
+
+    @property
+    def added(self):
+        """
+        :rtype: list(RuleChange)
+        """
+        return self._by_change('added')
+
+    @property
+    def removed(self):
+        """
+        :rtype: list(RuleChange)
+        """
+        return self._by_change('removed')
+
+    @property
+    def moved(self):
+        """
+        :rtype: list(RuleChange)
+        """
+        return self._by_change('moved')
+
+    @property
+    def modified(self):
+        """
+        :rtype: list(RuleChange)
+        """
+        return self._by_change('modified')
+
+    def __repr__(self):
+        return '%s(added=%s, removed=%s, moved=%s, modified=%s)' % (
+            self.__class__.__name__, len(self.added), len(self.removed),
+            len(self.moved), len(self.modified))
+
+
+def diff_policies(old, new, max_workers=10):
+    """
+    Compare the rules of two policies, or a policy with a snapshot from
+    :func:`snapshot`.
+
+    :param old: Policy or snapshot
+    :param new: Policy or snapshot
+    :param int max_workers: max number of concurrent requests
+    :rtype: PolicyDiff
+    """
+    resolver = ElementResolver(max_workers)
+    old = old if isinstance(old, dict) else \
+        snapshot(old, max_workers, resolver)
+    new = new if isinstance(new, dict) else \
+        snapshot(new, max_workers, resolver)
+    changes = []
+    for relation in RULE_COLLECTIONS:
+        if relation in old or relation in new:
+            changes.extend(diff_rules(
+                old.get(relation, []), new.get(relation, []), relation))
+    return PolicyDiff(changes)
@@ -0,0 +1,432 @@
+"""
+Simulate NAT translation locally using the NAT rules of a firewall policy.
+All NAT rules of the policy and its template are fetched concurrently,
+the elements referenced by the rules are resolved in bulk and the rules
+are compiled into ordered match tables of integer IP ranges. Flows are
+then evaluated locally without further requests, which allows validating
+large sets of flows, for example when migrating NAT configuration::
+
+    >>> simulator = NATSimulator(FirewallPolicy('mypolicy'), engine=Engine('myfw'))
+    >>> simulator.translate('10.0.0.5', '8.8.8.8', 'tcp', 443)
+    NATResult(rule=IPv4NATRule(name=outbound), src='192.0.2.10', dst='8.8.8.8', dst_port=443, src_ports=(1024, 65535))
+
+    >>> for result in simulator.translate_many(flows):
+    ...     ...
+
+As with the engine, the first matching rule is applied. A matching rule
+without NAT stops processing and the flow is not translated. Template
+rules are evaluated before the rules of the policy. Disabled rules and
+rule sections are skipped. If an engine is provided, rules with `used_on`
+set to another engine are skipped and aliases are resolved for the
+engine with a single request.
+
+Rules referencing elements that cannot be evaluated locally, such as
+domain names, expressions, zones or aliases when no engine is provided,
+are listed in :attr:`NATSimulator.unsupported`. These elements never
+match.
+"""
+import bisect
+import socket
+import struct
+import binascii
+import collections
+from smc.policy.rule import load_rules, is_rule_section
+from smc.elements.resolver import ElementResolver
+from smc.api.exceptions import ResourceNotFound
+from smc.compat import string_types
+
+
+_V6_OFFSET = 1 << 128
+
+#: Protocol numbers by name
+PROTOCOLS = {'tcp': 6, 'udp': 17, 'icmp': 1, 'icmpv6': 58}
+
+_SERVICES = {'tcp_service': 6, 'udp_service': 17,
+             'icmp_service': 1, 'icmp_ipv6_service': 58}
+
+
+def ip_to_int(ip):
+    """
+    Convert an IPv4 or IPv6 address to an integer. IPv6 addresses are
+    offset above the IPv4 range so both can be compared in one table.
+
+    :param str ip: ip address
+    :rtype: int
+    """
+    if ':' in ip:
+        return int(binascii.hexlify(
+            socket.inet_pton(socket.AF_INET6, ip)), 16) + _V6_OFFSET
+    return struct.unpack('!I', socket.inet_aton(ip))[0]
+
+
+def int_to_ip(value):
+    """
+    Convert an integer from :func:`ip_to_int` to an address string.
+
+    :param int value: address as integer
+    :rtype: str
+    """
+    if value >= _V6_OFFSET:
+        return socket.inet_ntop(socket.AF_INET6, binascii.unhexlify(
+            '%032x' % (value - _V6_OFFSET)))
+    return socket.inet_ntoa(struct.pack('!I', value))
+
+
+def ip_range(value):
+    """
+    Convert an address, network in cidr format or range separated by '-'
+    to a start and end integer.
+
+    :param str value: ip address, network or range
+    :rtype: tuple(int, int)
+    """
+    value = value.strip()
+    if '-' in value:
+        start, end = value.split('-', 1)
+        return ip_to_int(start.strip()), ip_to_int(end.strip())
+    if '/' in value:
+        address, prefix = value.split('/', 1)
+        start = ip_to_int(address)
+        offset = _V6_OFFSET if start >= _V6_OFFSET else 0
+        bits = 128 if offset else 32
+        size = 1 << (bits - int(prefix))
+        start = offset + ((start - offset) & ~(size - 1))
+        return start, start + size - 1
+    start = ip_to_int(value)
+    return start, start
+
+
+def _protocol(protocol):
+    """
+    Protocol number for a case insensitive protocol name or number.
+    """
+    if isinstance(protocol, string_types):
+        return PROTOCOLS.get(protocol.lower(), protocol)
+    return protocol
+
+
+class IPRanges(object):
+    """
+    Sorted, merged integer address ranges with fast membership tests.
+
+    :param list ranges: list of (start, end) integer tuples
+    """
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, ranges):
+        self.starts, self.ends = [], []
+        for start, end in sorted(ranges):
+            if self.ends and start <= self.ends[-1] + 1:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __contains__(self, value):
+        index = bisect.bisect_right(self.starts, value) - 1
+        return index >= 0 and value <= self.ends[index]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+#: Result of translating a flow. Rule is the matching NAT rule, or None
+#: if no rule matched. Src and dst are the translated addresses and
+#: dst_port the translated destination port. For dynamic source NAT,
+#: src_ports is the (min, max) range the source port is allocated from,
+#: otherwise None.
+NATResult = collections.namedtuple(
+    'NATResult', 'rule src dst dst_port src_ports')
+
+
+_CompiledRule = collections.namedtuple(
+    '_CompiledRule', 'rule sources destinations services nat')
+
+
+class NATSimulator(object):
+    """
+    Local NAT translation engine compiled from the NAT rules of a policy.
+
+    :param FirewallPolicy policy: policy with NAT rules
+    :param Engine engine: optional engine the policy is installed on, used
+        to filter rules by `used_on` and resolve aliases
+    :param bool include_template: include NAT rules from the policy
+        template
+    :param int max_workers: max number of concurrent requests when loading
+    :ivar list rules: compiled rules in evaluation order
+    :ivar dict unsupported: rule to list of reasons for rules referencing
+        elements that cannot be evaluated locally
+    """
+    def __init__(self, policy, engine=None, include_template=True,
+                 max_workers=10):
+        self.policy = policy
+        self.engine = engine
+        self.include_template = include_template
+        self.resolver = ElementResolver(max_workers)
+        self.unsupported = collections.OrderedDict()
+        self.rules = []
+        self._tables = {4: [], 6: []}
+        self.load()
+
+    def load(self):
+        """
+        Fetch the NAT rules and referenced elements and compile the rules.
+
+        :raises FetchElementFailed: failed to fetch a NAT rule
+        :return: None
+        """
+        policies = [self.policy]
+        if self.include_template and self.policy.data.get('template'):
+            policies.insert(0, self.policy.template)
+
+        families = []
+        for policy in policies:
+            for relation, family in (('fw_ipv4_nat_rules', 4),
+                                     ('fw_ipv6_nat_rules', 6)):
+                try:
+                    rules = list(getattr(policy, relation))
+                except (ResourceNotFound, AttributeError):
+                    continue
+                families.extend((family, rule) for rule in rules)
+
+        load_rules([rule for _family, rule in families],
+                   self.resolver.max_workers)
+
+        hrefs = []
+        for _family, rule in families:
+            hrefs.extend(self._references(rule))
+        self.resolver.load(hrefs)
+        if self.engine is not None:
+            self.resolver.resolve_aliases(self.engine)
+
+        self.rules = []
+        self._tables = {4: [], 6: []}
+        self.unsupported.clear()
+        for family, rule in families:
+            if rule.data.get('is_disabled') or is_rule_section(rule):
+                continue
+            used_on = rule.data.get('used_on')
+            if used_on and self.engine is not None and \
+                used_on != self.engine.href:
+                continue
+            compiled = self._compile(rule)
+            self.rules.append(compiled)
+            self._tables[family].append(compiled)
+
+    def _references(self, rule):
+        data = rule.data
+        for field, key in (('sources', 'src'), ('destinations', 'dst'),
+                           ('services', 'service')):
+            for href in data.get(field, {}).get(key, []):
+                yield href
+        for nat in data.get('options', {}).values():
+            if not isinstance(nat, dict):
+                continue
+            for value in [nat.get('original_value'),
+                          nat.get('translated_value')] + \
+                    nat.get('translation_values', []):
+                if isinstance(value, dict) and 'element' in value:
+                    yield value['element']
+
+    def _unsupported(self, rule, reason):
+        self.unsupported.setdefault(rule, []).append(reason)
+
+    def _address_ranges(self, rule, href):
+        if href in self.resolver.aliases:
+            values = self.resolver.aliases[href]
+        else:
+            typeof = self.resolver.typeof(href)
+            data = self.resolver.data(href)
+            if typeof in ('host', 'router'):
+                values = [data.get('address'), data.get('ipv6_address')] + \
+                    list(data.get('secondary', []))
+            elif typeof == 'network':
+                values = [data.get('ipv4_network'), data.get('ipv6_network')]
+            elif typeof == 'address_range':
+                values = [data.get('ip_range')]
+            else:
+                self._unsupported(rule, 'Unsupported element {}: {}'.format(
+                    typeof, self.resolver.get(href, href)))
+                return []
+        ranges = []
+        for value in values:
+            if value:
+                try:
+                    ranges.append(ip_range(value))
+                except (socket.error, ValueError):
+                    self._unsupported(rule, 'Invalid address: {}'.format(value))
+        return ranges
+
+    def _addresses(self, rule, field, key):
+        value = rule.data.get(field, {})
+        if 'any' in value:
+            return None
+        ranges = []
+        for href in self.resolver.expand(value.get(key, [])):
+            ranges.extend(self._address_ranges(rule, href))
+        return IPRanges(ranges)
+
+    def _services(self, rule):
+        value = rule.data.get('services', {})
+        if 'any' in value:
+            return None
+        services = []
+        for href in self.resolver.expand(value.get('service', [])):
+            typeof = self.resolver.typeof(href)
+            data = self.resolver.data(href)
+            if typeof in ('tcp_service', 'udp_service'):
+                min_port = data.get('min_dst_port')
+                max_port = data.get('max_dst_port') or min_port
+                if min_port in (None, ''):
+                    services.append((_SERVICES[typeof], None, None))
+                else:
+                    services.append(
+                        (_SERVICES[typeof], int(min_port), int(max_port)))
+            elif typeof in _SERVICES:
+                services.append((_SERVICES[typeof], None, None))
+            elif typeof == 'ip_service':
+                services.append((int(data.get('protocol_number')), None, None))
+            else:
+                self._unsupported(rule, 'Unsupported service {}: {}'.format(
+                    typeof, self.resolver.get(href, href)))
+        return services
+
+    def _value_range(self, rule, value):
+        if not value:
+            return None
+        if 'ip_descriptor' in value:
+            return ip_range(value['ip_descriptor'])
+        if 'element' in value:
+            ranges = self._address_ranges(rule, value['element'])
+            return ranges[0] if ranges else None
+
+    def _compile(self, rule):
+        options = rule.data.get('options', {})
+        nat = None
+        if options.get('dynamic_src_nat'):
+            values = options['dynamic_src_nat'].get('translation_values', [])
+            value = values[0] if values else {}
+            translated = self._value_range(rule, value)
+            if translated:
+                ports = (value['min_port'],
+                         value.get('max_port', value['min_port'])) \
+                    if 'min_port' in value else None
+                nat = ('dynamic_src_nat', translated, ports)
+        elif options.get('static_src_nat'):
+            config = options['static_src_nat']
+            original = self._value_range(rule, config.get('original_value'))
+            translated = self._value_range(rule, config.get('translated_value'))
+            if translated:
+                nat = ('static_src_nat', original, translated)
+
+        dst_nat = None
+        if options.get('static_dst_nat'):
+            config = options['static_dst_nat']
+            original = config.get('original_value', {})
+            translated = config.get('translated_value', {})
+            translated_range = self._value_range(rule, translated)
+            if translated_range:
+                ports = None
+                if 'min_port' in original and 'min_port' in translated:
+                    ports = (int(original['min_port']),
+                             int(original.get('max_port', original['min_port'])),
+                             int(translated['min_port']))
+                dst_nat = (self._value_range(rule, original),
+                           translated_range, ports)
+
+        return _CompiledRule(
+            rule,
+            self._addresses(rule, 'sources', 'src'),
+            self._addresses(rule, 'destinations', 'dst'),
+            self._services(rule),
+            (nat, dst_nat))
+
+    def translate(self, src, dst, protocol='tcp', dst_port=None):
+        """
+        Translate a single flow.
+
+        :param str src: source address
+        :param str dst: destination address
+        :param protocol: protocol name (tcp, udp, icmp, icmpv6) or number
+        :param int dst_port: destination port
+        :rtype: NATResult
+        """
+        return self._translate(
+            ip_to_int(src), ip_to_int(dst), src, dst,
+            _protocol(protocol), dst_port)
+
+    def translate_many(self, flows):
+        """
+        Translate flows. Addresses are converted once and cached while
+        translating.
+
+        :param flows: iterable of (src, dst, protocol, dst_port) tuples
+        :return: generator of NATResult in the order of the flows
+        """
+        cache = {}
+        for src, dst, protocol, dst_port in flows:
+            if len(cache) > 100000:
+                cache.clear()
+            isrc = cache.get(src)
+            if isrc is None:
+                isrc = cache[src] = ip_to_int(src)
+            idst = cache.get(dst)
+            if idst is None:
+                idst = cache[dst] = ip_to_int(dst)
+            yield self._translate(isrc, idst, src, dst,
+                                  _protocol(protocol), dst_port)
+
+    def _translate(self, isrc, idst, src, dst, protocol, dst_port):
+        table = self._tables[6 if isrc >= _V6_OFFSET else 4]
+        for compiled in table:
+            if compiled.sources is not None and isrc not in compiled.sources:
+                continue
+            if compiled.destinations is not None and \
+                idst not in compiled.destinations:
+                continue
+            if compiled.services is not None and not any(
+                    proto == protocol and (low is None or (
+                        dst_port is not None and low <= dst_port <= high))
+                    for proto, low, high in compiled.services):
+                continue
+            return self._apply(compiled, isrc, idst, src, dst, dst_port)
+        return NATResult(None, src, dst, dst_port, None)
+
+    def _apply(self, compiled, isrc, idst, src, dst, dst_port):
+        src_nat, dst_nat = compiled.nat
+        src_ports = None
+        if src_nat is not None:
+            kind, first, second = src_nat
+            if kind == 'dynamic_src_nat':
+                src = int_to_ip(first[0])
+                src_ports = second
+            else:
+                src = int_to_ip(_map_address(isrc, first, second))
+
+        if dst_nat is not None:
+            original, translated, ports = dst_nat
+            dst = int_to_ip(_map_address(idst, original, translated))
+            if ports is not None and dst_port is not None:
+                low, high, translated_port = ports
+                if low <= dst_port <= high:
+                    dst_port = translated_port + (dst_port - low)
+        return NATResult(compiled.rule, src, dst, dst_port, src_ports)
+
+    def __repr__(self):
+        return '%s(policy=%s, rules=%s)' % (
+            self.__class__.__name__, self.policy.name, len(self.rules))
+
+
+def _map_address(address, original, translated):
+    """
+    Map an address from the original range to the same offset in the
+    translated range. If the address is outside of the original range or
+    the offset is outside of the translated range, the first translated
+    address is used.
+    """
+    start, end = translated
+    if original is not None and original[0] <= address <= original[1]:
+        offset = address - original[0]
+        if start + offset <= end:
+            return start + offset
+    return start
@@ -74,13 +74,95 @@ from smc.base.model import Element, SubElement, SubElementCreator
 from smc.elements.other import LogicalInterface
 from smc.vpn.policy import PolicyVPN
 from smc.api.exceptions import ElementNotFound, MissingRequiredInput,\
-    CreateRuleFailed, PolicyCommandFailed
+    CreateRuleFailed, PolicyCommandFailed, ResourceNotFound
 from smc.policy.rule_elements import Action, LogOptions, Destination, Source,\
     Service, AuthenticationOptions, TimeRange
-from smc.base.util import element_resolver
+from smc.base.util import element_resolver, parallel_map
 from smc.base.decorators import cacheable_resource
 
 
+#: Rule collections of a policy, by policy attribute name
+RULE_COLLECTIONS = (
+    'fw_ipv4_access_rules', 'fw_ipv4_nat_rules', 'fw_ipv6_access_rules',
+    'fw_ipv6_nat_rules', 'layer2_ipv4_access_rules', 'layer2_ethernet_rules',
+    'ips_ipv4_access_rules', 'ips_ethernet_rules', 'file_filtering_rules')
+
+
+def load_rules(rules, max_workers=10):
+    """
+    Fetch the rules from a rule collection concurrently. Iterating a
+    rule collection only returns the rule meta data, and each rule is
+    fetched when an attribute is first accessed. Use this when all rules
+    will be inspected::
+    
+        rules = load_rules(policy.fw_ipv4_access_rules)
+    
+    :param rules: rule collection or list of rules
+    :param int max_workers: max number of concurrent requests
+    :raises FetchElementFailed: failed to fetch a rule
+    :return: rules in policy order with their data loaded
+    :rtype: list(Rule)
+    """
+    rules = list(rules)
+    for _rule, _data, error in parallel_map(
+            lambda rule: rule.data, rules, max_workers):
+        if error is not None:
+            raise error
+    return rules
+
+
+def policy_rules(policies, include_template=True, max_workers=10):
+    """
+    Fetch the rules of all rule collections in :data:`RULE_COLLECTIONS`
+    of the policies concurrently. Collections that do not exist for the
+    policy type are skipped. Template rules are returned before the rules
+    of the policy::
+    
+        rules = policy_rules([FirewallPolicy('mypolicy')])
+    
+    :param list policies: policies to fetch the rules from
+    :param bool include_template: include the rules of the policy
+        templates
+    :param int max_workers: max number of concurrent requests
+    :raises FetchElementFailed: failed to fetch a rule
+    :return: rules with their data loaded
+    :rtype: list(Rule)
+    """
+    items = []
+    for policy in policies:
+        if include_template and policy.data.get('template'):
+            items.append(policy.template)
+        items.append(policy)
+
+    collections = [(policy, name) for policy in items
+                   for name in RULE_COLLECTIONS]
+
+    def list_rules(item):
+        policy, name = item
+        try:
+            return list(getattr(policy, name))
+        except (AttributeError, ResourceNotFound):
+            return []
+
+    rules = []
+    for _item, result, error in parallel_map(
+            list_rules, collections, max_workers):
+        if error is not None:
+            raise error
+        rules.extend(result)
+    return load_rules(rules, max_workers)
+
+
+def is_rule_section(rule):
+    """
+    Whether the rule is a rule section. Rule sections only have a comment
+    and do not match traffic.
+    
+    :rtype: bool
+    """
+    return 'sources' not in rule.data and 'destinations' not in rule.data
+
+
 class Rule(object):
     """ 
     Top level rule construct with methods required to modify common 
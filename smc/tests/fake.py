@@ -0,0 +1,84 @@
+"""
+In memory stand in for the SMC API connection, used by tests that need
+elements to fetch and update json without an SMC.
+"""
+import copy
+import threading
+from smc import session
+from smc.api.exceptions import SMCOperationFailure
+
+
+class FakeResult(object):
+    def __init__(self, json=None, href=None):
+        self.json = json
+        self.href = href
+        self.etag = 'etag'
+        self.msg = None
+        self.code = 200
+        self.content = None
+
+
+class FakeConnection(object):
+    """
+    Connection serving GET requests from a dict of href to json. PUT
+    requests replace the json and all requests are recorded in `calls`
+    as (method, href). Hrefs not in the dict fail with a 404. POST
+    requests to an href mapped to a function return the result of calling
+    it with the request json. DELETE requests remove the href. Requests
+    other than GET to hrefs in `errors` fail with the error message.
+
+    :param dict db: href to json
+    """
+    def __init__(self, db):
+        self.db = db
+        self.calls = []
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def send_request(self, method, request):
+        with self._lock:
+            self.calls.append((method, request.href))
+        if request.href not in self.db:
+            self._fail(404, 'Not found: {}'.format(request.href))
+        if method != 'GET' and request.href in self.errors:
+            self._fail(400, self.errors[request.href])
+        if method == 'GET':
+            return FakeResult(copy.deepcopy(self.db[request.href]))
+        if method == 'POST' and callable(self.db[request.href]):
+            return FakeResult(self.db[request.href](request.json))
+        if method == 'PUT':
+            self.db[request.href] = copy.deepcopy(
+                getattr(request.json, 'data', request.json))
+        elif method == 'DELETE':
+            del self.db[request.href]
+        return FakeResult(href=request.href)
+
+    def _fail(self, code, message):
+        error = SMCOperationFailure()
+        error.code = error.smcresult.code = code
+        error.smcresult.msg = message
+        raise error
+
+    def methods(self):
+        return [method for method, _href in self.calls]
+
+
+def install(db, entry_points=None):
+    """
+    Install a fake connection on the session.
+
+    :param dict db: href to json
+    :param dict entry_points: entry point name to href
+    :rtype: FakeConnection
+    """
+    connection = FakeConnection(db)
+    session._connection = connection
+    if entry_points:
+        session._resource.add([{'rel': rel, 'href': href}
+                               for rel, href in entry_points.items()])
+    return connection
+
+
+def uninstall():
+    session._connection = None
+    session._resource.clear()
@@ -0,0 +1,114 @@
+import unittest
+from smc.core.engine import Engine
+from smc.policy.layer3 import FirewallPolicy
+from smc.policy.analytics import RuleHitAnalytics
+from smc.tests.fake import install, uninstall
+
+
+BASE = 'http://smc/elements'
+POLICY = BASE + '/fw_policy/1'
+TEMPLATE = BASE + '/fw_template_policy/1'
+
+
+def rule_href(policy, name):
+    return '%s/fw_ipv4_access_rule/%s' % (policy, name)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.db = {
+            POLICY: {
+                'name': 'policy', 'template': TEMPLATE,
+                'link': [
+                    {'rel': 'self', 'href': POLICY, 'type': 'fw_policy'},
+                    {'rel': 'fw_ipv4_access_rules', 'href': POLICY + '/rules'},
+                    {'rel': 'rule_counter', 'href': POLICY + '/counters'}]},
+            TEMPLATE: {
+                'name': 'template',
+                'link': [
+                    {'rel': 'self', 'href': TEMPLATE,
+                     'type': 'fw_template_policy'},
+                    {'rel': 'fw_ipv4_access_rules',
+                     'href': TEMPLATE + '/rules'}]},
+            POLICY + '/counters': self.counters}
+        self.rules(TEMPLATE, 'template')
+        self.rules(POLICY, 'section', 'allow', 'discard', 'disabled')
+        section = self.db[rule_href(POLICY, 'section')]
+        del section['sources'], section['destinations']
+        self.db[rule_href(POLICY, 'disabled')]['is_disabled'] = True
+        # Rule of another policy referenced by a counter
+        self.db[rule_href(BASE + '/fw_policy/2', 'other')] = self.rule(
+            BASE + '/fw_policy/2', 'other')
+
+        self.hits = {
+            'fw1': {'allow': 5, 'other': 1, 'deleted': 4},
+            'fw2': {'allow': 2, 'discard': 3}}
+        install(self.db)
+        self.engines = [Engine('fw1', href=BASE + '/single_fw/1'),
+                        Engine('fw2', href=BASE + '/single_fw/2'),
+                        Engine('fw3', href=BASE + '/single_fw/3')]
+
+    def tearDown(self):
+        uninstall()
+
+    def rule(self, policy, name):
+        href = rule_href(policy, name)
+        return {'name': name, 'sources': {'any': True},
+                'destinations': {'any': True},
+                'link': [{'rel': 'self', 'href': href,
+                          'type': 'fw_ipv4_access_rule'}]}
+
+    def rules(self, policy, *names):
+        self.db[policy + '/rules'] = [
+            {'name': name, 'href': rule_href(policy, name),
+             'type': 'fw_ipv4_access_rule'} for name in names]
+        for name in names:
+            self.db[rule_href(policy, name)] = self.rule(policy, name)
+
+    def counters(self, json):
+        engine = json['target_ref'].split('/')[-1]
+        hits = self.hits['fw' + engine]
+        return [{'rule_ref': rule_href(
+                    BASE + '/fw_policy/2' if name == 'other' else POLICY, name),
+                 'hits': value} for name, value in sorted(hits.items())]
+
+    def analytics(self):
+        return RuleHitAnalytics(
+            FirewallPolicy('policy', href=POLICY), self.engines)
+
+    def test_hits(self):
+        analytics = self.analytics()
+        deleted = rule_href(POLICY, 'deleted')
+        self.assertEqual(list(analytics.failures), ['fw3'])
+        self.assertEqual(
+            [(hits.rule.name, hits.hits, hits.engines)
+             for hits in analytics.all()],
+            [('template', 0, 0), ('allow', 7, 2), ('discard', 3, 1),
+             ('disabled', 0, 0), (deleted, 4, 1), ('other', 1, 1)])
+        hits = analytics.hits(rule_href(POLICY, 'allow'))
+        self.assertEqual(hits.engine_hits, {'fw1': 5, 'fw2': 2})
+        self.assertEqual([hits.rule.name for hits in analytics.never_hit()],
+                         ['template'])
+        self.assertEqual(
+            [hits.rule.name for hits in analytics.never_hit(True)],
+            ['template', 'disabled'])
+        self.assertEqual([rule.name for rule in analytics.unused_on('fw2')],
+                         ['template', 'disabled', deleted, 'other'])
+
+    def test_deleted_rule(self):
+        analytics = self.analytics()
+        deleted = rule_href(POLICY, 'deleted')
+        self.assertEqual(list(analytics.errors), [deleted])
+        hits = analytics.hits(deleted)
+        self.assertEqual((hits.rule.name, hits.rule.href), (deleted, deleted))
+        self.assertEqual(hits.rule.typeof, 'fw_ipv4_access_rule')
+        self.assertEqual((hits.hits, hits.engine_hits),
+                         (4, {'fw1': 4, 'fw2': 0}))
+        self.assertEqual(
+            [hits.rule.href for hits in analytics.low_hit(5)][-2:],
+            [deleted, rule_href(BASE + '/fw_policy/2', 'other')])
+
+
+if __name__ == "__main__":
+    unittest.main()
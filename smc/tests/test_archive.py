@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import unittest
+from xml.etree import ElementTree
+from smc.base.archive import iter_json, iter_xml, write_xml
+
+
+def parse(document, chunk_size=65536):
+    return list(iter_json(io.BytesIO(document.encode('utf-8')), chunk_size))
+
+
+class Test(unittest.TestCase):
+
+    def assertParsed(self, document, expected):
+        for chunk_size in (1, 2, 3, 7, 65536):
+            self.assertEqual(parse(document, chunk_size), expected)
+
+    def test_top_level_lists(self):
+        self.assertParsed(
+            '{"host": [{"name": "a"}, {"name": "b"}], "network": [1]}',
+            [('host', {'name': 'a'}), ('host', {'name': 'b'}),
+             ('network', 1)])
+        self.assertParsed('[1, "a", {"b": [2]}]',
+                          [(None, 1), (None, 'a'), (None, {'b': [2]})])
+        self.assertParsed('{"empty": [], "host": [true]}', [('host', True)])
+
+    def test_numbers(self):
+        self.assertParsed('{"a": [1.5, -2e3, 10]}',
+                          [('a', 1.5), ('a', -2e3), ('a', 10)])
+        self.assertParsed('[1.5, -2e3, 10]',
+                          [(None, 1.5), (None, -2e3), (None, 10)])
+        self.assertParsed('[ 123456789 ,0.25 ]\n',
+                          [(None, 123456789), (None, 0.25)])
+
+    def test_brackets_in_strings(self):
+        self.assertParsed(
+            '{"comment": "x [y]", "host": [{"name": "b [1]"}], "s": "]"}',
+            [('host', {'name': 'b [1]'})])
+        self.assertParsed('{"we\\"ird": [1], "s": "\\\\", "z": ["\\"]"]}',
+                          [('we"ird', 1), ('z', '"]')])
+
+    def test_nested_lists_skipped(self):
+        self.assertParsed('{"meta": {"x": [1], "y": "]}["}, "host": [2]}',
+                          [('host', 2)])
+
+    def test_unicode(self):
+        self.assertParsed(u'{"hé": [{"name": "é"}]}',
+                          [(u'hé', {'name': u'é'})])
+
+    def test_many_items(self):
+        items = [{'name': 'h%d' % i, 'comment': '[%d] "q" {x}' % i}
+                 for i in range(500)]
+        document = json.dumps({'meta': {'list': [1]}, 'host': items})
+        self.assertEqual(parse(document, 13), [('host', item) for item in items])
+
+    def test_truncated(self):
+        for document in ('{"host": [1, 2', '[1.5', '[1 2]', '{"host": "x', '[1, {"b":'):
+            with self.assertRaises(ValueError):
+                parse(document, 3)
+
+
+
+PROLOG = (b'<?xml version="1.0" encoding="ISO-8859-1" standalone="no"?>\n'
+          b'<!-- exported <elements> -->\n'
+          b'<!DOCTYPE generic_import_export SYSTEM '
+          b'"generic_import_export_v6.5.dtd">')
+
+
+class SlowReader(object):
+    def __init__(self, data, size):
+        self.fileobj = io.BytesIO(data)
+        self.size = size
+
+    def read(self, size=-1):
+        return self.fileobj.read(self.size)
+
+
+class XMLTest(unittest.TestCase):
+
+    document = PROLOG + (
+        b'\n<generic_import_export build="1">'
+        b'<host name="a" comment="\xe9"><mvia_address address="1.1.1.1"/>'
+        b'</host><network name="b"/></generic_import_export>')
+
+    def test_iter_xml(self):
+        for size in (1, 7, 65536):
+            root = {}
+            self.assertEqual(
+                list(iter_xml(SlowReader(self.document, size), root)),
+                [('host', {'name': 'a', 'comment': u'\xe9',
+                           'mvia_address': [{'address': '1.1.1.1'}]}),
+                 ('network', {'name': 'b'})])
+            self.assertEqual(root['tag'], 'generic_import_export')
+            self.assertEqual(root['attrib'], {'build': '1'})
+            # Data is written as UTF-8
+            self.assertEqual(root['prolog'], PROLOG.replace(
+                b'ISO-8859-1', b'UTF-8'))
+
+    def test_write_xml(self):
+        root = {}
+        items = list(iter_xml(io.BytesIO(self.document), root))
+        node = ElementTree.Element(root['tag'], root['attrib'])
+        node.append(ElementTree.Element(*items[1]))
+        document = write_xml(node, root['prolog'])
+        self.assertTrue(document.startswith(root['prolog'] + b'\n<generic'))
+        self.assertEqual(list(iter_xml(io.BytesIO(document))), items[1:])
+
+        self.assertTrue(write_xml(node).startswith(b'<?xml '))
+        self.assertTrue(write_xml(node, b'').startswith(b'<generic'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import datetime
+import unittest
+from smc.api.codec import get_codec, CacheEncoder, BACKENDS
+from smc.base.model import ElementCache
+
+try:
+    import orjson  # @UnusedImport
+except ImportError:
+    orjson = None
+
+
+class Body(object):
+    # Objects exposing data are encoded using it, such as SubElement
+    def __init__(self, data):
+        self.data = data
+
+
+class CodecTests(object):
+    # Round trip tests run for each codec, set `name` in the subclass
+
+    def setUp(self):
+        self.codec = get_codec(self.name)
+
+    def test_name(self):
+        self.assertEqual(self.codec.name, self.name)
+
+    def test_round_trip(self):
+        value = {'name': u'h\xe9', 'list': [1, 2.5, None, True],
+                 'nested': {'a': u'\u2603'}}
+        self.assertEqual(self.codec.loads(self.codec.dumps(value)), value)
+
+    def test_element_cache(self):
+        cache = ElementCache({'name': 'host', 'address': '1.1.1.1'})
+        body = {'element': cache, 'items': [Body({'a': 1})]}
+        self.assertEqual(
+            self.codec.loads(self.codec.dumps(body)),
+            {'element': {'name': 'host', 'address': '1.1.1.1'},
+             'items': [{'a': 1}]})
+
+    def test_loads_bytes_and_str(self):
+        document = u'{"name": "h\xe9", "id": 1}'
+        expected = {'name': u'h\xe9', 'id': 1}
+        self.assertEqual(self.codec.loads(document), expected)
+        self.assertEqual(self.codec.loads(document.encode('utf-8')), expected)
+
+    def test_unserializable(self):
+        with self.assertRaises(TypeError):
+            self.codec.dumps({'value': object()})
+
+
+class JSONCodecTest(CodecTests, unittest.TestCase):
+    name = 'json'
+
+    def test_dumps_str(self):
+        self.assertIsInstance(self.codec.dumps({'a': 1}), str)
+
+    def test_datetime(self):
+        with self.assertRaises(TypeError):
+            self.codec.dumps({'time': datetime.datetime(2020, 1, 1)})
+
+
+@unittest.skipIf(orjson is None, 'orjson is not installed')
+class OrjsonCodecTest(CodecTests, unittest.TestCase):
+    name = 'orjson'
+
+    def test_dumps_bytes(self):
+        self.assertIsInstance(self.codec.dumps({'a': 1}), bytes)
+
+    def test_datetime(self):
+        self.assertEqual(
+            self.codec.loads(self.codec.dumps(
+                {'time': datetime.datetime(2020, 1, 1, 10, 30)})),
+            {'time': '2020-01-01T10:30:00'})
+
+    def test_non_str_keys(self):
+        self.assertEqual(self.codec.loads(self.codec.dumps({1: 'a'})),
+                         {'1': 'a'})
+
+
+class GetCodecTest(unittest.TestCase):
+
+    def test_default(self):
+        self.assertEqual(get_codec().name, 'json')
+
+    def test_auto(self):
+        expected = 'orjson' if orjson is not None else None
+        codec = get_codec('auto')
+        self.assertIn(codec.name, BACKENDS)
+        if expected:
+            self.assertEqual(codec.name, expected)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            get_codec('nope')
+
+    def test_cache_encoder(self):
+        import json
+        self.assertEqual(
+            json.loads(json.dumps(Body([1]), cls=CacheEncoder)), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import json
+import unittest
+from smc.policy.layer3 import FirewallPolicy
+from smc.policy.diff import diff_rules, diff_policies, snapshot, fingerprint
+from smc.tests.fake import install, uninstall
+
+
+BASE = 'http://smc/elements'
+POLICY = BASE + '/fw_policy/1'
+
+
+def entry(name, position, action='allow', sources=('host:a',)):
+    rule = {'action': {'action': action}, 'sources': {'src': list(sources)}}
+    return {'name': name, 'tag': name, 'position': position, 'rule': rule,
+            'fingerprint': fingerprint(rule)}
+
+
+def entries(*rules):
+    return [entry(rule[0], position, *rule[1:])
+            for position, rule in enumerate(rules, 1)]
+
+
+def summary(changes):
+    return [(change.change, change.name, change.fields) for change in changes]
+
+
+class DiffRulesTest(unittest.TestCase):
+
+    def test_unchanged(self):
+        rules = entries(('a',), ('b', 'discard'))
+        self.assertEqual(diff_rules(rules, entries(('a',), ('b', 'discard'))),
+                         [])
+
+    def test_moved(self):
+        old = entries(('a', 'allow'), ('b', 'discard'), ('c', 'refuse'),
+                      ('d', 'continue'))
+        new = entries(('a', 'allow'), ('c', 'refuse'), ('d', 'continue'),
+                      ('b', 'discard'))
+        changes = diff_rules(old, new, 'fw_ipv4_access_rules')
+        self.assertEqual(summary(changes), [('moved', 'b', [])])
+        change = changes[0]
+        self.assertEqual(change.relation, 'fw_ipv4_access_rules')
+        self.assertEqual((change.old['position'], change.new['position']),
+                         (2, 4))
+
+    def test_modified(self):
+        old = entries(('a',), ('b', 'allow', ['host:b']), ('c', 'discard'))
+        new = entries(('a',), ('b', 'discard', ['host:c']), ('c', 'discard'))
+        changes = diff_rules(old, new)
+        self.assertEqual(summary(changes),
+                         [('modified', 'b', ['action', 'sources'])])
+        self.assertEqual(changes[0].old['rule']['sources']['src'], ['host:b'])
+        self.assertEqual(changes[0].new['rule']['sources']['src'], ['host:c'])
+
+    def test_added_removed(self):
+        old = entries(('a',), ('b', 'discard'))
+        new = entries(('c', 'refuse'), ('a',))
+        self.assertEqual(summary(diff_rules(old, new)),
+                         [('added', 'c', []), ('removed', 'b', [])])
+        self.assertEqual(summary(diff_rules([], new)),
+                         [('added', 'c', []), ('added', 'a', [])])
+
+    def test_duplicate_fingerprints(self):
+        # Rules with the same content are matched in order
+        old = entries(('a',), ('b',), ('c', 'discard'))
+        new = entries(('c', 'discard'), ('a',), ('b',))
+        self.assertEqual(summary(diff_rules(old, new)), [('moved', 'c', [])])
+
+        old = entries(('a',), ('b',), ('c',))
+        new = entries(('a',), ('c',))
+        self.assertEqual(summary(diff_rules(old, new)),
+                         [('removed', 'c', [])])
+
+        old = entries(('a',), ('b', 'discard'), ('c',))
+        new = entries(('b', 'discard'), ('c',), ('a',), ('d',))
+        self.assertEqual(summary(diff_rules(old, new)),
+                         [('moved', 'a', []), ('added', 'd', [])])
+
+
+class DiffPoliciesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = {POLICY: {
+            'name': 'policy',
+            'link': [{'rel': 'self', 'href': POLICY, 'type': 'fw_policy'},
+                     {'rel': 'fw_ipv4_access_rules',
+                      'href': POLICY + '/rules'}]}}
+        self.hosts = [self.element('host%d' % i, 'host') for i in range(3)]
+        self.rules([
+            ('allow', [self.hosts[0], self.hosts[1]], 'allow'),
+            ('web', [self.hosts[2]], 'allow'),
+            ('old', [self.hosts[1]], 'refuse'),
+            ('deny', ['any'], 'discard')])
+        install(self.db)
+        self.policy = FirewallPolicy('policy', href=POLICY)
+
+    def tearDown(self):
+        uninstall()
+
+    def element(self, name, typeof):
+        href = '%s/%s/%s' % (BASE, typeof, name)
+        self.db[href] = {'name': name, 'link': [
+            {'rel': 'self', 'href': href, 'type': typeof}]}
+        return href
+
+    def rules(self, rules):
+        self.db[POLICY + '/rules'] = []
+        for name, sources, action in rules:
+            href = '%s/fw_ipv4_access_rule/%s' % (POLICY, name)
+            self.db[POLICY + '/rules'].append(
+                {'name': name, 'href': href, 'type': 'fw_ipv4_access_rule'})
+            self.db[href] = {
+                'name': name, 'tag': name, 'rank': 1.0,
+                'sources': {'any': True} if sources == ['any'] else
+                           {'src': sources},
+                'destinations': {'any': True}, 'action': {'action': action},
+                'link': [{'rel': 'self', 'href': href,
+                          'type': 'fw_ipv4_access_rule'}]}
+
+    def test_snapshot(self):
+        saved = json.loads(json.dumps(snapshot(self.policy)))
+        self.assertEqual(list(saved), ['fw_ipv4_access_rules'])
+        rules = saved['fw_ipv4_access_rules']
+        self.assertEqual([rule['name'] for rule in rules],
+                         ['allow', 'web', 'old', 'deny'])
+        # References are replaced with the element type and name
+        self.assertEqual(rules[0]['rule']['sources']['src'],
+                         ['host:host0', 'host:host1'])
+        self.assertNotIn('tag', rules[0]['rule'])
+        self.assertFalse(diff_policies(saved, self.policy))
+
+    def test_diff_snapshot(self):
+        saved = json.loads(json.dumps(snapshot(self.policy)))
+        # Order of elements in a cell does not matter, the rank changed
+        self.rules([
+            ('web', [self.hosts[2]], 'allow'),
+            ('allow', [self.hosts[1], self.hosts[0]], 'allow'),
+            ('deny', ['any'], 'discard'),
+            ('new', [self.hosts[0]], 'allow')])
+        self.db['%s/fw_ipv4_access_rule/deny' % POLICY]['rank'] = 5.0
+        changes = diff_policies(saved, self.policy)
+        self.assertEqual(repr(changes),
+                         'PolicyDiff(added=1, removed=1, moved=1, modified=0)')
+        self.assertEqual(
+            [(change.relation, change.change, change.name)
+             for change in changes],
+            [('fw_ipv4_access_rules', 'moved', 'web'),
+             ('fw_ipv4_access_rules', 'removed', 'old'),
+             ('fw_ipv4_access_rules', 'added', 'new')])
+
+        self.rules([
+            ('allow', [self.hosts[0], self.hosts[1]], 'allow'),
+            ('web', [self.hosts[0]], 'allow'),
+            ('old', [self.hosts[1]], 'refuse'),
+            ('deny', ['any'], 'discard')])
+        self.policy = FirewallPolicy('policy', href=POLICY)
+        changes = diff_policies(saved, self.policy)
+        self.assertEqual(
+            [(change.change, change.name, change.fields) for change in changes],
+            [('modified', 'web', ['sources'])])
+        self.assertEqual(changes.modified[0].new['rule']['sources']['src'],
+                         ['host:host0'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import json
+import shutil
+import zipfile
+import tempfile
+import unittest
+from smc.administration.export import ExportArchive
+
+
+PROLOG = (b'<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+          b'<!DOCTYPE generic_import_export SYSTEM '
+          b'"generic_import_export_v6.5.dtd">')
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.filename = os.path.join(self.directory, 'export.zip')
+
+    def archive(self, members):
+        with zipfile.ZipFile(self.filename, 'w') as archive:
+            for name, data in members.items():
+                archive.writestr(name, data)
+        return ExportArchive(self.filename)
+
+    def read(self, filename, member):
+        with zipfile.ZipFile(filename) as archive:
+            return archive.read(member)
+
+    def test_split_xml(self):
+        hosts = b''.join(b'<host name="h%d"/>' % i for i in range(5))
+        export = self.archive({'exportable.xml': PROLOG + (
+            b'\n<generic_import_export build="1">%s'
+            b'</generic_import_export>' % hosts)})
+        chunks = export.split(2, os.path.join(self.directory, 'chunks'))
+        self.assertEqual([size for _filename, size in chunks], [2, 2, 1])
+        for filename, _size in chunks:
+            document = self.read(filename, 'exportable.xml')
+            # The declaration and document type are kept
+            self.assertTrue(document.startswith(
+                PROLOG + b'\n<generic_import_export build="1">'), document)
+        self.assertEqual([data['name'] for _typeof, data in
+                          ExportArchive(chunks[2][0]).elements()], ['h4'])
+
+    def test_split_json(self):
+        export = self.archive({
+            'exportable.json': json.dumps({
+                'host': [{'name': 'h1'}, {'name': 'h2', 'type': 'host'}],
+                'network': [{'name': 'n1'}]}),
+            'list.json': json.dumps([{'name': 'l1', 'type': 'host'}])})
+        chunks = export.split(10, os.path.join(self.directory, 'chunks'))
+        self.assertEqual([size for _filename, size in chunks], [4])
+        self.assertEqual(
+            json.loads(self.read(chunks[0][0], 'exportable.json').decode()),
+            {'host': [{'name': 'h1'}, {'name': 'h2', 'type': 'host'}],
+             'network': [{'name': 'n1'}]})
+        self.assertEqual(
+            json.loads(self.read(chunks[0][0], 'list.json').decode()),
+            [{'name': 'l1', 'type': 'host'}])
+
+
+if __name__ == "__main__":
+    unittest.main()
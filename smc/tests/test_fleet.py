@@ -0,0 +1,79 @@
+import unittest
+from smc.core.fleet import PolicyPush
+
+
+class Task(object):
+    def __init__(self, message):
+        self.progress = 100
+        self.in_progress = False
+        self.success = True
+        self.last_message = message
+
+
+class Poller(object):
+    """
+    Upload task that completed successfully.
+    """
+    def __init__(self):
+        self.task = Task('Upload complete')
+
+    def done(self):
+        return True
+
+    def add_done_callback(self, callback):
+        raise ValueError('Task already finished')
+
+
+class Engine(object):
+    def __init__(self, name, typeof='single_fw', data=None, fail=False):
+        self.name = name
+        self.type = typeof
+        self.href = 'http://smc/elements/%s/%s' % (typeof, name)
+        self.data = data or {}
+        self.fail = fail
+        self.uploads = 0
+
+    def upload(self, policy, **kwargs):
+        self.uploads += 1
+        if self.fail:
+            raise ValueError('Policy not found')
+        return Poller()
+
+
+class Test(unittest.TestCase):
+
+    def push(self, engines, **kwargs):
+        push = PolicyPush(engines, 'policy', retries=0, interval=1, **kwargs)
+        return {name: (result.success, result.message)
+                for name, result in push.run().items()}
+
+    def test_depends(self):
+        engines = [Engine('fw2'), Engine('fw1')]
+        self.assertEqual(self.push(engines, depends={'fw2': ['fw1']}),
+                         {'fw1': (True, 'Upload complete'),
+                          'fw2': (True, 'Upload complete')})
+
+    def test_master_failed(self):
+        # Virtual engines listed before a master that fails to start
+        master = Engine('master', 'master_engine', fail=True)
+        virtual = Engine('virtual', 'virtual_fw', {
+            'virtual_resource': master.href + '/virtual_resource/1'})
+        engines = [Engine('fw'), virtual, master]
+        self.assertEqual(
+            self.push(engines, depends={'fw': ['virtual']}),
+            {'master': (False, 'Policy not found'),
+             'virtual': (False, 'Skipped, dependency master failed'),
+             'fw': (False, 'Skipped, dependency virtual failed')})
+        self.assertEqual([engine.uploads for engine in engines], [0, 0, 1])
+
+    def test_circular(self):
+        engines = [Engine('fw1'), Engine('fw2'), Engine('fw3')]
+        self.assertEqual(
+            self.push(engines, depends={'fw1': ['fw2'], 'fw2': ['fw1']}),
+            {'fw1': (False, 'Skipped, circular dependency'),
+             'fw2': (False, 'Skipped, circular dependency'),
+             'fw3': (True, 'Upload complete')})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+import unittest
+from smc.policy.layer3 import FirewallPolicy
+from smc.policy.nat_simulator import (
+    NATSimulator, IPRanges, ip_range, ip_to_int, int_to_ip)
+from smc.tests.fake import install, uninstall
+
+
+BASE = 'http://smc/elements'
+POLICY = BASE + '/fw_policy/1'
+TEMPLATE = BASE + '/fw_template_policy/1'
+
+
+class AddressTest(unittest.TestCase):
+
+    def test_ip_to_int(self):
+        self.assertEqual(ip_to_int('0.0.0.1'), 1)
+        self.assertEqual(ip_to_int('10.0.0.1'), 0x0a000001)
+        self.assertEqual(int_to_ip(0x0a000001), '10.0.0.1')
+        # IPv6 addresses sort above all IPv4 addresses
+        self.assertTrue(ip_to_int('::') > ip_to_int('255.255.255.255'))
+        for address in ('::1', '2001:db8::5', 'fe80::1:2'):
+            self.assertEqual(int_to_ip(ip_to_int(address)), address)
+
+    def test_ip_range(self):
+        self.assertEqual(ip_range('10.0.0.1'),
+                         (ip_to_int('10.0.0.1'), ip_to_int('10.0.0.1')))
+        self.assertEqual(ip_range(' 10.0.0.1 - 10.0.0.9 '),
+                         (ip_to_int('10.0.0.1'), ip_to_int('10.0.0.9')))
+        self.assertEqual(ip_range('10.0.0.0/24'),
+                         (ip_to_int('10.0.0.0'), ip_to_int('10.0.0.255')))
+        # Host bits of the network are ignored
+        self.assertEqual(ip_range('10.0.0.77/30'),
+                         (ip_to_int('10.0.0.76'), ip_to_int('10.0.0.79')))
+        self.assertEqual(ip_range('0.0.0.0/0'),
+                         (0, ip_to_int('255.255.255.255')))
+        self.assertEqual(ip_range('2001:db8::1/64'),
+                         (ip_to_int('2001:db8::'),
+                          ip_to_int('2001:db8::ffff:ffff:ffff:ffff')))
+        self.assertEqual(ip_range('::/0'),
+                         (ip_to_int('::'),
+                          ip_to_int('ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff')))
+
+    def test_ip_range_invalid(self):
+        for value in ('10.0.0.256', 'foo', '10.0.0.0/x'):
+            self.assertRaises(Exception, ip_range, value)
+
+    def test_ip_ranges(self):
+        ranges = IPRanges([ip_range('10.0.0.128/25'),
+                           ip_range('10.0.0.0/25'),
+                           ip_range('10.0.0.10-10.0.0.20'),
+                           ip_range('192.168.1.1'),
+                           ip_range('2001:db8::/64')])
+        # Overlapping and adjacent ranges are merged
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges.starts[0], ip_to_int('10.0.0.0'))
+        self.assertEqual(ranges.ends[0], ip_to_int('10.0.0.255'))
+        for address in ('10.0.0.0', '10.0.0.127', '10.0.0.128',
+                        '10.0.0.255', '192.168.1.1', '2001:db8::ffff'):
+            self.assertIn(ip_to_int(address), ranges)
+        for address in ('9.255.255.255', '10.0.1.0', '192.168.1.0',
+                        '192.168.1.2', '2001:db8:0:1::', '::1'):
+            self.assertNotIn(ip_to_int(address), ranges)
+        self.assertNotIn(0, IPRanges([]))
+
+
+class NATSimulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = {
+            POLICY: {
+                'name': 'policy', 'template': TEMPLATE,
+                'link': [self.link('self', POLICY, 'fw_policy'),
+                         self.link('fw_ipv4_nat_rules', POLICY + '/nat4'),
+                         self.link('fw_ipv6_nat_rules', POLICY + '/nat6')]},
+            TEMPLATE: {
+                'name': 'template',
+                'link': [self.link('self', TEMPLATE, 'fw_template_policy'),
+                         self.link('fw_ipv4_nat_rules', TEMPLATE + '/nat4')]},
+            POLICY + '/nat6': []}
+        self.db[TEMPLATE + '/nat4'] = self.rules('template')
+        self.db[POLICY + '/nat4'] = self.rules(
+            'section', 'disabled', 'dst_nat', 'src_nat', 'range_nat',
+            'unsupported')
+
+        client = self.element('client', 'host', address='10.0.0.5')
+        clients = self.element('clients', 'network', ipv4_network='10.0.0.0/24')
+        group = self.element('group', 'group', element=[clients])
+        public = self.element('public', 'host', address='192.0.2.10')
+        web = self.element('web', 'host', address='203.0.113.5')
+        server = self.element('server', 'host', address='172.16.0.5')
+        https = self.element('https', 'tcp_service', min_dst_port=443)
+        services = self.element('services', 'tcp_service_group', element=[https])
+        pool = self.element('pool', 'address_range',
+                            ip_range='198.51.100.1-198.51.100.4')
+        domain = self.element('domain', 'domain_name')
+        any_value = {'any': True}
+
+        self.rule('template', sources={'src': [client]},
+                  destinations=any_value, services=any_value, options={})
+        self.rule('section', comment='section')
+        self.rule('disabled', is_disabled=True, sources=any_value,
+                  destinations=any_value, services=any_value, options={})
+        self.rule('dst_nat', sources=any_value,
+                  destinations={'dst': [web]}, services={'service': [services]},
+                  options={'static_dst_nat': {
+                      'original_value': {'element': web, 'min_port': 443,
+                                         'max_port': 443},
+                      'translated_value': {'element': server,
+                                           'min_port': 8443,
+                                           'max_port': 8443}}})
+        # Translation value without max_port
+        self.rule('src_nat', sources={'src': [group]}, destinations=any_value,
+                  services=any_value,
+                  options={'dynamic_src_nat': {'translation_values': [
+                      {'element': public, 'min_port': 1024}]}})
+        self.rule('range_nat', sources={'src': [pool]}, destinations=any_value,
+                  services=any_value,
+                  options={'static_src_nat': {
+                      'original_value': {'element': pool},
+                      'translated_value': {
+                          'ip_descriptor': '100.64.0.1-100.64.0.2'}}})
+        self.rule('unsupported', sources={'src': [domain]},
+                  destinations=any_value, services=any_value, options={})
+
+        self.connection = install(self.db)
+        self.simulator = NATSimulator(FirewallPolicy('policy', href=POLICY))
+
+    def tearDown(self):
+        uninstall()
+
+    @staticmethod
+    def link(rel, href, typeof=None):
+        link = {'rel': rel, 'href': href}
+        if typeof:
+            link['type'] = typeof
+        return link
+
+    def rules(self, *names):
+        return [{'name': name, 'href': BASE + '/nat_rule/' + name,
+                 'type': 'fw_ipv4_nat_rule'} for name in names]
+
+    def rule(self, name, **data):
+        href = BASE + '/nat_rule/' + name
+        self.db[href] = dict(
+            name=name, link=[self.link('self', href, 'fw_ipv4_nat_rule')],
+            **data)
+
+    def element(self, name, typeof, **data):
+        href = '%s/%s/%s' % (BASE, typeof, name)
+        self.db[href] = dict(
+            name=name, link=[self.link('self', href, typeof)], **data)
+        return href
+
+    def rule_name(self, result):
+        return result.rule.name if result.rule else None
+
+    def test_load(self):
+        self.assertEqual([compiled.rule.name for compiled in
+                          self.simulator.rules],
+                         ['template', 'dst_nat', 'src_nat', 'range_nat',
+                          'unsupported'])
+        self.assertEqual([rule.name for rule in self.simulator.unsupported],
+                         ['unsupported'])
+
+    def test_template_first(self):
+        # Matching rule without NAT stops processing
+        result = self.simulator.translate('10.0.0.5', '8.8.8.8')
+        self.assertEqual(self.rule_name(result), 'template')
+        self.assertEqual((result.src, result.dst), ('10.0.0.5', '8.8.8.8'))
+
+    def test_dynamic_src_nat(self):
+        result = self.simulator.translate('10.0.0.9', '8.8.8.8', 'udp', 53)
+        self.assertEqual(self.rule_name(result), 'src_nat')
+        self.assertEqual(result.src, '192.0.2.10')
+        self.assertEqual(result.dst_port, 53)
+        self.assertEqual(result.src_ports, (1024, 1024))
+
+    def test_static_src_nat(self):
+        result = self.simulator.translate('198.51.100.2', '8.8.8.8')
+        self.assertEqual(self.rule_name(result), 'range_nat')
+        self.assertEqual(result.src, '100.64.0.2')
+        # Offset outside of the translated range uses the first address
+        result = self.simulator.translate('198.51.100.4', '8.8.8.8')
+        self.assertEqual(result.src, '100.64.0.1')
+
+    def test_static_dst_nat(self):
+        result = self.simulator.translate('1.1.1.1', '203.0.113.5', 'tcp', 443)
+        self.assertEqual(self.rule_name(result), 'dst_nat')
+        self.assertEqual((result.dst, result.dst_port), ('172.16.0.5', 8443))
+        result = self.simulator.translate('1.1.1.1', '203.0.113.5', 'tcp', 80)
+        self.assertEqual(result, (None, '1.1.1.1', '203.0.113.5', 80, None))
+
+    def test_protocol(self):
+        for protocol in ('tcp', 'TCP', 'Tcp', 6):
+            result = self.simulator.translate(
+                '1.1.1.1', '203.0.113.5', protocol, 443)
+            self.assertEqual(self.rule_name(result), 'dst_nat')
+        for protocol in ('udp', 'UDP', 17):
+            result = self.simulator.translate(
+                '1.1.1.1', '203.0.113.5', protocol, 443)
+            self.assertEqual(result.rule, None)
+
+    def test_translate_many(self):
+        flows = [('10.0.0.9', '1.2.3.4', 'TCP', 80),
+                 ('1.1.1.1', '203.0.113.5', 'TCP', 443),
+                 ('::1', '::2', 'tcp', 80),
+                 ('10.0.0.9', '1.2.3.4', 'udp', 53)]
+        results = list(self.simulator.translate_many(flows))
+        self.assertEqual([self.rule_name(result) for result in results],
+                         ['src_nat', 'dst_nat', None, 'src_nat'])
+        self.assertEqual(results, [self.simulator.translate(*flow)
+                                   for flow in flows])
+
+    def test_requests(self):
+        # Every rule and element is fetched once
+        hrefs = [href for _method, href in self.connection.calls]
+        self.assertEqual(len(hrefs), len(set(hrefs)))
+
+
+if __name__ == "__main__":
+    unittest.main()
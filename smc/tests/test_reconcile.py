@@ -0,0 +1,127 @@
+import copy
+import unittest
+from smc.core.engine import Engine
+from smc.core.reconcile import EngineReconciler
+from smc.api.exceptions import UpdateElementFailed
+from smc.tests.fake import install, uninstall
+
+
+ENGINE = 'http://smc/elements/single_fw/1'
+
+
+def layer3(interface_id, address, network):
+    return {'physical_interface': {
+        'interface_id': str(interface_id),
+        'comment': 'intf %s' % interface_id,
+        'link': [{'rel': 'self', 'href': '%s/physical_interface/%s' % (
+            ENGINE, interface_id), 'type': 'physical_interface'}],
+        'vlanInterfaces': [],
+        'interfaces': [{'single_node_interface': {
+            'address': address, 'network_value': network, 'nodeid': 1,
+            'nicid': str(interface_id), 'auth_request': False,
+            'auth_request_source': False, 'primary_heartbeat': False,
+            'backup_heartbeat': False, 'backup_mgt': False,
+            'primary_mgt': False, 'outgoing': False, 'dynamic': False}}]}}
+
+
+def layer2(interface_id, second_interface_id):
+    nicid = '%s-%s' % (interface_id, second_interface_id)
+    return {'physical_interface': {
+        'interface_id': str(interface_id),
+        'link': [{'rel': 'self', 'href': '%s/physical_interface/%s' % (
+            ENGINE, interface_id), 'type': 'physical_interface'}],
+        'vlanInterfaces': [],
+        'interfaces': [{'inline_interface': {
+            'nicid': nicid, 'failure_mode': 'normal',
+            'logical_interface_ref': 'http://smc/elements/logical/1'}}]}}
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.db = {ENGINE: {
+            'name': 'myfw',
+            'link': [{'rel': 'self', 'href': ENGINE, 'type': 'single_fw'}],
+            'physicalInterfaces': [layer3(0, '1.1.1.1', '1.1.1.0/24'),
+                                   layer2(10, 11)],
+            'domain_server_address': [{'rank': 0, 'value': '8.8.8.8'}]}}
+        self.connection = install(self.db)
+        self.engine = Engine.from_meta(
+            name='myfw', type='single_fw', href=ENGINE)
+
+    def tearDown(self):
+        uninstall()
+
+    def plan(self, desired):
+        return EngineReconciler(self.engine, desired).plan()
+
+    def test_no_changes(self):
+        changes = self.plan({
+            'interfaces': [{'interface_id': 0, 'comment': 'intf 0',
+                            'interfaces': [{'nodes': [{
+                                'address': '1.1.1.1',
+                                'network_value': '1.1.1.0/24',
+                                'nodeid': 1}]}]}],
+            'dns': ['8.8.8.8']})
+        self.assertEqual(changes, [])
+
+    def test_interface_modified(self):
+        reconciler = EngineReconciler(self.engine, {
+            'interfaces': [{'interface_id': 0, 'comment': 'changed',
+                            'interfaces': [{'nodes': [{
+                                'address': '2.2.2.2',
+                                'network_value': '2.2.2.0/24',
+                                'nodeid': 1}]}]}]})
+        changes = reconciler.plan()
+        self.assertEqual(len(changes), 1)
+        change = changes[0]
+        self.assertEqual((change.section, change.name, change.action),
+                         ('interface', '0', 'modified'))
+        self.assertEqual(change.before['comment'], 'intf 0')
+        self.assertEqual(change.after['comment'], 'changed')
+        node = change.after['interfaces'][0]['single_node_interface']
+        self.assertEqual(node['address'], '2.2.2.2')
+        self.assertEqual(node['network_value'], '2.2.2.0/24')
+        # Routes of the interface are invalid after the network changed
+        self.assertEqual(reconciler._invalid_routes, ['0'])
+
+    def test_interface_created(self):
+        changes = self.plan({
+            'interfaces': [{'interface_id': 5,
+                            'interfaces': [{'nodes': [{
+                                'address': '5.5.5.5',
+                                'network_value': '5.5.5.0/24',
+                                'nodeid': 1}]}]}]})
+        self.assertEqual([(c.section, c.name, c.action) for c in changes],
+                         [('interface', 5, 'created')])
+        self.assertEqual(len(self.engine.data['physicalInterfaces']), 3)
+
+    def test_dns(self):
+        changes = self.plan({'dns': ['8.8.4.4', '8.8.8.8']})
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].after, [
+            {'rank': 0, 'value': '8.8.4.4'}, {'rank': 1, 'value': '8.8.8.8'}])
+
+    def test_layer2_interface_not_reconciled(self):
+        original = copy.deepcopy(self.db[ENGINE])
+        with self.assertRaises(UpdateElementFailed):
+            self.engine.reconcile({
+                'interfaces': [{'interface_id': 0, 'comment': 'changed'},
+                               {'interface_id': 10, 'comment': 'changed'}]})
+        self.assertNotIn('PUT', self.connection.methods())
+        # In memory changes are discarded
+        self.assertEqual(self.engine.data.data, original)
+
+    def test_apply(self):
+        changes = self.engine.reconcile({'dns': ['8.8.4.4']}, dry_run=True)
+        self.assertEqual(len(changes), 1)
+        self.assertNotIn('PUT', self.connection.methods())
+
+        self.engine.reconcile({'dns': ['8.8.4.4']})
+        self.assertEqual(self.connection.methods().count('PUT'), 1)
+        self.assertEqual(self.db[ENGINE]['domain_server_address'],
+                         [{'rank': 0, 'value': '8.8.4.4'}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import unittest
+from smc.elements.references import ReferenceGraph
+from smc.api.exceptions import DeleteElementFailed
+from smc.tests.fake import install, uninstall
+
+
+BASE = 'http://smc/elements'
+REFERENCES = BASE + '/references_by_element'
+
+
+def href(name):
+    return '%s/%s' % (BASE, name)
+
+
+class Test(unittest.TestCase):
+
+    # Element name to names of the elements referencing it
+    references = {
+        'member1': ['group'], 'member2': ['group'], 'group': [],
+        'used': ['rule'], 'used_group': ['used'], 'rule': [],
+        'loop1': ['loop2'], 'loop2': ['loop1'], 'single': []}
+
+    def setUp(self):
+        self.db = {REFERENCES: self.referencing}
+        for name in self.references:
+            self.db[href(name)] = {'name': name, 'link': [
+                {'rel': 'self', 'href': href(name), 'type': self.type(name)}]}
+        self.connection = install(
+            self.db, {'references_by_element': REFERENCES})
+        self.graph = ReferenceGraph()
+
+    def tearDown(self):
+        uninstall()
+
+    def type(self, name):
+        return 'group' if 'group' in name else 'host'
+
+    def referencing(self, json):
+        name = json['value'].split('/')[-1]
+        return [{'name': ref, 'href': href(ref), 'type': self.type(ref)}
+                for ref in self.references[name]]
+
+    def delete_order(self, *names):
+        waves, blocked = self.graph.delete_order([href(name) for name in names])
+        return ([sorted(wave) for wave in waves],
+                {ref: str(reason) for ref, reason in blocked.items()})
+
+    def bulk_delete(self, *names):
+        return [(result.element.name, result.deleted,
+                 result.reason if result.reason is None or isinstance(
+                     result.reason, str) else type(result.reason))
+                for result in self.graph.bulk_delete(
+                    [href(name) for name in names])]
+
+    def test_waves(self):
+        # Group referencing the members is deleted first
+        self.assertEqual(
+            self.delete_order('member1', 'member2', 'group', 'single'),
+            ([[href('group'), href('single')],
+              [href('member1'), href('member2')]], {}))
+
+    def test_referenced_outside(self):
+        # used_group is only referenced by used, which is blocked. Names
+        # are only known for elements returned as references
+        self.assertEqual(
+            self.delete_order('used', 'used_group', 'member1'),
+            ([], {href('used'): 'Referenced by rule',
+                  href('member1'): 'Referenced by group',
+                  href('used_group'): 'Referenced by ' + href('used')}))
+
+    def test_circular(self):
+        self.assertEqual(
+            self.delete_order('loop1', 'loop2', 'single'),
+            ([[href('single')]],
+             {href('loop1'): 'Circular reference',
+              href('loop2'): 'Circular reference'}))
+
+    def test_bulk_delete(self):
+        self.assertEqual(
+            self.bulk_delete('member1', 'member2', 'group', 'used'),
+            [('used', False, 'Referenced by rule'),
+             ('group', True, None), ('member1', True, None),
+             ('member2', True, None)])
+        self.assertEqual(self.connection.methods().count('DELETE'), 3)
+        for name in ('member1', 'member2', 'group'):
+            self.assertNotIn(href(name), self.db)
+            self.assertNotIn(href(name), self.graph.references)
+
+    def test_bulk_delete_failed(self):
+        self.connection.errors[href('group')] = 'Element is locked'
+        self.assertEqual(
+            self.bulk_delete('member1', 'member2', 'group', 'single'),
+            [('group', False, DeleteElementFailed), ('single', True, None),
+             ('member1', False, 'Referencing element was not deleted'),
+             ('member2', False, 'Referencing element was not deleted')])
+        # Members of the group are not attempted
+        self.assertEqual(
+            sorted(ref for method, ref in self.connection.calls
+                   if method == 'DELETE'), [href('group'), href('single')])
+
+    def test_delete_updates_index(self):
+        self.graph.load([href('member1'), href('member2')])
+        self.bulk_delete('group')
+        # The members are no longer referenced, without a new lookup
+        lookups = self.connection.methods().count('POST')
+        self.assertEqual(
+            [element.name for element in self.graph.unreferenced(
+                [href('member1'), href('member2')])],
+            ['member1', 'member2'])
+        self.assertEqual(self.connection.methods().count('POST'), lookups)
+
+    def test_save(self):
+        self.graph.load([href('member1'), href('member2'), href('group')])
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        filename = os.path.join(path, 'references.json')
+        self.graph.save(filename)
+
+        graph = ReferenceGraph.from_file(filename)
+        self.assertEqual(graph.references, self.graph.references)
+        graph._remove(href('group'))
+        self.assertEqual(graph.references,
+                         {href('member1'): [], href('member2'): []})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from smc.administration.reports import ReportBatch, Report
+
+
+class Task(object):
+    def __init__(self, name):
+        self.in_progress = False
+        self.success = True
+        self.last_message = 'Report generated'
+        self.progress = 100
+        self.resource = [Report(name=name, href='http://smc/report/' + name)]
+
+
+class Poller(object):
+    """
+    Report task that completes while the done callback is added. The
+    callbacks run before the callback is appended, as when the scheduler
+    thread finishes the task between checking and appending.
+    """
+    def __init__(self, name):
+        self.task = Task(name)
+        self.callbacks = []
+        self._done = False
+
+    def done(self):
+        return self._done
+
+    def add_done_callback(self, callback):
+        self._done = True
+        for done_callback in self.callbacks:
+            done_callback(self.task)
+        self.callbacks.append(callback)
+
+
+class CompletedPoller(Poller):
+    """
+    Report task that runs the callback when it is added.
+    """
+    def add_done_callback(self, callback):
+        self._done = True
+        callback(self.task)
+
+
+class Design(object):
+    def __init__(self, name, poller=Poller):
+        self.name = name
+        self.poller = poller
+
+    def generate(self, **kwargs):
+        return self.poller(self.name)
+
+
+class Test(unittest.TestCase):
+
+    def run_batch(self, designs):
+        results = []
+        batch = ReportBatch(designs, callback=results.append, interval=1)
+        batch.start()
+        batch.wait(10)
+        self.assertTrue(batch.done())
+        return batch, results
+
+    def test_completed_while_adding_callback(self):
+        batch, results = self.run_batch([Design('r1'), Design('r2')])
+        self.assertEqual(sorted(result.report.name for result in results),
+                         ['r1', 'r2'])
+        self.assertEqual(batch.failed, [])
+
+    def test_completed_once(self):
+        _batch, results = self.run_batch([Design('r1', CompletedPoller)])
+        self.assertEqual([result.report.name for result in results], ['r1'])
+
+
+if __name__ == "__main__":
+    unittest.main()
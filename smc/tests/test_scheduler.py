@@ -0,0 +1,54 @@
+import time
+import threading
+import unittest
+from smc.base.scheduler import PollScheduler
+
+
+ENGINE = 'http://smc/elements/single_fw/12'
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollScheduler(interval=3600)
+        self.polled = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        for key in list(self.scheduler.pending):
+            for callback in list(self.scheduler._jobs[key].subscribers):
+                self.scheduler.unregister(key, callback)
+
+    def register(self, key):
+        def fetch():
+            with self.lock:
+                self.polled.append(key)
+            return key
+        self.scheduler.register(key, fetch, lambda result: False)
+
+    def wake(self, key):
+        for href in (ENGINE, ENGINE + '/node/1', ENGINE + '3',
+                     ENGINE + '3/node/1'):
+            self.register(href)
+        self.scheduler.wake(key)
+        time.sleep(0.2)
+        with self.lock:
+            return sorted(self.polled)
+
+    def test_wake(self):
+        self.assertEqual(self.wake(ENGINE),
+                         [ENGINE, ENGINE + '/node/1'])
+
+    def test_wake_trailing_slash(self):
+        self.assertEqual(self.wake(ENGINE + '/'),
+                         [ENGINE, ENGINE + '/node/1'])
+
+    def test_wake_node(self):
+        self.assertEqual(self.wake(ENGINE + '/node/1'), [ENGINE + '/node/1'])
+
+    def test_wake_all(self):
+        self.assertEqual(len(self.wake(None)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
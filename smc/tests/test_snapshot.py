@@ -0,0 +1,113 @@
+import io
+import zipfile
+import unittest
+from smc.core.snapshot import SnapshotReader, SnapshotPolicy
+from smc.api.exceptions import ElementNotFound
+
+
+EXPORT = b'''<?xml version="1.0" encoding="UTF-8"?>
+<generic_import_export build="1">
+<host name="h1" comment="web server"><mvia_address address="1.1.1.1"/></host>
+<network name="n1" ipv4_network="10.0.0.0/24"/>
+<fw_policy name="pol" template_ref="Firewall Template">
+ <access_entry>
+  <rule_entry tag="1.0"><comment_rule comment="Web section"/></rule_entry>
+  <rule_entry tag="2.0" is_disabled="false" comment="allow web"><access_rule>
+   <match_part>
+    <match_sources>
+     <match_source_ref type="network_element" value="n1"/>
+    </match_sources>
+    <match_destinations>
+     <match_destination_ref type="network_element" value="h1"/>
+    </match_destinations>
+    <match_services>
+     <match_service_ref type="service" value="HTTP"/>
+    </match_services>
+   </match_part>
+   <action type="allow"/></access_rule></rule_entry>
+  <rule_entry tag="3.0" is_disabled="true"><access_rule>
+   <match_part>
+    <match_sources><match_source_ref type="any" value="ANY"/></match_sources>
+   </match_part>
+   <action type="discard"/></access_rule></rule_entry>
+ </access_entry>
+</fw_policy>
+<fw_template_policy name="Firewall Template"/>
+<fw_policy name="other"/>
+</generic_import_export>'''
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, 'w') as archive:
+            archive.writestr('exported_data.xml', EXPORT)
+        data.seek(0)
+        self.snapshot = SnapshotReader(data)
+        self.addCleanup(self.snapshot.close)
+        self.policy = self.snapshot.policy()
+        self.rules = self.policy.fw_ipv4_access_rules
+
+    def test_policy(self):
+        self.assertIsInstance(self.policy, SnapshotPolicy)
+        self.assertEqual((self.policy.typeof, self.policy.name),
+                         ('fw_policy', 'pol'))
+        self.assertEqual(self.snapshot.policy('other').name, 'other')
+        self.assertRaises(ElementNotFound, self.snapshot.policy, 'missing')
+
+        template = self.policy.template
+        self.assertIsInstance(template, SnapshotPolicy)
+        self.assertEqual((template.typeof, template.name),
+                         ('fw_template_policy', 'Firewall Template'))
+        self.assertIsNone(self.snapshot.policy('other').template)
+
+    def test_rule_cells(self):
+        _section, web, deny = self.rules
+        self.assertEqual(web.action, 'allow')
+        self.assertFalse(web.is_disabled)
+        self.assertFalse(web.sources.is_any)
+        self.assertEqual(web.sources.all(), [self.snapshot.get('n1')])
+        self.assertEqual(web.destinations.all()[0].data['comment'],
+                         'web server')
+        # Elements that are not in the snapshot have no data
+        service = web.services.all()[0]
+        self.assertEqual((service.typeof, service.name), ('service', 'HTTP'))
+        self.assertEqual(web.services.all_as_names(), ['HTTP'])
+
+        self.assertEqual(deny.action, 'discard')
+        self.assertTrue(deny.is_disabled)
+        self.assertTrue(deny.sources.is_any)
+        self.assertEqual(deny.sources.all(), [])
+        self.assertTrue(deny.destinations.is_none)
+        self.assertEqual(deny.destinations.all(), [])
+
+    def test_rule_section(self):
+        section = self.rules.get(0)
+        self.assertTrue(section.is_rule_section)
+        self.assertEqual(section.comment, 'Web section')
+        self.assertIsNone(section.action)
+        self.assertTrue(section.sources.is_none)
+        self.assertFalse(any(rule.is_rule_section
+                             for rule in list(self.rules)[1:]))
+
+    def test_search_rule(self):
+        self.assertEqual([rule.tag for rule in self.policy.search_rule('web')],
+                         ['2.0'])
+        self.assertEqual([rule.tag for rule in self.policy.search_rule('3.0')],
+                         ['3.0'])
+        self.assertEqual([rule.tag for rule in self.policy.search_rule('Rule')],
+                         ['1.0', '2.0', '3.0'])
+        self.assertEqual([rule.tag for rule in self.policy.search_rule('Web')],
+                         ['1.0'])
+        self.assertEqual(self.policy.search_rule('missing'), [])
+
+    def test_get_exact(self):
+        self.assertEqual(len(self.rules), 3)
+        self.assertEqual(self.rules.get_exact('Rule @3.0').action, 'discard')
+        self.assertIsNone(self.rules.get_exact('Rule @3'))
+        self.assertEqual(len(self.policy.fw_ipv6_access_rules), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -86,8 +86,7 @@ class PolicyVPN(Element):
         :rtype: SubElementCollection(GatewayNode)
         """
         return sub_collection(
-            self.get_relation('central_gateway_node'),
-            type('CentralGatewayNode', (GatewayNode,), {}))
+            self.get_relation('central_gateway_node'), CentralGatewayNode)
         
     @property
     def satellite_gateway_node(self):
@@ -97,8 +96,7 @@ class PolicyVPN(Element):
         :rtype: SubElementCollection(GatewayNode)
         """
         return sub_collection(
-            self.get_relation('satellite_gateway_node'),
-            type('SatelliteGatewayNode', (GatewayNode,), {}))
+            self.get_relation('satellite_gateway_node'), SatelliteGatewayNode)
 
     @property
     def mobile_gateway_node(self):
@@ -109,8 +107,7 @@ class PolicyVPN(Element):
         :rtype: SubElementCollection(GatewayNode)
         """
         return sub_collection(
-            self.get_relation('mobile_gateway_node'),
-            type('MobileGatewayNode', (GatewayNode,), {}))
+            self.get_relation('mobile_gateway_node'), MobileGatewayNode)
 
     @property
     def tunnels(self):
@@ -133,6 +130,21 @@ class PolicyVPN(Element):
         return sub_collection(
             self.get_relation('gateway_tunnel'), GatewayTunnel)
 
+    def topology(self, max_workers=10, sites=True):
+        """
+        Load the gateway nodes, tunnels, gateways and sites of this VPN
+        concurrently into an in memory graph. Use this instead of
+        iterating :attr:`tunnels` when inspecting large VPNs.
+        
+        :param int max_workers: max number of concurrent requests
+        :param bool sites: load the enabled and disabled sites of each
+            gateway node
+        :raises FetchElementFailed: failed fetching part of the topology
+        :rtype: smc.vpn.topology.VPNTopology
+        """
+        from smc.vpn.topology import VPNTopology
+        return VPNTopology(self, max_workers=max_workers, sites=sites)
+
     def open(self):
         """
         Open the policy for editing. This is only a valid method for
@@ -306,6 +318,36 @@ class GatewayNode(SubElement):
             self.get_relation('disabled_vpn_site'), GatewayTreeNode)
 
 
+class CentralGatewayNode(GatewayNode):
+    """
+    Gateway node that is a central gateway (hub) of the VPN
+    """
+
+
+class SatelliteGatewayNode(GatewayNode):
+    """
+    Gateway node that is a satellite gateway (spoke) of the VPN
+    """
+
+
+class MobileGatewayNode(GatewayNode):
+    """
+    Gateway node for mobile VPN clients
+    """
+
+
+class TunnelSideA(GatewayNode):
+    """
+    Gateway node on side A of a gateway tunnel
+    """
+
+
+class TunnelSideB(GatewayNode):
+    """
+    Gateway node on side B of a gateway tunnel
+    """
+
+
 class GatewayTreeNode(SubElement):
     """
     Gateway Tree node is a list of VPN Site elements returned when retrieving
@@ -404,7 +446,7 @@ class GatewayTunnel(SubElement):
         """
         self.update(preshared_key=key)
     
-    @property
+    @cached_property
     def tunnel_side_a(self):
         """
         Return the gateway node for tunnel side A. This will
@@ -412,10 +454,9 @@ class GatewayTunnel(SubElement):
         
         :rtype: GatewayNode
         """
-        return type('TunnelSideA', (GatewayNode,), {
-            'href': self.data.get('gateway_node_1')})()
+        return TunnelSideA(href=self.data.get('gateway_node_1'))
     
-    @property
+    @cached_property
     def tunnel_side_b(self):
         """
         Return the gateway node for tunnel side B. This will
@@ -423,8 +464,7 @@ class GatewayTunnel(SubElement):
         
         :rtype: GatewayNode
         """
-        return type('TunnelSideB', (GatewayNode,), {
-            'href': self.data.get('gateway_node_2')})()
+        return TunnelSideB(href=self.data.get('gateway_node_2'))
     
     def __str__(self):
         return '{0}(tunnel_side_a={1},tunnel_side_b={2})'.format(
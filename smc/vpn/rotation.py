@@ -0,0 +1,152 @@
+"""
+Rotate the preshared keys of policy based and route based VPN tunnels in
+bulk. Each policy VPN is loaded once using
+:class:`~smc.vpn.topology.VPNTopology`, opened once, the selected tunnels
+are updated concurrently and the policy is then saved and closed. Route
+based VPNs are updated concurrently.
+
+Rotate all tunnels to external gateways with a new random key per tunnel
+and print the keys to provide to the remote sites::
+
+    vpns = list(PolicyVPN.objects.all()) + list(RouteVPN.objects.all())
+    results = rotate_preshared_keys(vpns, select=external_tunnels)
+    for result in results:
+        if result.error:
+            print('Failed: {} {}: {}'.format(result.vpn, result.tunnel, result.error))
+        else:
+            print('{} {}: {}'.format(result.vpn, result.tunnel, result.key))
+
+The key can be a fixed string, or a callable taking the VPN and tunnel
+and returning the key to use.
+"""
+import string
+import random
+import collections
+from smc.base.util import parallel_map
+from smc.vpn.policy import PolicyVPN
+from smc.vpn.topology import VPNTopology
+
+
+#: Result of rotating the key of a single tunnel. For route based VPNs,
+#: the tunnel is the RouteVPN. Error is the exception raised, or None if
+#: the key was set. Tunnel is None for errors affecting a whole policy
+#: VPN, such as failing to load, open, save or close it.
+RotationResult = collections.namedtuple(
+    'RotationResult', 'vpn tunnel key error')
+
+
+def generate_key(length=32):
+    """
+    Generate a random preshared key using the system random source.
+
+    :param int length: length of the key
+    :rtype: str
+    """
+    chars = string.ascii_letters + string.digits
+    rand = random.SystemRandom()
+    return ''.join(rand.choice(chars) for _ in range(length))
+
+
+def external_tunnels(tunnel):
+    """
+    Select function choosing policy VPN tunnels where either side is an
+    external gateway. Tunnels between SMC managed gateways use generated
+    keys that do not need to be distributed. Route based VPNs are always
+    selected.
+
+    :param tunnel: GatewayTunnel or RouteVPN
+    :rtype: bool
+    """
+    if not hasattr(tunnel, 'tunnel_side_a'):
+        return True
+    return any(side.gateway.typeof == 'external_gateway'
+               for side in (tunnel.tunnel_side_a, tunnel.tunnel_side_b))
+
+
+def rotate_preshared_keys(vpns, key=None, select=None, max_workers=10,
+                          open_policy=True):
+    """
+    Set new preshared keys on the tunnels of policy and route based VPNs.
+
+    :param list vpns: PolicyVPN and RouteVPN elements
+    :param key: key to set, or callable taking (vpn, tunnel) returning the
+        key. By default a random key is generated for each tunnel.
+    :param callable select: callable taking a GatewayTunnel or RouteVPN
+        and returning True if the key should be rotated. By default all
+        tunnels are rotated. Route based VPNs without a preshared key are
+        always skipped.
+    :param int max_workers: max number of concurrent requests
+    :param bool open_policy: open each policy VPN before updating tunnels
+        and save and close it after. Required for SMC version <= 6.1.
+    :return: result for each tunnel where rotation was attempted
+    :rtype: list(RotationResult)
+    """
+    if key is None:
+        key = lambda vpn, tunnel: generate_key()
+    elif not callable(key):
+        key = (lambda value: lambda vpn, tunnel: value)(key)
+    select = select or (lambda tunnel: True)
+
+    results = []
+    policies = [vpn for vpn in vpns if isinstance(vpn, PolicyVPN)]
+    routes = [vpn for vpn in vpns if not isinstance(vpn, PolicyVPN)]
+
+    for policy in policies:
+        results.extend(_rotate_policy(
+            policy, key, select, max_workers, open_policy))
+
+    if routes:
+        # Inflate route VPNs to find which have preshared keys
+        selected = []
+        for vpn, _data, error in parallel_map(
+                lambda vpn: vpn.data, routes, max_workers):
+            if error is not None:
+                results.append(RotationResult(vpn, vpn, None, error))
+            elif vpn.data.get('preshared_key') and select(vpn):
+                selected.append(vpn)
+
+        def rotate_route(vpn):
+            new_key = key(vpn, vpn)
+            vpn.set_preshared_key(new_key)
+            return new_key
+
+        for vpn, new_key, error in parallel_map(
+                rotate_route, selected, max_workers):
+            results.append(RotationResult(vpn, vpn, new_key, error))
+
+    return results
+
+
+def _rotate_policy(policy, key, select, max_workers, open_policy):
+    try:
+        topology = VPNTopology(policy, max_workers=max_workers, sites=False)
+        tunnels = [tunnel for tunnel in topology.tunnels if select(tunnel)]
+        if not tunnels:
+            return []
+        if open_policy:
+            policy.open()
+    except Exception as e:
+        return [RotationResult(policy, None, None, e)]
+
+    keys = {}
+
+    def rotate(tunnel):
+        new_key = keys[tunnel.href] = key(policy, tunnel)
+        tunnel.preshared_key(new_key)
+        return new_key
+
+    results = [RotationResult(policy, tunnel, keys.get(tunnel.href), error)
+               for tunnel, _result, error in parallel_map(
+                   rotate, tunnels, max_workers)]
+
+    if open_policy:
+        try:
+            policy.save()
+        except Exception as e:
+            results.append(RotationResult(policy, None, None, e))
+        finally:
+            try:
+                policy.close()
+            except Exception as e:
+                results.append(RotationResult(policy, None, None, e))
+    return results
@@ -0,0 +1,234 @@
+"""
+Topology of a policy based VPN loaded into memory. Accessing tunnels and
+gateway nodes of a :class:`~smc.vpn.policy.PolicyVPN` one at a time
+results in several requests per tunnel. The topology fetches the gateway
+nodes, tunnels, gateways and sites of the VPN concurrently, fetching each
+gateway node and gateway once, and links tunnels to the loaded nodes::
+
+    >>> topology = PolicyVPN('hub-spoke').topology()
+    >>> topology
+    VPNTopology(policy=hub-spoke, nodes=501, tunnels=500)
+    >>> hub = topology.node('hub-fw')
+    >>> len(topology.neighbors(hub))
+    500
+    >>> topology.tunnel('hub-fw', 'branch-12').enabled
+    True
+    >>> for tunnel, result, error in topology.disable_tunnels(
+    ...         topology.tunnels_for('branch-12')):
+    ...     print(tunnel, error)
+
+Nodes can be referenced by the node instance, the node href or the name
+of the VPN gateway.
+"""
+import collections
+from smc.base.model import Element
+from smc.base.util import parallel_map
+from smc.base.collection import sub_collection
+from smc.api.exceptions import ElementNotFound, ResourceNotFound
+from smc.vpn.policy import CentralGatewayNode, SatelliteGatewayNode,\
+    MobileGatewayNode, GatewayTunnel
+
+
+#: Gateway node roles and the relation and class used to load them
+ROLES = collections.OrderedDict([
+    ('central', ('central_gateway_node', CentralGatewayNode)),
+    ('satellite', ('satellite_gateway_node', SatelliteGatewayNode)),
+    ('mobile', ('mobile_gateway_node', MobileGatewayNode))])
+
+
+def _raise_errors(results):
+    for _item, _result, error in results:
+        if error is not None:
+            raise error
+    return results
+
+
+class VPNTopology(object):
+    """
+    In memory graph of the gateway nodes and tunnels of a policy VPN.
+    Obtain from :meth:`smc.vpn.policy.PolicyVPN.topology`.
+
+    :param PolicyVPN policy: policy VPN to load
+    :param int max_workers: max number of concurrent requests
+    :param bool sites: load the enabled and disabled sites of each node
+    :ivar dict nodes: gateway nodes by href
+    :ivar dict roles: role of each node by href, central, satellite or mobile
+    :ivar dict gateways: VPN gateway elements by href
+    :ivar list tunnels: gateway tunnels of the VPN
+    :ivar dict sites: by node href, a dict with the `enabled` and
+        `disabled` sites as lists of GatewayTreeNode
+    """
+    def __init__(self, policy, max_workers=10, sites=True):
+        self.policy = policy
+        self.max_workers = max_workers
+        self.load(sites)
+
+    def load(self, sites=True):
+        """
+        Fetch the VPN topology, replacing any previously loaded data.
+
+        :param bool sites: load the enabled and disabled sites of each node
+        :raises FetchElementFailed: failed fetching part of the topology
+        :return: None
+        """
+        self.nodes = collections.OrderedDict()
+        self.roles = {}
+        self.gateways = {}
+        self.tunnels = []
+        self.sites = {}
+        self._adjacency = collections.defaultdict(list)
+
+        relations = [(role, relation, cls)
+                     for role, (relation, cls) in ROLES.items()]
+        relations.append((None, 'gateway_tunnel', GatewayTunnel))
+
+        def fetch_collection(relation):
+            _role, rel, cls = relation
+            try:
+                return list(sub_collection(self.policy.get_relation(rel), cls))
+            except ResourceNotFound:  # Mobile VPN is not in all versions
+                return []
+
+        elements = []
+        for (role, _rel, _cls), result, _error in _raise_errors(parallel_map(
+                fetch_collection, relations, self.max_workers)):
+            if role is None:
+                self.tunnels = result
+            else:
+                for node in result:
+                    self.nodes[node.href] = node
+                    self.roles[node.href] = role
+            elements.extend(result)
+
+        # Inflate the cache of every node and tunnel
+        _raise_errors(parallel_map(
+            lambda element: element.data, elements, self.max_workers))
+
+        # Each gateway is fetched once and shared by its nodes
+        hrefs = set(node.data.get('gateway') for node in self.nodes.values())
+        for href, gateway, _error in _raise_errors(parallel_map(
+                Element.from_href, hrefs, self.max_workers)):
+            self.gateways[href] = gateway
+        for node in self.nodes.values():
+            node.gateway = self.gateways[node.data.get('gateway')]
+
+        for tunnel in self.tunnels:
+            side_a = self.nodes.get(tunnel.data.get('gateway_node_1'))
+            side_b = self.nodes.get(tunnel.data.get('gateway_node_2'))
+            if side_a is not None:
+                tunnel.tunnel_side_a = side_a
+            if side_b is not None:
+                tunnel.tunnel_side_b = side_b
+            if side_a is not None and side_b is not None:
+                self._adjacency[side_a.href].append((side_b, tunnel))
+                self._adjacency[side_b.href].append((side_a, tunnel))
+
+        if sites:
+            def fetch_sites(node):
+                return {'enabled': list(node.enabled_sites),
+                        'disabled': list(node.disabled_sites)}
+
+            for node, result, _error in _raise_errors(parallel_map(
+                    fetch_sites, list(self.nodes.values()), self.max_workers)):
+                self.sites[node.href] = result
+
+    def node(self, node):
+        """
+        Return the gateway node by instance, href or gateway name.
+
+        :param node: GatewayNode, href or name of the VPN gateway
+        :raises ElementNotFound: node is not part of the VPN
+        :rtype: GatewayNode
+        """
+        href = getattr(node, 'href', node)
+        if href in self.nodes:
+            return self.nodes[href]
+        for gateway_node in self.nodes.values():
+            if gateway_node.gateway.name == node:
+                return gateway_node
+        raise ElementNotFound(
+            'Gateway node {} was not found in VPN {}'.format(
+                node, self.policy.name))
+
+    def nodes_by_role(self, role):
+        """
+        Gateway nodes with the given role.
+
+        :param str role: central, satellite or mobile
+        :rtype: list(GatewayNode)
+        """
+        return [node for href, node in self.nodes.items()
+                if self.roles[href] == role]
+
+    def neighbors(self, node, enabled=None):
+        """
+        Gateway nodes with a tunnel to the given node.
+
+        :param node: GatewayNode, href or name of the VPN gateway
+        :param bool enabled: only return nodes where the tunnel is enabled
+            (True) or disabled (False). By default, all nodes are returned.
+        :rtype: list(GatewayNode)
+        """
+        return [peer for peer, tunnel in self._adjacency[self.node(node).href]
+                if enabled is None or tunnel.enabled == enabled]
+
+    def tunnels_for(self, node, enabled=None):
+        """
+        Tunnels with the given node as one side.
+
+        :param node: GatewayNode, href or name of the VPN gateway
+        :param bool enabled: only return enabled (True) or disabled (False)
+            tunnels. By default, all tunnels are returned.
+        :rtype: list(GatewayTunnel)
+        """
+        return [tunnel for _peer, tunnel in
+                self._adjacency[self.node(node).href]
+                if enabled is None or tunnel.enabled == enabled]
+
+    def tunnel(self, node_a, node_b):
+        """
+        The tunnel between two gateway nodes.
+
+        :param node_a: GatewayNode, href or name of the VPN gateway
+        :param node_b: GatewayNode, href or name of the VPN gateway
+        :return: the tunnel or None if the nodes are not connected
+        :rtype: GatewayTunnel
+        """
+        peer_href = self.node(node_b).href
+        for peer, tunnel in self._adjacency[self.node(node_a).href]:
+            if peer.href == peer_href:
+                return tunnel
+
+    def enable_tunnels(self, tunnels=None):
+        """
+        Enable tunnels concurrently. Tunnels that are already enabled
+        are skipped.
+
+        :param list tunnels: tunnels to enable, by default all tunnels
+        :return: list of (tunnel, result, exception) for tunnels updated
+        :rtype: list(tuple)
+        """
+        return self._set_enabled(tunnels, True)
+
+    def disable_tunnels(self, tunnels=None):
+        """
+        Disable tunnels concurrently. Tunnels that are already disabled
+        are skipped.
+
+        :param list tunnels: tunnels to disable, by default all tunnels
+        :return: list of (tunnel, result, exception) for tunnels updated
+        :rtype: list(tuple)
+        """
+        return self._set_enabled(tunnels, False)
+
+    def _set_enabled(self, tunnels, enabled):
+        tunnels = self.tunnels if tunnels is None else tunnels
+        return parallel_map(
+            lambda tunnel: tunnel.update(enabled=enabled),
+            [tunnel for tunnel in tunnels if tunnel.enabled != enabled],
+            self.max_workers)
+
+    def __repr__(self):
+        return '%s(policy=%s, nodes=%s, tunnels=%s)' % (
+            self.__class__.__name__, self.policy.name, len(self.nodes),
+            len(self.tunnels))